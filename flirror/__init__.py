@@ -1,6 +1,20 @@
+import hashlib
 import logging
+import os
 import subprocess
-from typing import Any, Dict, Optional, Union
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 import click
 from flask import (
@@ -11,33 +25,53 @@ from flask import (
     render_template,
     request,
     Response,
+    url_for,
 )
-from flask_assets import Bundle, Environment
 
-from .database import (
-    create_database_and_entities,
-    get_object_by_key,
-    store_object_by_key,
+from .assets import (
+    DEFAULT_VENDOR_BUNDLES,
+    load_assets_manifest,
+    SCSS_BUNDLES,
+    StaticFiles,
+    VENDOR_LIBRARIES,
+)
+from .cache import (
+    DEFAULT_CACHE_SIZE,
+    DEFAULT_RENDER_CACHE_TTL,
+    LRUCache,
+    RenderCache,
+    StorageCache,
 )
+from .compression import DEFAULT_COMPRESSION_MIN_SIZE, ResponseCompressor
+from .config import ModuleConfig, ModuleConfigRegistry
+from .database import refresh_timestamp
+from .events import EventListener, EventLog, NotifyingBackend
 from .exceptions import ModuleDataException
-from .helpers import make_error_handler
+from .helpers import compact_jsonify, make_error_handler, not_modified
 from .modules import FlirrorModule
-from .modules.calendar import calendar_module
-from .modules.clock import clock_module
-from .modules.newsfeed import newsfeed_module
-from .modules.stocks import stocks_module
-from .modules.weather import weather_module
+from .plugins import default_plugin_cache_file
+from .snapshot import SnapshotBackend
+from .startup import configure_bytecode_cache, precompile_templates, StartupTimer
+from .storage import create_storage, SQLiteBackend, StorageBackend
 from .utils import (
     clean_string,
     discover_flirror_modules,
     discover_plugins,
+    find_modules,
     format_time,
     prettydate,
 )
-from .views import IndexView
+from .views import IndexView, StreamView, TilesView
 
 FLIRROR_SETTINGS_ENV = "FLIRROR_SETTINGS"
 DEFAULT_OBJECT_KEY = "data"
+MODULE_OBJECT_KEY_PREFIX = "module."
+# The number of rendered index pages to keep (one per configuration)
+INDEX_CACHE_SIZE = 4
+# Seconds to wait for the event listener thread to stop before forking
+FORK_TIMEOUT = 5
+# The config file gunicorn uses if none is given on the command line
+DEFAULT_GUNICORN_CONFIG = "gunicorn.conf.py"
 
 LOGGER = logging.getLogger(__name__)
 
@@ -69,21 +103,61 @@ class Flirror(Flask):
         module_id = request.args.get("module_id")
         if not module_id:
             return self.json_abort(400, "Parameter 'module_id' is missing")
+        # The tile is rendered by the client (output=data) or the server
+        if request.args.get("output") == "data":
+            return self.basic_get_data(module_id, object_key)
         try:
-            template = self.get_module_template(module_id, template_name, object_key)
-            return jsonify({"_template": template})
+            version = self.get_module_versions([module_id], object_key)[module_id]
+            etag = self.get_module_etags(
+                {module_id: template_name}, {module_id: version}, object_key
+            )[module_id]
+            # Don't render the template again, if the client already has it
+            response = not_modified(etag)
+            if response is not None:
+                return response
+            template = self.get_module_template(
+                module_id, template_name, object_key, version
+            )
         except ModuleDataException as e:
             return self.json_abort(400, str(e))
+        response = jsonify({"_template": template})
+        response.set_etag(etag)
+        return response
+
+    def basic_get_data(
+        self, module_id: str, object_key: Optional[str] = None
+    ) -> Response:
+        """Respond with the module's data for rendering the tile on the client."""
+        try:
+            version = self.get_module_versions([module_id], object_key)[module_id]
+            etag = self.get_module_data_etags(
+                [module_id], {module_id: version}, object_key
+            )[module_id]
+        except ModuleDataException as e:
+            return self.json_abort(400, str(e))
+        response = not_modified(etag)
+        if response is not None:
+            return response
+        tile = self.get_modules_client_data(
+            [module_id], object_key, versions={module_id: version}
+        )[module_id]
+        if "error" in tile:
+            return self.json_abort(tile["error"], tile["msg"])
+        response = compact_jsonify(tile)
+        response.set_etag(etag)
+        return response
 
     def store_module_data(
         self, module_id: str, data: Dict[str, Any], object_key: Optional[str] = None
     ) -> None:
-        # Use "data" as default object key
-        if object_key is None:
-            object_key = DEFAULT_OBJECT_KEY
+        module_object_key = self.get_module_object_key(module_id, object_key)
+        self.storage.put(module_object_key, data)
 
-        module_object_key = f"module.{module_id}.{object_key}"
-        store_object_by_key(self.extensions["database"], module_object_key, data)
+        # Changes from our own database connection are not reflected in the
+        # data_version. Thus, we have to invalidate the cache entry manually.
+        cache = self.extensions.get("cache")
+        if cache is not None:
+            cache.delete(module_object_key)
 
     def get_module_data(
         self, module_id: str, object_key: Optional[str] = None
@@ -94,37 +168,477 @@ class Flirror(Flask):
         retrieve the data for the module specified by the function arguments.
         """
 
+        module_object_key = self.get_module_object_key(module_id, object_key)
+
+        cache = self.extensions.get("cache")
+        if cache is not None:
+            return cache.get_object(module_object_key)
+        return self.storage.get(module_object_key)
+
+    def get_modules_data(
+        self,
+        module_ids: Optional[Iterable[str]] = None,
+        object_key: Optional[str] = None,
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Get the data for multiple modules at once.
+        This is the batched version of get_module_data(). The data for all
+        requested modules is retrieved at once (e.g. with a single database
+        query). If no module IDs are given, the data of every module found in
+        the storage is returned.
+
+        Returns a dictionary mapping each module ID to its data (or None, if
+        there is no data for a requested module).
+        """
+
+        # Use "data" as default object key
+        if object_key is None:
+            object_key = DEFAULT_OBJECT_KEY
+
+        if module_ids is None:
+            # Strip prefix and object key from the database keys to get the
+            # module IDs.
+            key_suffix = f".{object_key}"
+            start, end = len(MODULE_OBJECT_KEY_PREFIX), -len(key_suffix)
+            return {
+                key[start:end]: value
+                for key, value in self.storage.scan(MODULE_OBJECT_KEY_PREFIX)
+                if key.endswith(key_suffix)
+            }
+
+        module_object_keys = {
+            module_id: self.get_module_object_key(module_id, object_key)
+            for module_id in module_ids
+        }
+        cache = self.extensions.get("cache")
+        if cache is not None:
+            objects = cache.get_objects(module_object_keys.values())
+        else:
+            objects = self.storage.get_many(module_object_keys.values())
+        return {
+            module_id: objects.get(module_object_key)
+            for module_id, module_object_key in module_object_keys.items()
+        }
+
+    def get_modules_data_for_rendering(
+        self, module_ids: Iterable[str], object_key: Optional[str] = None
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Get the data of multiple modules with an up-to-date "_timestamp".
+
+        Unchanged data is not written again by the crawler, so neither the
+        stored nor the cached data reflect the latest check. As the tiles show
+        when the data was crawled, the timestamp of the latest check is used
+        instead (see refresh_timestamp()).
+        """
+        modules_data = self.get_modules_data(module_ids, object_key)
+        last_checked = self.get_module_last_checked(
+            [module_id for module_id, data in modules_data.items() if data], object_key,
+        )
+        return {
+            module_id: (
+                refresh_timestamp(data, last_checked.get(module_id))
+                if data is not None
+                else None
+            )
+            for module_id, data in modules_data.items()
+        }
+
+    def get_module_versions(
+        self, module_ids: Iterable[str], object_key: Optional[str] = None
+    ) -> Dict[str, int]:
+        """
+        Get the versions of the data for multiple modules at once.
+
+        The version is increased whenever the data of a module changes. Modules
+        without any data have the version 0.
+        """
+        module_object_keys = {
+            module_id: self.get_module_object_key(module_id, object_key)
+            for module_id in module_ids
+        }
+        versions = self.storage.get_versions(module_object_keys.values())
+        return {
+            module_id: versions.get(module_object_key, 0)
+            for module_id, module_object_key in module_object_keys.items()
+        }
+
+    def get_module_last_checked(
+        self, module_ids: Iterable[str], object_key: Optional[str] = None
+    ) -> Dict[str, float]:
+        """
+        Get the time the data of multiple modules was last written or checked.
+
+        In contrast to the version, this also changes if the crawler found
+        unchanged data. Modules without any data are not part of the result.
+        """
+        module_object_keys = {
+            module_id: self.get_module_object_key(module_id, object_key)
+            for module_id in module_ids
+        }
+        timestamps = self.storage.get_last_checked(module_object_keys.values())
+        return {
+            module_id: timestamps[module_object_key]
+            for module_id, module_object_key in module_object_keys.items()
+            if module_object_key in timestamps
+        }
+
+    def get_streamed_modules(self) -> Dict[str, str]:
+        """
+        Get the configured modules whose tiles can be updated via the stream.
+
+        Only modules with a crawler store any data, so the tiles of all other
+        modules never change. As the stream renders the tiles on its own, it's
+        limited to the modules which are loaded in batches (see
+        FlirrorModule.batched). Returns a dictionary mapping each module ID to
+        the template used to render its tile.
+        """
+        streamed_modules = {}
+        for module_config in self.module_configs:
+            module = self.modules.get(module_config.module)
+            if (
+                isinstance(module, FlirrorModule)
+                and module._crawler is not None
+                and module.batched
+            ):
+                streamed_modules[module_config.id] = module.template_name
+        return streamed_modules
+
+    def get_required_assets(self) -> Set[str]:
+        """
+        Get the vendor bundles which must be included in the index page.
+
+        By default, all bundles are included. With ASSETS_ONLY_REQUIRED, the
+        optional bundles (e.g. Chart.js) are only included if any of the
+        configured modules requires them.
+        """
+        if not self.config.get("ASSETS_ONLY_REQUIRED", False):
+            return {library.bundle for library in VENDOR_LIBRARIES}
+
+        bundles = set(DEFAULT_VENDOR_BUNDLES)
+        for module_config in self.module_configs:
+            module = self.modules.get(module_config.module)
+            if isinstance(module, FlirrorModule) and module.required_assets:
+                bundles.update(module.required_assets(module_config.config))
+        return bundles
+
+    def get_module_etags(
+        self,
+        module_templates: Dict[str, str],
+        versions: Dict[str, int],
+        object_key: Optional[str] = None,
+    ) -> Dict[str, str]:
+        """
+        Get the entity tags for the tiles of multiple modules.
+        The tag of a tile changes whenever the module's data (identified by
+        its version), its config or its template changes. As the tiles contain
+        relative times (e.g. "5 minutes ago"), the tags also change once every
+        RENDER_CACHE_TTL seconds.
+
+        Accepts a dictionary mapping the module IDs to their templates and
+        fails if any of the modules is not configured.
+        """
+        ttl = self.config.get("RENDER_CACHE_TTL", DEFAULT_RENDER_CACHE_TTL)
+        period = int(time.time() // ttl)
+
+        etags = {}
+        for module_id, template_name in module_templates.items():
+            key = RenderCache.make_key(
+                module_id,
+                template_name,
+                versions.get(module_id, 0),
+                self.get_module_config(module_id).config_hash,
+                object_key,
+            )
+            etags[module_id] = hashlib.sha1(
+                repr((key, period)).encode("utf-8")
+            ).hexdigest()
+        return etags
+
+    def get_module_data_etags(
+        self,
+        module_ids: Iterable[str],
+        versions: Dict[str, int],
+        object_key: Optional[str] = None,
+        last_checked: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, str]:
+        """
+        Get the entity tags for the data of multiple modules (output=data).
+
+        In contrast to the tiles' tags, they don't expire, as the client
+        renders the relative times on its own. They change with the data, the
+        module's config and the time the crawler last checked the data (which
+        is shown as "_timestamp", even if the data didn't change). Fails if
+        any of the modules is not configured.
+        """
+        module_ids = list(module_ids)
+        if last_checked is None:
+            last_checked = self.get_module_last_checked(module_ids, object_key)
+        etags = {}
+        for module_id in module_ids:
+            key = (
+                "data",
+                module_id,
+                versions.get(module_id, 0),
+                last_checked.get(module_id),
+                self.get_module_config(module_id).config_hash,
+                object_key,
+            )
+            etags[module_id] = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return etags
+
+    def send_static_file(self, filename: str) -> Response:
+        static_files = self.extensions.get("static_files")
+        if static_files is None:
+            return super().send_static_file(filename)
+        return static_files.send(filename, self.get_send_file_max_age(filename))
+
+    @property
+    def storage(self) -> StorageBackend:
+        return self.extensions["storage"]
+
+    @property
+    def module_configs(self) -> ModuleConfigRegistry:
+        return self.extensions["module_configs"]
+
+    def configure_modules(self) -> None:
+        """
+        Validate and compile the MODULES setting and load the used modules.
+
+        This is done once when the app is created, so the configuration errors
+        show up right away. If the setting is changed afterwards, this must be
+        called again.
+        """
+        self.extensions["module_configs"] = ModuleConfigRegistry.from_config(
+            self.config.get("MODULES")
+        )
+        self.load_modules()
+
+    @staticmethod
+    def get_module_object_key(module_id: str, object_key: Optional[str] = None) -> str:
         # Use "data" as default object key
         if object_key is None:
             object_key = DEFAULT_OBJECT_KEY
 
-        module_object_key = f"module.{module_id}.{object_key}"
-        return get_object_by_key(self.extensions["database"], module_object_key)
+        return f"{MODULE_OBJECT_KEY_PREFIX}{module_id}.{object_key}"
 
     def get_module_template(
-        self, module_id: str, template_name: str, object_key: Optional[str] = None
+        self,
+        module_id: str,
+        template_name: str,
+        object_key: Optional[str] = None,
+        version: Optional[int] = None,
     ) -> str:
-        data = self.get_module_data(module_id, object_key)
-        context = self.get_template_context(module_id, data)
+        """
+        Render the template for a specific module.
+        If the render cache is enabled, the template is only rendered again
+        once the module's data (identified by its version) or config changed.
+        The version can be provided if the caller already knows it.
+        """
+        render_cache = self.extensions.get("render_cache")
+        if render_cache is None:
+            data = self.get_modules_data_for_rendering([module_id], object_key)[
+                module_id
+            ]
+            context = self.get_template_context(module_id, data)
+            return render_template(template_name, **context)
 
-        return render_template(template_name, **context)
+        module_config = self.get_module_config(module_id)
+        if version is None:
+            version = self.get_module_versions([module_id], object_key)[module_id]
+        key = render_cache.make_key(
+            module_id, template_name, version, module_config.config_hash, object_key
+        )
+        template = render_cache.get_template(key)
+        if template is None:
+            data = self.get_modules_data_for_rendering([module_id], object_key)[
+                module_id
+            ]
+            context = self.get_template_context(module_id, data)
+            template = render_template(template_name, **context)
+            render_cache.set_template(key, template)
+        return template
 
-    def get_template_context(
-        self, module_id: str, data: Optional[Dict[str, Any]]
-    ) -> Dict[str, Any]:
-        # Get view specifc settings from config
-        module_configs = [
-            m for m in self.config.get("MODULES", {}) if m.get("id") == module_id
+    def get_configured_modules(
+        self, module_ids: Iterable[str]
+    ) -> Dict[str, FlirrorModule]:
+        """
+        Look up the registered module for each of the given module IDs.
+
+        Module IDs which are not configured or whose module is not registered
+        are skipped.
+        """
+        modules = {}
+        for module_id in module_ids:
+            module_config = self.module_configs.get(module_id)
+            if module_config is not None:
+                module = self.modules.get(module_config.module)
+                if isinstance(module, FlirrorModule):
+                    modules[module_id] = module
+        return modules
+
+    def get_module_templates(
+        self,
+        module_ids: Iterable[str],
+        object_key: Optional[str] = None,
+        versions: Optional[Dict[str, int]] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Render the tiles for multiple modules at once.
+        The data of all modules is retrieved in a single batch (see
+        get_modules_data()). Errors are reported per module in the same format
+        as json_abort() uses, so a single broken module doesn't affect the
+        other ones.
+
+        The versions of the modules' data can be provided if the caller
+        already knows them.
+
+        Returns a dictionary mapping each module ID either to its rendered
+        template ("_template") and its entity tag ("etag") or to an error.
+        """
+        module_ids = list(dict.fromkeys(module_ids))
+        modules = self.get_configured_modules(module_ids)
+
+        # Only modules with a crawler store any data
+        data_module_ids = [
+            module_id for module_id, m in modules.items() if m._crawler is not None
         ]
 
-        if module_configs:
-            module_config = module_configs[0]
-        else:
+        if versions is None:
+            versions = self.get_module_versions(data_module_ids, object_key)
+        etags = self.get_module_etags(
+            {module_id: module.template_name for module_id, module in modules.items()},
+            versions,
+            object_key,
+        )
+
+        # Look up the rendered templates in the render cache (if enabled).
+        # Only the data for the remaining modules has to be retrieved.
+        render_cache = self.extensions.get("render_cache")
+        cache_keys = {}
+        tiles: Dict[str, Dict[str, Any]] = {}
+        if render_cache is not None:
+            for module_id, module in modules.items():
+                cache_keys[module_id] = render_cache.make_key(
+                    module_id,
+                    module.template_name,
+                    versions.get(module_id, 0),
+                    self.module_configs[module_id].config_hash,
+                    object_key,
+                )
+                template = render_cache.get_template(cache_keys[module_id])
+                if template is not None:
+                    tiles[module_id] = {
+                        "_template": template,
+                        "etag": etags[module_id],
+                    }
+
+        modules_data = self.get_modules_data_for_rendering(
+            [module_id for module_id in data_module_ids if module_id not in tiles],
+            object_key,
+        )
+
+        for module_id in module_ids:
+            if module_id in tiles:
+                continue
+            try:
+                # Fails if there is no module config for this ID
+                context = self.get_template_context(
+                    module_id, modules_data.get(module_id)
+                )
+                if module_id not in modules:
+                    raise ModuleDataException(
+                        f"Could not find any registered module for ID '{module_id}'"
+                    )
+                if modules[module_id]._crawler is None:
+                    # Modules without crawler don't need any data
+                    context["module"]["error"] = None
+                template = render_template(modules[module_id].template_name, **context)
+                tiles[module_id] = {"_template": template, "etag": etags[module_id]}
+                if render_cache is not None:
+                    render_cache.set_template(cache_keys[module_id], template)
+            except ModuleDataException as e:
+                tiles[module_id] = {"error": 400, "msg": str(e)}
+            except Exception:
+                LOGGER.exception("Could not render tile for module '%s'", module_id)
+                tiles[module_id] = {
+                    "error": 500,
+                    "msg": f"Could not render tile for module '{module_id}'",
+                }
+        # Keep the order of the requested module IDs
+        return {module_id: tiles[module_id] for module_id in module_ids}
+
+    def get_modules_client_data(
+        self,
+        module_ids: Iterable[str],
+        object_key: Optional[str] = None,
+        versions: Optional[Dict[str, int]] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the data of multiple modules for rendering their tiles on the client.
+
+        This is the counterpart of get_module_templates(). The data of all
+        modules is retrieved in a single batch and limited to the fields each
+        tile needs (see FlirrorModule.data_fields). Errors are reported per
+        module in the same format.
+
+        Returns a dictionary mapping each module ID either to its data ("data",
+        None if there is none yet), the data's version ("version") and its
+        entity tag ("etag") or to an error.
+        """
+        module_ids = list(dict.fromkeys(module_ids))
+        modules = self.get_configured_modules(module_ids)
+
+        # Only modules with a crawler store any data
+        data_module_ids = [
+            module_id for module_id, m in modules.items() if m._crawler is not None
+        ]
+        if versions is None:
+            versions = self.get_module_versions(data_module_ids, object_key)
+        last_checked = self.get_module_last_checked(data_module_ids, object_key)
+        etags = self.get_module_data_etags(
+            modules, versions, object_key, last_checked=last_checked
+        )
+        modules_data = self.get_modules_data(data_module_ids, object_key)
+
+        tiles: Dict[str, Dict[str, Any]] = {}
+        for module_id in module_ids:
+            try:
+                # Fails if there is no module config for this ID
+                self.get_module_config(module_id)
+                if module_id not in modules:
+                    raise ModuleDataException(
+                        f"Could not find any registered module for ID '{module_id}'"
+                    )
+            except ModuleDataException as e:
+                tiles[module_id] = {"error": 400, "msg": str(e)}
+                continue
+            data = modules_data.get(module_id)
+            if data is not None:
+                # The cached data might not know about the latest check yet
+                data = refresh_timestamp(data, last_checked.get(module_id))
+            tiles[module_id] = {
+                "data": modules[module_id].get_client_data(data),
+                "version": versions.get(module_id, 0),
+                "etag": etags[module_id],
+            }
+        return tiles
+
+    def get_module_config(self, module_id: str) -> ModuleConfig:
+        module_config = self.module_configs.get(module_id)
+        if module_config is None:
             # TODO template/raw output?
             raise ModuleDataException(
                 f"Could not find any module config for ID '{module_id}'. "
                 "Are you sure this one is specified in the config file?"
             )
+        return module_config
+
+    def get_template_context(
+        self, module_id: str, data: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        # Get view specifc settings from config
+        module_config = self.get_module_config(module_id)
 
         # Change timestamps to datetime objects
         # TODO This should be done before storing the data, but I'm not sure
@@ -144,11 +658,10 @@ class Flirror(Flask):
         # Build template context and return template via JSON
         context = {
             "module": {
-                # TODO (felix): Remove this fallback in a later future version
-                "name": module_config.get("module") or module_config.get("type"),
+                "name": module_config.module,
                 "id": module_id,
-                "config": module_config.get("config"),
-                "display": module_config.get("display"),
+                "config": module_config.config,
+                "display": module_config.display,
                 "error": error,
                 "data": data,
             }
@@ -161,21 +674,109 @@ class Flirror(Flask):
             response["msg"] = msg
         return abort(make_response(jsonify(response), status))
 
-    def register_plugins(self) -> None:
-        plugins = discover_plugins()
+    def register_plugins(
+        self,
+        names: Optional[Iterable[str]] = None,
+        packages: Optional[Iterable[str]] = None,
+    ) -> None:
+        """
+        Import the installed 'flirror_*' plugins and register their modules.
+
+        If names are given, only the modules with these names are registered.
+        If packages are given, only those are imported.
+        """
+        plugins = discover_plugins(packages)
         flirror_modules = discover_flirror_modules(plugins)
         for fm in flirror_modules:
-            self.register_module(fm)
+            if names is None or fm.name in names:
+                self.register_module(fm)
+
+    def load_modules(self) -> None:
+        """
+        Import and register the modules used in the MODULES setting.
+
+        Only the modules which are not registered yet are imported (see
+        flirror.utils.find_modules()).
+        """
+        names = [m.module for m in self.module_configs if m.module not in self.modules]
+        cache_file = self.config.get("PLUGIN_CACHE_FILE", default_plugin_cache_file())
+        for module in find_modules(names, cache_file).values():
+            self.register_module(module)
+
+    def before_fork(self) -> None:
+        """
+        Prepare the app to be shared with forked worker processes.
+
+        Only a single thread survives a fork and connections must not be
+        shared between processes. Thus, the event listener is stopped (so it
+        can't hold any lock while forking) and all database connections are
+        closed. Each worker opens its own ones (see after_fork()).
+        """
+        events = self.extensions.get("events")
+        if events is not None:
+            events.stop(timeout=FORK_TIMEOUT)
+        self.storage.close()
+
+    def after_fork(self) -> None:
+        """Restart the event listener in a forked worker process."""
+        # The database connections are opened again on first use
+        events = self.extensions.get("events")
+        if events is not None:
+            events.restart()
+
+
+def configure_storage(
+    extensions: Dict[str, Any], config: Mapping[str, Any], web: bool = False
+) -> None:
+    """
+    Create the storage backend and store it in the given extensions.
+
+    This is shared by the Flirror app and the crawler's context (see
+    flirror.crawler.context). The web flag should be set for flirror-web, so
+    it can read from the database in read-only mode.
+    """
+    read_only = web and config.get("DATABASE_READ_ONLY", False)
+    storage = create_storage(config, read_only=read_only)
+    extensions["storage"] = storage
+    # Keep the database connection available for code that still accesses the
+    # database directly.
+    if isinstance(storage, SQLiteBackend) and "database" not in extensions:
+        extensions["database"] = storage.db
+
+    # Serve the module data from a snapshot file that is shared between all
+    # web workers. The crawler publishes a new snapshot on every write.
+    snapshot_file = config.get("SNAPSHOT_FILE")
+    if snapshot_file is not None:
+        extensions["storage"] = SnapshotBackend(storage, snapshot_file, publish=not web)
+
+    # Notify flirror-web about changed data via an event log. The crawler
+    # publishes the events, while the web app listens to them.
+    event_log_file = config.get("EVENT_LOG_FILE")
+    if event_log_file is not None:
+        if web:
+            extensions["events"] = EventListener(event_log_file)
+        else:
+            extensions["storage"] = NotifyingBackend(
+                extensions["storage"], EventLog(event_log_file)
+            )
 
 
 def create_app(
-    config: Optional[Dict] = None, jinja_options: Optional[Any] = None
+    config: Optional[Dict] = None,
+    jinja_options: Optional[Any] = None,
+    web: bool = False,
 ) -> Flirror:
     """
     Load configuration file and initialize flirror app with necessary
     components like database and modules.
+
+    The web flag should be set if the app is used for flirror-web. In that
+    case, the database can be opened in read-only mode.
     """
 
+    # Report where the startup time goes (e.g. when a worker boots slowly)
+    timer = StartupTimer()
+
     # TODO (felix): Find a better way to overwrite the jinja_options for the unit tests.
     # As stated in https://github.com/pallets/flask/blob/38eb5d3b49d628785a470e2e773fc5ac82e3c8e4/src/flask/app.py#L679
     # overwriting the jinja_options should be done as early as possible.
@@ -195,39 +796,23 @@ def create_app(
         app.config.from_mapping(config)
 
     app.secret_key = app.config["SECRET_KEY"]
+    timer.lap("configuration")
+
+    # Validate the module configuration once, rather than on each request.
+    # Only the configured modules are imported and registered. Each module's
+    # URLs are prefixed with its name, so modules cannot conflict with each
+    # other.
+    app.configure_modules()
+    timer.lap("modules")
 
-    # Using the URL prefix is a good way so modules cannot conflict with each other
-    # TODO (felix): Auto look-up for modules by name and modules specified in the
-    # config file or something like
-    # https://packaging.python.org/guides/creating-and-discovering-plugins/
-    # TODO (felix): Prefix each module's URL with its name to avoid name clashes
-    # between modules and all can simply use the same url_rule ("/").
-    # Register all standard modules
-    for module in [
-        clock_module,
-        weather_module,
-        calendar_module,
-        newsfeed_module,
-        stocks_module,
-    ]:
-        app.register_module(module)
-
-    # Discover and register custom plugins
-    app.register_plugins()
-
-    # Connect to the sqlite database
-    # TODO (felix): Maybe we could drop the 'create_db' here?
-    # Usually, it should be sufficient, when the crawler creates the database. If it
-    # is not created here, we should just provide some message to start the crawler.
-    db = create_database_and_entities(
-        provider="sqlite", filename=app.config["DATABASE_FILE"], create_db=True
-    )
-
-    # Store the dabase connection in flask's extensions dictionary.
+    # Connect to the storage backend (by default the sqlite database).
+    # flirror-web only reads from the database, so it can use a read-only
+    # connection (if configured), which never blocks the crawler.
     if not hasattr(app, "extensions"):
         app.extensions = {}
-    if "database" not in app.extensions:
-        app.extensions["database"] = db
+    configure_storage(app.extensions, app.config, web=web)
+    timer.lap("storage")
+    app.extensions["startup_timer"] = timer
 
     return app
 
@@ -241,43 +826,209 @@ def create_web(
     env, template filters and assets (SCSS/CSS).
     """
 
-    app = create_app(config, jinja_options)
+    app = create_app(config, jinja_options, web=True)
+    timer = app.extensions["startup_timer"]
+
+    # Cache the module data in the web process, as the data is requested on
+    # each ajax call, but only changes whenever the crawler stores new data.
+    cache_size = app.config.get("MODULE_DATA_CACHE_SIZE", DEFAULT_CACHE_SIZE)
+    if cache_size:
+        cache = StorageCache(app.storage, max_size=cache_size)
+        app.extensions["cache"] = cache
+        # Evict changed data right away, rather than on the next validation
+        events = app.extensions.get("events")
+        if events is not None:
+            events.subscribe(lambda event: cache.delete(event.key))
+
+    # Cache the rendered templates, so the same data is only rendered once,
+    # rather than on every poll of every display.
+    render_cache_size = app.config.get("RENDER_CACHE_SIZE", DEFAULT_CACHE_SIZE)
+    if render_cache_size:
+        app.extensions["render_cache"] = RenderCache(
+            max_size=render_cache_size,
+            ttl=app.config.get("RENDER_CACHE_TTL", DEFAULT_RENDER_CACHE_TTL),
+        )
+
+    # The index page only changes with the configuration, so it's rendered
+    # once and cached (per configuration).
+    app.extensions["index_cache"] = LRUCache(max_size=INDEX_CACHE_SIZE)
 
     # The central index page showing all tiles
     IndexView.register_url(app)
+    # Render multiple tiles with a single request
+    TilesView.register_url(app)
+    # Push updated tiles to the browser
+    StreamView.register_url(app)
+
+    # Compress the rendered tiles and pages for clients that accept it
+    if app.config.get("COMPRESS_RESPONSES", True):
+        ResponseCompressor(
+            min_size=app.config.get(
+                "COMPRESSION_MIN_SIZE", DEFAULT_COMPRESSION_MIN_SIZE
+            )
+        ).init_app(app)
+
+    # Serve the static files with content hashed URLs (which can be cached
+    # forever) and precompressed copies (see "flirror compress-static").
+    static_files = StaticFiles(app.static_folder)
+    app.extensions["static_files"] = static_files
+    app.url_defaults(static_files.inject_hash)
 
     # Register error handler to known status codes
     error_handler = make_error_handler()
     app.register_error_handler(400, error_handler)
     app.register_error_handler(403, error_handler)
     app.register_error_handler(404, error_handler)
+    timer.lap("web components")
 
     # Add custom Jinja2 template filters
     app.add_template_filter(prettydate)
     app.add_template_filter(format_time)
     app.add_template_filter(clean_string)
 
-    # Initialize webassets to work with SCSS files
-    assets = Environment(app)
-    scss = Bundle("scss/all.scss", filters="pyscss", output="all.css")
-    assets.register("scss_all", scss)
+    # Look up the stylesheets compiled by "flirror build-assets". Only in the
+    # dev mode (or if they were not built yet), they are compiled at runtime.
+    assets_manifest = load_assets_manifest(app.static_folder)
+    if app.config.get("ASSETS_DEV_MODE", False) or not all(
+        name in assets_manifest for name in SCSS_BUNDLES
+    ):
+        if not app.config.get("ASSETS_DEV_MODE", False):
+            LOGGER.warning(
+                "Could not find the compiled assets, compiling them at runtime. "
+                "Run 'flirror build-assets' to build them once."
+            )
+        app.add_template_global(init_assets_environment(app), "asset_url")
+    else:
+        app.add_template_global(
+            lambda name: url_for("static", filename=assets_manifest[name]), "asset_url",
+        )
+    app.add_template_global(make_vendor_assets(app, assets_manifest), "vendor_assets")
+    timer.lap("assets")
+
+    # Share the compiled templates between all workers (and restarts) via
+    # the bytecode cache and compile them right away, so the first request
+    # doesn't have to.
+    if app.config.get("TEMPLATE_BYTECODE_CACHE", True):
+        configure_bytecode_cache(app, app.config.get("TEMPLATE_CACHE_DIR"))
+    if app.config.get("PRECOMPILE_TEMPLATES", False):
+        templates = precompile_templates(app)
+        LOGGER.debug("Precompiled %d templates", len(templates))
+    timer.lap("templates")
+
+    report = timer.report()
+    if app.config.get("STARTUP_TIMING", False):
+        LOGGER.info(report)
+    else:
+        LOGGER.debug(report)
 
     return app
 
 
+def make_vendor_assets(
+    app: Flirror, assets_manifest: Dict[str, str]
+) -> Callable[[str], List[Dict[str, Optional[str]]]]:
+    """
+    Create a function to look up the URLs of a vendor bundle.
+
+    The bundle is served from the static folder if it was built via "flirror
+    build-assets". Otherwise, the libraries are loaded from their CDNs. Bundles
+    which are not required by the configured modules don't have any URLs.
+    """
+
+    def vendor_assets(bundle: str) -> List[Dict[str, Optional[str]]]:
+        if bundle not in app.get_required_assets():
+            return []
+        if bundle in assets_manifest:
+            url = url_for("static", filename=assets_manifest[bundle])
+            return [{"url": url, "integrity": None}]
+        return [
+            {"url": library.url, "integrity": library.integrity}
+            for library in VENDOR_LIBRARIES
+            if library.bundle == bundle
+        ]
+
+    return vendor_assets
+
+
+def init_assets_environment(app: Flask) -> Callable[[str], str]:
+    """
+    Compile the stylesheets at runtime via webassets.
+
+    Returns a function to look up the URL of a compiled stylesheet by its
+    name. The stylesheets are compiled on the first lookup and again whenever
+    the sources changed.
+    """
+    from flask_assets import Bundle, Environment
+
+    assets = Environment(app)
+    for name, source in SCSS_BUNDLES.items():
+        assets.register(name, Bundle(source, filters="pyscss", output=name))
+
+    def asset_url(name: str) -> str:
+        return assets[name].urls()[0]
+
+    return asset_url
+
+
 # NOTE (felix): It looks like poetry only supports python entry points and no
 # arbitrary scripts (e.g. shell) like setup.py (although a setup.py file is
 # generated in the end): https://github.com/python-poetry/poetry/issues/241
 # Thus, we start gunicorn as subprocess from within Python to bypass this
 # limitation.
 @click.command(context_settings=dict(ignore_unknown_options=True))
+@click.option(
+    "--preload",
+    is_flag=True,
+    help=(
+        "Create the app once in the master process and share it with all "
+        "workers (see flirror.server)"
+    ),
+)
 @click.argument("gunicorn_options", nargs=-1, type=click.UNPROCESSED)
-def run_web(gunicorn_options: Dict):
+def run_web(preload: bool, gunicorn_options: Dict):
     # Start gunicorn to serve the flirror application
     cmd = ["gunicorn", "flirror:create_web()"]
+    env = None
+    options = list(gunicorn_options or [])
+
+    # The preload mode is configured via the hooks in flirror.server
+    if preload:
+        from .server import USER_CONFIG_ENV
+
+        # gunicorn only accepts a single config file. Thus, the user's one is
+        # loaded by flirror.server, which merges it with its own settings.
+        user_config, options = pop_gunicorn_config(options)
+        if user_config is None and os.path.exists(DEFAULT_GUNICORN_CONFIG):
+            user_config = DEFAULT_GUNICORN_CONFIG
+        if user_config is not None:
+            if not user_config.startswith("python:"):
+                user_config = os.path.abspath(user_config)
+            env = {**os.environ, USER_CONFIG_ENV: user_config}
+        cmd.extend(["--config", "python:flirror.server"])
 
     # Allow arbitrary gunicorn options to be provided
-    if gunicorn_options is not None:
-        cmd.extend(gunicorn_options)
+    cmd.extend(options)
+
+    subprocess.call(cmd, env=env)
 
-    subprocess.call(cmd)
+
+def pop_gunicorn_config(options: List[str]) -> Tuple[Optional[str], List[str]]:
+    """
+    Split the config file from the other gunicorn command line options.
+
+    Returns the config file (or None, if there is none) and the remaining
+    options.
+    """
+    config = None
+    remaining = []
+    args = iter(options)
+    for arg in args:
+        if arg in ("-c", "--config"):
+            config = next(args, None)
+        elif arg.startswith("--config="):
+            config = arg.split("=", 1)[1]
+        elif arg.startswith("-c") and len(arg) > 2:
+            config = arg[2:]
+        else:
+            remaining.append(arg)
+    return config, remaining
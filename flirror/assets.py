@@ -0,0 +1,441 @@
+import base64
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+import urllib.request
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import urldefrag, urljoin, urlsplit
+
+from flask import request, Response, send_from_directory
+from werkzeug.security import safe_join
+
+from flirror.compression import available_encodings, choose_encoding, ENCODINGS
+from flirror.exceptions import AssetError
+
+LOGGER = logging.getLogger(__name__)
+
+# File extensions of precompressed files per content encoding
+PRECOMPRESSED_EXTENSIONS = {"br": ".br", "gzip": ".gz"}
+# Only text based files benefit from compression. Others (like images or
+# woff fonts) are compressed already.
+COMPRESSIBLE_EXTENSIONS = {".css", ".eot", ".html", ".js", ".json", ".svg", ".ttf"}
+# Files with the correct content hash in their URL never change
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# The stylesheets compiled by build_assets() and their SCSS sources
+SCSS_BUNDLES = {"all.css": "scss/all.scss"}
+# The folder (within the static folder) containing the compiled assets
+ASSETS_FOLDER = "dist"
+# Maps the names of the compiled assets to their fingerprinted files
+ASSETS_MANIFEST = "manifest.json"
+# The folder (within the static folder) containing the vendored libraries
+VENDOR_FOLDER = "vendor"
+# Some CDNs (like Google Fonts) serve different files depending on the user
+# agent. Request the ones for modern browsers.
+VENDOR_USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/90.0.4430.93 Safari/537.36"
+)
+
+
+class VendorLibrary(NamedTuple):
+    name: str
+    url: str
+    # The subresource integrity hash (e.g. "sha384-..."), if the CDN provides it
+    integrity: Optional[str]
+    # The bundle which contains the library
+    bundle: str
+
+
+# The third party libraries used by the templates. Each bundle concatenates
+# its libraries in the given order (e.g. Moment.js must be loaded before
+# Chart.js to make the time axis work).
+VENDOR_LIBRARIES = [
+    VendorLibrary(
+        "bootstrap.css",
+        "https://stackpath.bootstrapcdn.com/bootstrap/4.3.1/css/bootstrap.min.css",
+        "sha384-ggOyR0iXCbMQv3Xipma34MD+dH/1fQ784/j6cY/iJTQUOhcWr7x9JvoRxT2MZw1T",
+        "vendor.css",
+    ),
+    VendorLibrary(
+        "fontawesome.css",
+        "https://use.fontawesome.com/releases/v5.8.2/css/all.css",
+        "sha384-oS3vJWv+0UjzBfQzYUhtDYW+Pj2yciDJxpsK1OYPAYjqT085Qq/1cq5FLXAZQ7Ay",
+        "vendor.css",
+    ),
+    VendorLibrary(
+        "roboto.css",
+        "https://fonts.googleapis.com/css?family=Roboto:300,400,500,700b&display=swap",
+        None,
+        "vendor.css",
+    ),
+    VendorLibrary(
+        "jquery.js",
+        "https://code.jquery.com/jquery-3.4.1.min.js",
+        "sha256-CSXorXvZcTkaix6Yvo6HppcZGetbYMGWSFlBw8HfCJo=",
+        "vendor.js",
+    ),
+    VendorLibrary(
+        "popper.js",
+        "https://cdnjs.cloudflare.com/ajax/libs/popper.js/1.14.7/umd/popper.min.js",
+        "sha384-UO2eT0CpHqdSJQ6hJty5KVphtPhzWj9WO1clHTMGa3JDZwrnQq4sF86dIHNDz0W1",
+        "vendor.js",
+    ),
+    VendorLibrary(
+        "bootstrap.js",
+        "https://stackpath.bootstrapcdn.com/bootstrap/4.3.1/js/bootstrap.min.js",
+        "sha384-JjSmVgyd0p3pXB1rRibZUAYoIIy6OrQ6VrjIEaFf/nJGzIxFDsf4x0xIM+B07jRM",
+        "vendor.js",
+    ),
+    VendorLibrary(
+        "moment.js",
+        "https://cdnjs.cloudflare.com/ajax/libs/moment.js/2.24.0/moment.min.js",
+        None,
+        "vendor.js",
+    ),
+    VendorLibrary(
+        "chart.js",
+        "https://cdn.jsdelivr.net/npm/chart.js@2.8.0/dist/Chart.min.js",
+        "sha256-Uv9BNBucvCPipKQ2NS9wYpJmi8DTOEfTA/nH2aoJALw=",
+        "charts.js",
+    ),
+]
+# The bundles which are always included in the index page. All others are
+# only included if a module requires them (see FlirrorModule.required_assets).
+DEFAULT_VENDOR_BUNDLES = ("vendor.css", "vendor.js")
+
+# Matches the url() references in a stylesheet
+CSS_URL_RE = re.compile(r"url\(\s*(['\"]?)([^'\")]+)\1\s*\)")
+CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+
+
+def file_hash(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            sha.update(chunk)
+    return sha.hexdigest()[:12]
+
+
+def iter_static_files(static_folder: str) -> Iterator[str]:
+    """Iterate over the paths of all static files relative to the folder."""
+    for root, _, filenames in os.walk(static_folder):
+        for filename in sorted(filenames):
+            path = os.path.relpath(os.path.join(root, filename), static_folder)
+            if path.endswith(tuple(PRECOMPRESSED_EXTENSIONS.values())):
+                continue
+            yield path.replace(os.sep, "/")
+
+
+def compress_static(static_folder: str) -> List[str]:
+    """
+    Precompress all static files.
+
+    For each compressible file, a compressed copy is written next to it for
+    each available content encoding (e.g. "style.css.gz"), unless compressing
+    doesn't make it any smaller. Returns the paths of all written files.
+    """
+    encodings = [e for e in available_encodings() if e in PRECOMPRESSED_EXTENSIONS]
+    written = []
+    for filename in iter_static_files(static_folder):
+        path = os.path.join(static_folder, filename)
+        if os.path.splitext(filename)[1] not in COMPRESSIBLE_EXTENSIONS:
+            continue
+        with open(path, "rb") as f:
+            data = f.read()
+        for encoding in encodings:
+            compressed_path = path + PRECOMPRESSED_EXTENSIONS[encoding]
+            compress, _ = ENCODINGS[encoding]
+            # This is done only once, so use the best compression
+            compressed = compress(data, best=True)
+            if len(compressed) >= len(data):
+                if os.path.exists(compressed_path):
+                    os.unlink(compressed_path)
+                continue
+            LOGGER.debug("Writing %s (%d bytes)", compressed_path, len(compressed))
+            with open(compressed_path, "wb") as f:
+                f.write(compressed)
+            written.append(compressed_path)
+    return written
+
+
+def compile_scss(path: str) -> str:
+    """Compile and minify a SCSS file to CSS."""
+    # NOTE (felix): pyscss is only needed to build the assets (or in the dev
+    # mode), so flirror-web doesn't have to import it.
+    from scss import Compiler
+
+    compiler = Compiler(search_path=[os.path.dirname(path)], output_style="compressed")
+    return compiler.compile(path)
+
+
+def fetch_url(url: str) -> bytes:
+    """Download a file (used to vendor the libraries)."""
+    req = urllib.request.Request(url, headers={"User-Agent": VENDOR_USER_AGENT})
+    with urllib.request.urlopen(req, timeout=30) as response:
+        return response.read()
+
+
+def check_integrity(data: bytes, integrity: str) -> bool:
+    """Verify the data against a subresource integrity hash."""
+    algorithm, _, expected = integrity.partition("-")
+    try:
+        digest = hashlib.new(algorithm, data).digest()
+    except ValueError:
+        raise AssetError(f"Unsupported integrity hash algorithm '{algorithm}'")
+    return base64.b64encode(digest).decode("ascii") == expected
+
+
+def minify_css(css: str) -> str:
+    """Remove comments and indentation from a stylesheet."""
+    css = CSS_COMMENT_RE.sub("", css)
+    return "\n".join(line.strip() for line in css.splitlines() if line.strip())
+
+
+def vendor_assets(
+    static_folder: str, fetch: Callable[[str], bytes] = fetch_url
+) -> List[str]:
+    """
+    Download the third party libraries into the vendor folder.
+
+    Each library is verified against its integrity hash. The files referenced
+    by the stylesheets (e.g. the FontAwesome webfonts) are downloaded as well
+    and the references are rewritten to the local copies. Thus, the libraries
+    can be served by flirror-web without any access to the CDNs. Returns the
+    paths of all written files.
+
+    Raises an AssetError if a library doesn't match its integrity hash.
+    """
+    vendor_folder = os.path.join(static_folder, VENDOR_FOLDER)
+    files_folder = os.path.join(vendor_folder, "files")
+    os.makedirs(files_folder, exist_ok=True)
+
+    written = []
+    for library in VENDOR_LIBRARIES:
+        LOGGER.debug("Downloading '%s' from '%s'", library.name, library.url)
+        data = fetch(library.url)
+        if library.integrity is not None and not check_integrity(
+            data, library.integrity
+        ):
+            raise AssetError(
+                f"The library '{library.name}' downloaded from '{library.url}' "
+                "doesn't match its integrity hash"
+            )
+
+        if library.name.endswith(".css"):
+            referenced_files: Dict[str, str] = {}
+
+            def replace_url(match):
+                url, fragment = urldefrag(match.group(2).strip())
+                if not url or url.startswith("data:"):
+                    return match.group(0)
+                url = urljoin(library.url, url)
+                if url not in referenced_files:
+                    path = urlsplit(url).path
+                    url_hash = hashlib.sha1(url.encode("utf-8")).hexdigest()[:8]
+                    filename = f"{url_hash}-{os.path.basename(path)}"
+                    file_path = os.path.join(files_folder, filename)
+                    LOGGER.debug("Downloading '%s' to '%s'", url, file_path)
+                    with open(file_path, "wb") as f:
+                        f.write(fetch(url))
+                    written.append(file_path)
+                    referenced_files[url] = filename
+                # The path is relative to both, the vendor and the assets folder
+                local_url = f"../{VENDOR_FOLDER}/files/{referenced_files[url]}"
+                if fragment:
+                    local_url = f"{local_url}#{fragment}"
+                return f'url("{local_url}")'
+
+            css = CSS_URL_RE.sub(replace_url, data.decode("utf-8"))
+            data = css.encode("utf-8")
+
+        path = os.path.join(vendor_folder, library.name)
+        with open(path, "wb") as f:
+            f.write(data)
+        written.append(path)
+    return written
+
+
+def bundle_vendor_libraries(static_folder: str) -> Dict[str, bytes]:
+    """
+    Concatenate the vendored libraries to their bundles.
+
+    Bundles whose libraries were not vendored (completely) are skipped.
+    """
+    vendor_folder = os.path.join(static_folder, VENDOR_FOLDER)
+    libraries: Dict[str, List[VendorLibrary]] = {}
+    for library in VENDOR_LIBRARIES:
+        libraries.setdefault(library.bundle, []).append(library)
+
+    bundles = {}
+    for bundle, bundle_libraries in libraries.items():
+        parts = []
+        for library in bundle_libraries:
+            try:
+                with open(os.path.join(vendor_folder, library.name), "rb") as f:
+                    parts.append(f.read())
+            except FileNotFoundError:
+                LOGGER.debug("Library '%s' was not vendored yet", library.name)
+                break
+        else:
+            if bundle.endswith(".css"):
+                css = "\n".join(part.decode("utf-8") for part in parts)
+                bundles[bundle] = minify_css(css).encode("utf-8")
+            else:
+                # The semicolon terminates libraries without trailing semicolon
+                bundles[bundle] = b"\n;\n".join(parts)
+    return bundles
+
+
+def build_assets(static_folder: str) -> Dict[str, str]:
+    """
+    Compile the stylesheets and write them to fingerprinted files.
+
+    Each compiled stylesheet is written to the assets folder with its content
+    hash in the filename (e.g. "dist/all.0123456789ab.css"). The same applies
+    to the bundles of the vendored libraries (see vendor_assets()). A manifest
+    maps the assets' names to these files, so the templates can look them
+    up via asset_url(). Outdated files from previous builds are removed.
+
+    Returns the manifest.
+    """
+    assets_folder = os.path.join(static_folder, ASSETS_FOLDER)
+    os.makedirs(assets_folder, exist_ok=True)
+
+    assets = {}
+    for name, source in SCSS_BUNDLES.items():
+        LOGGER.debug("Compiling '%s' to '%s'", source, name)
+        css = compile_scss(os.path.join(static_folder, source))
+        assets[name] = css.encode("utf-8")
+    assets.update(bundle_vendor_libraries(static_folder))
+
+    manifest = {}
+    for name, data in assets.items():
+        content_hash = hashlib.sha256(data).hexdigest()[:12]
+        base, extension = os.path.splitext(name)
+        filename = f"{base}.{content_hash}{extension}"
+        with open(os.path.join(assets_folder, filename), "wb") as f:
+            f.write(data)
+        manifest[name] = f"{ASSETS_FOLDER}/{filename}"
+
+    # Remove the outdated files (including their precompressed copies)
+    current_files = {os.path.basename(filename) for filename in manifest.values()}
+    for filename in os.listdir(assets_folder):
+        original = filename
+        for extension in PRECOMPRESSED_EXTENSIONS.values():
+            if filename.endswith(extension):
+                original = filename[: -len(extension)]
+        if original not in current_files and original != ASSETS_MANIFEST:
+            os.unlink(os.path.join(assets_folder, filename))
+
+    # Replace the manifest atomically, so a running flirror-web never reads
+    # a partially written one.
+    manifest_path = os.path.join(assets_folder, ASSETS_MANIFEST)
+    fd, tmp_path = tempfile.mkstemp(dir=assets_folder, prefix=".manifest-")
+    with os.fdopen(fd, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+def load_assets_manifest(static_folder: str) -> Dict[str, str]:
+    """Load the manifest written by build_assets() (if there is any)."""
+    manifest_path = os.path.join(static_folder, ASSETS_FOLDER, ASSETS_MANIFEST)
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError:
+        LOGGER.warning("Ignoring invalid assets manifest '%s'", manifest_path)
+        return {}
+
+
+class StaticFiles:
+    """
+    Serve the static files with content hashed URLs and precompressed copies.
+
+    URLs built via url_for("static", ...) get the content hash of the file
+    appended as "v" parameter. Requests with the current hash can be cached by
+    the browser forever, as a changed file results in a different URL.
+
+    Each file is only hashed again once it was modified. If an up-to-date
+    precompressed copy (see compress_static()) exists for an encoding the
+    client accepts, it's served instead of the original file.
+    """
+
+    def __init__(self, static_folder: str) -> None:
+        self.static_folder = static_folder
+        # Precompressed files don't require the packages to be installed
+        self.encodings = list(PRECOMPRESSED_EXTENSIONS)
+        self._hashes: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+    def get_hash(self, filename: str) -> Optional[str]:
+        path = safe_join(self.static_folder, filename)
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        identity = (stat.st_mtime_ns, stat.st_size)
+        cached = self._hashes.get(filename)
+        if cached is None or cached[0] != identity:
+            cached = (identity, file_hash(path))
+            self._hashes[filename] = cached
+        return cached[1]
+
+    def inject_hash(self, endpoint: str, values: Dict) -> None:
+        """Add the content hash to the URL of a static file (url_defaults)."""
+        if endpoint != "static" or "v" in values:
+            return
+        filename = values.get("filename")
+        if filename is None:
+            return
+        content_hash = self.get_hash(filename)
+        if content_hash is not None:
+            values["v"] = content_hash
+
+    def send(self, filename: str, cache_timeout: Optional[int] = None) -> Response:
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+        response = None
+        encoding = choose_encoding(request.accept_encodings, self.encodings)
+        if encoding is not None:
+            compressed_filename = filename + PRECOMPRESSED_EXTENSIONS[encoding]
+            if self._is_up_to_date(filename, compressed_filename):
+                response = send_from_directory(
+                    self.static_folder,
+                    compressed_filename,
+                    mimetype=mimetype,
+                    cache_timeout=cache_timeout,
+                )
+                response.headers["Content-Encoding"] = encoding
+        if response is None:
+            response = send_from_directory(
+                self.static_folder, filename, cache_timeout=cache_timeout
+            )
+        response.vary.add("Accept-Encoding")
+
+        version = request.args.get("v")
+        if version is not None and version == self.get_hash(filename):
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+            response.expires = None
+        return response
+
+    def _is_up_to_date(self, filename: str, compressed_filename: str) -> bool:
+        """Check if the compressed file exists and is newer than the original."""
+        path = safe_join(self.static_folder, filename)
+        compressed_path = safe_join(self.static_folder, compressed_filename)
+        if path is None or compressed_path is None:
+            return False
+        try:
+            return os.stat(compressed_path).st_mtime_ns >= os.stat(path).st_mtime_ns
+        except OSError:
+            return False
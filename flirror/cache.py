@@ -0,0 +1,230 @@
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+from flirror.storage import StorageBackend
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SIZE = 128
+# Seconds after which a rendered template expires
+DEFAULT_RENDER_CACHE_TTL = 60
+
+# Sentinel to distinguish between a cache miss and a cached None value
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    A simple thread-safe least recently used (LRU) cache.
+
+    The cache holds at most max_size entries. Once this limit is reached, the
+    least recently used entry is evicted. Hits and misses are counted to allow
+    monitoring the efficiency of the cache.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+        }
+
+
+class StorageCache(LRUCache):
+    """
+    A read-through cache for objects stored in a storage backend.
+
+    As the data is written by a different process (the crawler), the cache
+    uses the data_version of the storage backend to detect changes (for SQLite,
+    this is SQLite's data_version, which changes whenever another connection
+    commits to the database). Checking it is much cheaper than reading and
+    decoding the objects themselves.
+
+    As the data_version is only comparable within the same thread, each entry
+    is tagged with a tick of a global counter taken before it was read. Every
+    thread remembers the tick at which it saw its current data_version for the
+    first time and only uses entries which were read afterwards. Thus, a
+    change detected by one thread (or a new thread) doesn't invalidate the
+    entries for all others, and a value read before a change can never be
+    served to a thread which already detected that change.
+
+    NOTE (felix): The objects returned from the cache are shared between all
+    callers and must not be modified.
+    """
+
+    def __init__(
+        self, storage: StorageBackend, max_size: int = DEFAULT_CACHE_SIZE
+    ) -> None:
+        super().__init__(max_size)
+        self.storage = storage
+        self._ticks = itertools.count()
+        # The data_version might be specific to each database connection and
+        # pony uses a separate connection per thread. Thus, we must remember
+        # the last data_version per thread.
+        self._local = threading.local()
+
+    def validate(self) -> Tuple[int, int]:
+        """
+        Check the storage for changes.
+
+        Returns the tick from which on entries are valid for the current thread
+        and the tick to tag newly read entries with.
+        """
+        data_version = self.storage.data_version()
+        with self._lock:
+            tick = next(self._ticks)
+        # The values from different connections are not comparable. Thus, the
+        # data_version of this thread's connection seen for the first time
+        # must be treated as a change as well.
+        if data_version != getattr(self._local, "data_version", _MISSING):
+            LOGGER.debug("Storage changed, ignoring entries read before")
+            self._local.data_version = data_version
+            self._local.valid_since = tick
+        return self._local.valid_since, tick
+
+    def _get_entry(self, key: str, valid_since: int) -> Any:
+        with self._lock:
+            entry = self.get(key)
+            if entry is None:
+                return _MISSING
+            value, tick = entry
+            if tick < valid_since:
+                # Count outdated entries as miss rather than as hit
+                self.hits -= 1
+                self.misses += 1
+                return _MISSING
+            return value
+
+    def _set_entry(self, key: str, value: Optional[Dict], tick: int) -> None:
+        with self._lock:
+            # Don't replace a value which was read more recently (e.g. by
+            # another thread which detected a change in the meantime).
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= tick:
+                self.set(key, (value, tick))
+
+    def get_object(self, key: str) -> Optional[Dict]:
+        valid_since, tick = self.validate()
+        value = self._get_entry(key, valid_since)
+        if value is _MISSING:
+            value = self.storage.get(key)
+            self._set_entry(key, value, tick)
+        return value
+
+    def get_objects(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        valid_since, tick = self.validate()
+        objects = {}
+        missing_keys = []
+        for key in keys:
+            value = self._get_entry(key, valid_since)
+            if value is _MISSING:
+                missing_keys.append(key)
+            elif value is not None:
+                objects[key] = value
+
+        if missing_keys:
+            missing_objects = self.storage.get_many(missing_keys)
+            for key in missing_keys:
+                self._set_entry(key, missing_objects.get(key), tick)
+            objects.update(missing_objects)
+        return objects
+
+
+class RenderCache(LRUCache):
+    """
+    A cache for rendered module templates.
+
+    The entries are keyed by the module ID, the template, the version of the
+    module's data and a hash of the module's config. Thus, a tile is rendered
+    only once per dataset, no matter how often (and by how many displays) it's
+    requested. As soon as the data or the config changes, the key changes as
+    well and the outdated entry is evicted eventually.
+
+    The rendered templates contain relative times (e.g. "5 minutes ago"),
+    which become wrong over time. Thus, each entry also expires after ttl
+    seconds.
+    """
+
+    def __init__(
+        self, max_size: int = DEFAULT_CACHE_SIZE, ttl: float = DEFAULT_RENDER_CACHE_TTL
+    ) -> None:
+        super().__init__(max_size)
+        self.ttl = ttl
+        self.expired = 0
+
+    @staticmethod
+    def make_key(
+        module_id: str,
+        template_name: str,
+        version: int,
+        config_hash: str,
+        object_key: Optional[str] = None,
+    ) -> Tuple[str, str, Optional[str], int, str]:
+        return (module_id, template_name, object_key, version, config_hash)
+
+    def get_template(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            entry = self.get(key)
+            if entry is None:
+                return None
+            template, expires = entry
+            if expires <= time.monotonic():
+                # Count expired entries as miss rather than as hit
+                self.hits -= 1
+                self.misses += 1
+                self.expired += 1
+                self.delete(key)
+                return None
+            return template
+
+    def set_template(self, key: Hashable, template: str) -> None:
+        self.set(key, (template, time.monotonic() + self.ttl))
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {**super().stats, "expired": self.expired}
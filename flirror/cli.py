@@ -0,0 +1,160 @@
+import os
+from typing import Optional, Tuple
+
+import click
+
+from flirror.assets import build_assets as _build_assets
+from flirror.assets import compress_static as _compress_static
+from flirror.assets import vendor_assets as _vendor_assets
+from flirror.exceptions import AssetError
+from flirror.modules import BUILTIN_MODULES
+from flirror.startup import measure_import_time
+
+STATIC_FOLDER = os.path.join(os.path.dirname(__file__), "static")
+
+
+@click.group()
+def main() -> None:
+    """Maintenance commands for a flirror installation."""
+
+
+@main.command("compress-static")
+@click.option(
+    "--static-folder",
+    default=STATIC_FOLDER,
+    show_default=True,
+    type=click.Path(exists=True, file_okay=False),
+    help="The folder containing the static files",
+)
+def compress_static(static_folder: str) -> None:
+    """
+    Precompress the static files.
+
+    flirror-web serves the precompressed files to clients that accept them.
+    Run this command again whenever the static files changed, outdated copies
+    are ignored.
+    """
+    written = _compress_static(static_folder)
+    click.echo(f"Wrote {len(written)} precompressed files to '{static_folder}'")
+
+
+@main.command("build-assets")
+@click.option(
+    "--static-folder",
+    default=STATIC_FOLDER,
+    show_default=True,
+    type=click.Path(exists=True, file_okay=False),
+    help="The folder containing the static files",
+)
+@click.option(
+    "--compress/--no-compress",
+    default=True,
+    show_default=True,
+    help="Precompress the static files afterwards",
+)
+def build_assets(static_folder: str, compress: bool) -> None:
+    """
+    Compile, minify and fingerprint the stylesheets and vendor bundles.
+
+    flirror-web serves the compiled stylesheets, so it doesn't have to compile
+    the SCSS sources at runtime (unless ASSETS_DEV_MODE is enabled). The
+    libraries downloaded via "vendor-assets" are bundled as well. Run this
+    command again whenever the SCSS sources changed.
+    """
+    manifest = _build_assets(static_folder)
+    for name, filename in manifest.items():
+        click.echo(f"Compiled '{name}' to '{filename}'")
+    if compress:
+        written = _compress_static(static_folder)
+        click.echo(f"Wrote {len(written)} precompressed files to '{static_folder}'")
+
+
+@main.command("vendor-assets")
+@click.option(
+    "--static-folder",
+    default=STATIC_FOLDER,
+    show_default=True,
+    type=click.Path(exists=True, file_okay=False),
+    help="The folder containing the static files",
+)
+@click.pass_context
+def vendor_assets(ctx: click.Context, static_folder: str) -> None:
+    """
+    Download the third party libraries and bundle them.
+
+    Afterwards, flirror-web serves the libraries (like Bootstrap, jQuery and
+    Chart.js) locally instead of loading them from the CDNs, so the mirror
+    also works without internet access.
+    """
+    try:
+        written = _vendor_assets(static_folder)
+    except (AssetError, OSError) as e:
+        raise click.ClickException(f"Could not vendor the libraries: {e}")
+    click.echo(f"Downloaded {len(written)} files to '{static_folder}'")
+    ctx.invoke(build_assets, static_folder=static_folder, compress=True)
+
+
+@main.command("startup-time")
+@click.option(
+    "--precompile/--no-precompile",
+    default=None,
+    help="Precompile the templates (overrides PRECOMPILE_TEMPLATES)",
+)
+def startup_time(precompile: Optional[bool]) -> None:
+    """
+    Report how long it takes to start flirror-web.
+
+    The app is created like in a gunicorn worker (using the settings file from
+    FLIRROR_SETTINGS) and the time spent in each phase of the startup is
+    reported. Run it twice to see the effect of the template bytecode cache.
+    """
+    # NOTE (felix): Import it here, so the other commands don't depend on the
+    # settings file and all modules' dependencies.
+    from flirror import create_web
+
+    config = {}
+    if precompile is not None:
+        config["PRECOMPILE_TEMPLATES"] = precompile
+    app = create_web(config)
+    click.echo(app.extensions["startup_timer"].report())
+
+
+@main.command("import-time")
+@click.option(
+    "--top",
+    default=5,
+    show_default=True,
+    help="The number of the slowest imports to list for each module",
+)
+@click.argument("modules", nargs=-1)
+def import_time(modules: Tuple[str, ...], top: int) -> None:
+    """
+    Report how long it takes to import flirror and its modules.
+
+    MODULES are the names of flirror modules (e.g. "weather") or python
+    modules. Each one is imported in a new python process after flirror itself,
+    so only its own imports count. Without any arguments, flirror and all
+    built-in modules are measured.
+    """
+    if not modules:
+        modules = ("flirror",) + tuple(BUILTIN_MODULES)
+
+    for name in modules:
+        module_name = name
+        if name in BUILTIN_MODULES:
+            module_name = BUILTIN_MODULES.import_paths[name].partition(":")[0]
+        preload = [] if module_name == "flirror" else ["flirror"]
+        try:
+            imports = measure_import_time(module_name, preload)
+        except ImportError as e:
+            click.echo(f"{name:<40} failed: {e}")
+            continue
+        total = imports[-1].cumulative_time if imports else 0
+        click.echo(f"{name:<40} {total / 1000:8.1f} ms")
+        slowest = sorted(imports, key=lambda i: i.self_time, reverse=True)[:top]
+        for entry in slowest:
+            click.echo(f"  {entry.name:<38} {entry.self_time / 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import gzip
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import Flask, request, Response
+from werkzeug.datastructures import Accept
+
+LOGGER = logging.getLogger(__name__)
+
+# Responses smaller than this (in bytes) are not worth to be compressed
+DEFAULT_COMPRESSION_MIN_SIZE = 500
+DEFAULT_COMPRESSION_MIMETYPES = ("application/json", "text/html")
+
+
+# brotli's default quality (11) is meant for offline compression and way too
+# slow to compress each response on the fly (e.g. on a Raspberry Pi).
+BROTLI_RESPONSE_QUALITY = 4
+
+
+def _brotli_compress(data: bytes, best: bool = False) -> bytes:
+    import brotli
+
+    if best:
+        return brotli.compress(data)
+    return brotli.compress(data, quality=BROTLI_RESPONSE_QUALITY)
+
+
+def _gzip_compress(data: bytes, best: bool = False) -> bytes:
+    # The default level 9 is much slower, but barely compresses any better
+    return gzip.compress(data, compresslevel=9 if best else 6)
+
+
+# Each content encoding is defined by its compress function and the python
+# package that is necessary to use it (None for the standard library). The
+# encodings are listed in order of preference. The compress functions use the
+# best (but slowest) compression only if asked to (e.g. for the static files,
+# which are compressed once at build time).
+ENCODINGS: Dict[str, Tuple[Callable[..., bytes], Optional[str]]] = {
+    "br": (_brotli_compress, "brotli"),
+    "gzip": (_gzip_compress, None),
+}
+
+
+def available_encodings() -> List[str]:
+    """Get the content encodings whose packages are installed."""
+    encodings = []
+    for encoding, (_, package) in ENCODINGS.items():
+        if package is not None:
+            try:
+                __import__(package)
+            except ImportError:
+                LOGGER.debug(
+                    "Content encoding '%s' requires the '%s' package", encoding, package
+                )
+                continue
+        encodings.append(encoding)
+    return encodings
+
+
+def choose_encoding(
+    accept_encodings: Accept, encodings: Iterable[str]
+) -> Optional[str]:
+    """Choose the preferred encoding that is accepted by the client."""
+    for encoding in encodings:
+        if accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+class ResponseCompressor:
+    """
+    Compress responses (e.g. the rendered tiles) for clients that accept it.
+
+    Only responses of the given mimetypes and with at least min_size bytes are
+    compressed. Streamed responses (like the Server-Sent Events) and files
+    (which are precompressed, see flirror.assets) are left untouched.
+    """
+
+    def __init__(
+        self,
+        min_size: int = DEFAULT_COMPRESSION_MIN_SIZE,
+        mimetypes: Iterable[str] = DEFAULT_COMPRESSION_MIMETYPES,
+        encodings: Optional[Iterable[str]] = None,
+    ) -> None:
+        self.min_size = min_size
+        self.mimetypes = set(mimetypes)
+        if encodings is None:
+            encodings = available_encodings()
+        self.encodings = list(encodings)
+
+    def init_app(self, app: Flask) -> None:
+        app.after_request(self.compress)
+
+    def compress(self, response: Response) -> Response:
+        if (
+            response.direct_passthrough
+            or response.is_streamed
+            or response.status_code not in range(200, 300)
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in self.mimetypes
+        ):
+            return response
+
+        # The response depends on the Accept-Encoding header, even if it's not
+        # compressed.
+        response.vary.add("Accept-Encoding")
+        encoding = choose_encoding(request.accept_encodings, self.encodings)
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        compress, _ = ENCODINGS[encoding]
+        response.set_data(compress(data))
+        response.headers["Content-Encoding"] = encoding
+        # The compressed body is not byte-for-byte identical to the
+        # uncompressed one, so the entity tag is only weakly valid.
+        etag, weak = response.get_etag()
+        if etag is not None and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,193 @@
+import hashlib
+import json
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from flirror.exceptions import FlirrorConfigError
+from flirror.utils import INTERVAL_METHODS, parse_interval_string
+
+DEFAULT_CRAWLER_INTERVAL = "5m"
+
+
+class ModuleConfig:
+    """
+    The validated configuration of a single module.
+
+    All values are resolved once when the configuration is loaded, so looking
+    them up doesn't require any further parsing. Instances are immutable.
+    """
+
+    __slots__ = (
+        "id",
+        "module",
+        "config",
+        "display",
+        "position",
+        "interval_string",
+        "interval",
+        "config_hash",
+    )
+
+    id: str
+    # The name of the module (e.g. "weather")
+    module: str
+    config: Dict[str, Any]
+    display: Dict[str, Any]
+    position: Optional[Any]
+    interval_string: str
+    # The parsed crawler interval as (interval, unit)
+    interval: Tuple[int, str]
+    # Changes whenever anything in the module's configuration changes
+    config_hash: str
+
+    def __init__(self, **values: Any) -> None:
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} id='{self.id}' module='{self.module}'>"
+
+    @classmethod
+    def from_dict(cls, module_config: Dict[str, Any]) -> "ModuleConfig":
+        """Validate a module configuration from the config file."""
+        if not isinstance(module_config, dict):
+            raise FlirrorConfigError(
+                f"Invalid module configuration '{module_config}'. Each module must "
+                "be configured as dictionary."
+            )
+
+        module_id = module_config.get("id")
+        if not module_id or not isinstance(module_id, str):
+            raise FlirrorConfigError(
+                f"Module configuration '{module_config}' is missing an 'id'"
+            )
+
+        # TODO (felix): Remove this fallback in a later future version
+        module_name = module_config.get("module") or module_config.get("type")
+        if not module_name:
+            raise FlirrorConfigError(
+                f"Module configuration for ID '{module_id}' is missing a 'module'"
+            )
+
+        config = module_config.get("config") or {}
+        display = module_config.get("display") or {}
+        crawler = module_config.get("crawler") or {}
+
+        interval_string = crawler.get("interval", DEFAULT_CRAWLER_INTERVAL)
+        interval = parse_interval_string(interval_string)
+        if interval[1] not in INTERVAL_METHODS:
+            raise FlirrorConfigError(
+                f"Invalid crawler interval '{interval_string}' for module with ID "
+                f"'{module_id}'. Supported units are: {', '.join(INTERVAL_METHODS)}"
+            )
+
+        config_hash = hashlib.sha1(
+            json.dumps(module_config, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+        return cls(
+            id=module_id,
+            module=module_name,
+            config=config,
+            display=display,
+            position=display.get("position"),
+            interval_string=interval_string,
+            interval=interval,
+            config_hash=config_hash,
+        )
+
+
+class ModuleConfigRegistry:
+    """
+    All module configurations from the config file, indexed by their ID.
+
+    The registry is built once when the app is created. Besides the lookup by
+    ID, it provides the layout of the index page: the modules grouped by their
+    position (in ascending order), followed by the modules without position.
+    """
+
+    __slots__ = ("_modules", "_by_id", "layout", "unpositioned", "config_hash")
+
+    _modules: Tuple[ModuleConfig, ...]
+    _by_id: Mapping[str, ModuleConfig]
+    # Maps each position to the modules placed there
+    layout: Mapping[Any, Tuple[ModuleConfig, ...]]
+    unpositioned: Tuple[ModuleConfig, ...]
+    # Changes whenever the configuration of any module changes
+    config_hash: str
+
+    def __init__(self, module_configs: Iterable[ModuleConfig]) -> None:
+        modules = tuple(module_configs)
+        by_id: Dict[str, ModuleConfig] = {}
+        positioned: Dict[Any, List[ModuleConfig]] = {}
+        unpositioned = []
+        for module_config in modules:
+            if module_config.id in by_id:
+                raise FlirrorConfigError(
+                    f"Module ID '{module_config.id}' is configured more than once"
+                )
+            by_id[module_config.id] = module_config
+            if module_config.position is not None:
+                positioned.setdefault(module_config.position, []).append(module_config)
+            else:
+                unpositioned.append(module_config)
+
+        try:
+            positions = sorted(positioned)
+        except TypeError:
+            raise FlirrorConfigError(
+                "Could not sort modules by position. All positions must be of the "
+                "same type."
+            )
+        layout = OrderedDict(
+            (position, tuple(positioned[position])) for position in positions
+        )
+
+        object.__setattr__(self, "_modules", modules)
+        object.__setattr__(self, "_by_id", MappingProxyType(by_id))
+        object.__setattr__(self, "layout", MappingProxyType(layout))
+        object.__setattr__(self, "unpositioned", tuple(unpositioned))
+        object.__setattr__(
+            self,
+            "config_hash",
+            hashlib.sha1(
+                "".join(m.config_hash for m in modules).encode("utf-8")
+            ).hexdigest(),
+        )
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    @classmethod
+    def from_config(
+        cls, modules: Optional[Iterable[Dict[str, Any]]]
+    ) -> "ModuleConfigRegistry":
+        """
+        Validate and compile the MODULES setting.
+
+        Raises a FlirrorConfigError if any module is configured incorrectly.
+        """
+        if modules is None:
+            modules = []
+        if not isinstance(modules, (list, tuple)):
+            raise FlirrorConfigError("The MODULES setting must be a list")
+        return cls(ModuleConfig.from_dict(module_config) for module_config in modules)
+
+    def get(self, module_id: str) -> Optional[ModuleConfig]:
+        return self._by_id.get(module_id)
+
+    def __getitem__(self, module_id: str) -> ModuleConfig:
+        return self._by_id[module_id]
+
+    def __contains__(self, module_id: object) -> bool:
+        return module_id in self._by_id
+
+    def __iter__(self) -> Iterator[ModuleConfig]:
+        return iter(self._modules)
+
+    def __len__(self) -> int:
+        return len(self._modules)
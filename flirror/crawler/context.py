@@ -0,0 +1,98 @@
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from flask.config import Config
+
+import flirror
+from flirror import configure_storage, Flirror, FLIRROR_SETTINGS_ENV
+from flirror.config import ModuleConfigRegistry
+from flirror.modules import FlirrorModule
+from flirror.plugins import default_plugin_cache_file
+from flirror.startup import StartupTimer
+from flirror.storage import StorageBackend
+from flirror.utils import find_modules
+
+LOGGER = logging.getLogger(__name__)
+
+
+class CrawlerContext:
+    """
+    The headless counterpart of the Flirror app for the crawler.
+
+    Crawlers receive it as their app argument. It provides the same API to
+    access the configuration and the module data (config, module_configs,
+    extensions["storage"], store_module_data() and get_module_data()), but
+    doesn't build a Flask app with blueprints, template folders and a jinja
+    environment the crawler never uses.
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.config = config
+        self.extensions: Dict[str, Any] = {}
+        self.modules: Dict[str, FlirrorModule] = {}
+
+    @property
+    def storage(self) -> StorageBackend:
+        return self.extensions["storage"]
+
+    @property
+    def module_configs(self) -> ModuleConfigRegistry:
+        return self.extensions["module_configs"]
+
+    def configure_modules(self) -> None:
+        """Validate and compile the MODULES setting and load the used modules."""
+        self.extensions["module_configs"] = ModuleConfigRegistry.from_config(
+            self.config.get("MODULES")
+        )
+        self.load_modules()
+
+    def load_modules(self) -> None:
+        names = [m.module for m in self.module_configs if m.module not in self.modules]
+        cache_file = self.config.get("PLUGIN_CACHE_FILE", default_plugin_cache_file())
+        self.modules.update(find_modules(names, cache_file))
+
+    get_module_object_key = staticmethod(Flirror.get_module_object_key)
+
+    def store_module_data(
+        self, module_id: str, data: Dict[str, Any], object_key: Optional[str] = None
+    ) -> None:
+        self.storage.put(self.get_module_object_key(module_id, object_key), data)
+
+    def get_module_data(
+        self, module_id: str, object_key: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        return self.storage.get(self.get_module_object_key(module_id, object_key))
+
+
+def create_crawler_context(config: Optional[Dict] = None) -> CrawlerContext:
+    """
+    Load the configuration file and initialize the crawler's context with the
+    configured modules and the storage backend.
+
+    This does the same as flirror.create_app() without creating a Flask app.
+    """
+    timer = StartupTimer()
+
+    # Resolve relative paths like a Flirror app would do
+    settings = Config(os.path.dirname(os.path.abspath(flirror.__file__)))
+    settings.from_envvar(FLIRROR_SETTINGS_ENV)
+    if config is not None:
+        settings.from_mapping(config)
+    context = CrawlerContext(settings)
+    timer.lap("configuration")
+
+    context.configure_modules()
+    timer.lap("modules")
+
+    configure_storage(context.extensions, settings)
+    timer.lap("storage")
+    context.extensions["startup_timer"] = timer
+
+    report = timer.report()
+    if settings.get("STARTUP_TIMING", False):
+        LOGGER.info(report)
+    else:
+        LOGGER.debug(report)
+
+    return context
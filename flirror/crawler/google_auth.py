@@ -2,8 +2,9 @@ import base64
 import logging
 import os
 import time
+import warnings
 from io import BytesIO
-from typing import Dict, List, Optional
+from typing import cast, Dict, List, Optional
 
 import qrcode
 import requests
@@ -11,8 +12,8 @@ from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
 from pony.orm import Database
 
-from flirror.database import get_object_by_key, store_object_by_key
 from flirror.exceptions import GoogleOAuthError
+from flirror.storage import SQLiteBackend, StorageBackend
 
 LOGGER = logging.getLogger(__name__)
 
@@ -24,17 +25,30 @@ class GoogleOAuth:
 
     # We could use the class object to store the active token in the session
     # and check this one first for expiry, before retrieving a new one and store
-    # that in the database and session.
+    # that in the storage and session.
     def __init__(
         self,
-        database: Database,
+        storage: Optional[StorageBackend] = None,
         scopes: Optional[List[str]] = None,
         module_object_key: Optional[str] = None,
+        database: Optional[Database] = None,
     ) -> None:
+        if database is not None:
+            warnings.warn(
+                "The 'database' argument of GoogleOAuth is deprecated, use "
+                "'storage' instead",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+            storage = database
+        # Still accept a pony database (e.g. passed positionally)
+        if isinstance(storage, Database):
+            storage = SQLiteBackend(storage)
         if scopes is None:
             scopes = []
         self.scopes = scopes
-        self.database = database
+        # The storage is only optional for the deprecated database argument
+        self.storage = cast(StorageBackend, storage)
         self.module_object_key = module_object_key
 
     def get_credentials(self) -> Optional[Credentials]:
@@ -61,7 +75,7 @@ class GoogleOAuth:
 
         # The most common case is to refresh an existing token, so there should
         # already be an existing database entry that we can update
-        token_obj = get_object_by_key(self.database, "google_oauth_token")
+        token_obj = self.storage.get("google_oauth_token")
         if token_obj is None:
             LOGGER.debug("Could not find any access token. Requesting an initial one.")
             token = self.ask_for_access()
@@ -153,8 +167,7 @@ class GoogleOAuth:
         qr_img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
 
         if self.module_object_key is not None:
-            store_object_by_key(
-                self.database,
+            self.storage.put(
                 key=self.module_object_key,
                 value={
                     "_timestamp": now,
@@ -217,7 +230,7 @@ class GoogleOAuth:
         return result
 
     def _store_access_token(self, token_data: Dict) -> None:
-        store_object_by_key(self.database, key="google_oauth_token", value=token_data)
+        self.storage.put(key="google_oauth_token", value=token_data)
 
     def _get_oauth_flow(self) -> Flow:
         client_secret_file = os.environ.get("GOOGLE_OAUTH_CLIENT_SECRET")
@@ -4,10 +4,9 @@ import os
 
 import click
 
-from flirror import create_app
+from flirror.crawler.context import create_crawler_context
 from flirror.crawler.scheduling import SafeScheduler
 
-
 LOGGER = logging.getLogger(__name__)
 
 
@@ -42,7 +41,8 @@ def configure_logger(verbosity: str) -> None:
 def main(ctx, verbosity: str) -> None:
     configure_logger(verbosity)
 
-    app = create_app()
+    # The crawler doesn't serve anything, so it doesn't need a Flask app
+    app = create_crawler_context()
 
     # Store everything in click's context object to be available for subcommands
     ctx.obj = {"app": app}
@@ -66,11 +66,9 @@ def crawl(ctx, module: str, periodic: bool) -> None:
 
     app = ctx.obj["app"]
 
-    config_modules = app.config.get("MODULES", [])
-
     if module:
         # Filter crawlers for provided module IDs
-        crawler_configs = [m for m in config_modules if m["id"] in module]
+        crawler_configs = [m for m in app.module_configs if m.id in module]
         # TODO If only a subset of the specified modules could be found,
         # log the remaining ones as "not found".
         if not crawler_configs:
@@ -79,7 +77,7 @@ def crawl(ctx, module: str, periodic: bool) -> None:
                 "found in the configuration file. Nothing to run."
             )
     else:
-        crawler_configs = config_modules
+        crawler_configs = list(app.module_configs)
 
     if not crawler_configs:
         raise click.ClickException(
@@ -89,10 +87,8 @@ def crawl(ctx, module: str, periodic: bool) -> None:
     scheduler = SafeScheduler()
     # Look up crawlers from config file
     for crawler_config in crawler_configs:
-        module_id = crawler_config.get("id")
-        # TODO (felix): Remove this fallback in a later future version
-        module_name = crawler_config.get("module") or crawler_config.get("type")
-        # TODO Error handling for wrong/missing keys
+        module_id = crawler_config.id
+        module_name = crawler_config.module
         LOGGER.info(
             "Initializing crawler of type '%s' with id '%s'", module_name, module_id
         )
@@ -119,11 +115,11 @@ def crawl(ctx, module: str, periodic: bool) -> None:
 
         # Create a copy of the function with prefilled arguments (id, config values)
         func = functools.partial(
-            crawler_callable, module_id=module_id, app=app, **crawler_config["config"]
+            crawler_callable, module_id=module_id, app=app, **crawler_config.config
         )
 
-        interval_string = crawler_config.get("crawler", {}).get("interval", "5m")
-        scheduler.add_job(func, module_id, interval_string)
+        # The interval was already parsed and validated when the config was loaded
+        scheduler.add_job(func, module_id, crawler_config.interval)
 
     # Do the actual crawling - periodically or not
     if periodic:
@@ -1,15 +1,12 @@
 import logging
 import time
 from datetime import datetime
-from typing import Callable
+from typing import Callable, Tuple, Union
 
 from schedule import Scheduler
 
 from flirror.exceptions import CrawlerDataError, FlirrorConfigError
-from flirror.utils import parse_interval_string
-
-
-INTERVAL_METHODS = {"s": "seconds", "m": "minutes", "h": "hours"}
+from flirror.utils import INTERVAL_METHODS, parse_interval_string
 
 LOGGER = logging.getLogger(__name__)
 
@@ -50,17 +47,24 @@ class SafeScheduler(Scheduler):
             job.last_run = datetime.now()
             job._schedule_next_run()
 
-    def add_job(self, job_func: Callable, job_id: str, interval_string: str) -> None:
-        # Get interval from crawler config, parse it and call appropriate methods
-        # in the schedule module
+    def add_job(
+        self, job_func: Callable, job_id: str, interval: Union[str, Tuple[int, str]],
+    ) -> None:
+        # Get interval from crawler config, parse it (unless it's already
+        # parsed) and call appropriate methods in the schedule module
+        if isinstance(interval, str):
+            interval_string = interval
+            try:
+                every, unit = parse_interval_string(interval_string)
+            except FlirrorConfigError as e:
+                LOGGER.error(str(e))
+                return None
+        else:
+            every, unit = interval
+            interval_string = f"{every}{unit}"
         LOGGER.info(
             "Adding job for crawler '%s' with interval '%s'", job_id, interval_string
         )
-        try:
-            interval, unit = parse_interval_string(interval_string)
-        except FlirrorConfigError as e:
-            LOGGER.error(str(e))
-            return None
 
         unit_method = INTERVAL_METHODS.get(unit)
         if unit_method is None:
@@ -71,7 +75,7 @@ class SafeScheduler(Scheduler):
             )
             return None
 
-        self._add_job(interval, unit_method, job_id, job_func)
+        self._add_job(every, unit_method, job_id, job_func)
 
     def _add_job(
         self, interval: int, unit_method_name: str, job_id: str, job_func: Callable
@@ -1,13 +1,69 @@
+import hashlib
+import json
 import logging
-from typing import Dict, Optional
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-from pony.orm import Database, db_session, Json, ObjectNotFound, PrimaryKey, Required
+from pony.orm import (
+    Database,
+    db_session,
+    Json,
+    ObjectNotFound,
+    Optional as OptionalAttr,
+    PrimaryKey,
+    Required,
+    select,
+)
 
+from flirror.exceptions import FlirrorConfigError
+from flirror.serialization import deserialize, Serializer
 
 LOGGER = logging.getLogger(__name__)
 
+# The connection profile which is applied to every SQLite connection.
+# Using the write-ahead log allows readers (flirror-web) to continue reading
+# from the database while the crawler is writing to it.
+DEFAULT_SQLITE_PRAGMAS: Dict[str, Any] = {
+    "journal_mode": "wal",
+    # In WAL mode, NORMAL is safe from corruption and avoids a sync on every
+    # commit (which is expensive on SD cards).
+    "synchronous": "normal",
+    # Wait up to 5 secs for a lock instead of failing immediately
+    "busy_timeout": 5000,
+    # Negative values are interpreted as KiB, so this is 8 MiB
+    "cache_size": -8000,
+    # 32 MiB
+    "mmap_size": 33554432,
+}
 
-def create_database_and_entities(**db_params):
+# Columns that were added to the FlirrorObject table after its initial version.
+# Pony only creates missing tables, but doesn't add missing columns to
+# existing ones. Thus, we have to add them on our own.
+FLIRROR_OBJECT_MIGRATIONS = {
+    "checksum": "TEXT",
+    "version": "INTEGER NOT NULL DEFAULT 1",
+    "last_checked": "REAL",
+    "payload": "BLOB",
+}
+
+# Top-level keys starting with this prefix (e.g. "_timestamp") are expected to
+# change on every crawl and are thus ignored when calculating the checksum.
+VOLATILE_KEY_PREFIX = "_"
+
+
+def create_database_and_entities(
+    pragmas: Optional[Dict[str, Any]] = None, read_only: bool = False, **db_params
+):
+    """
+    Connect to the database and create the flirror entities.
+
+    The given pragmas are merged with the DEFAULT_SQLITE_PRAGMAS and applied
+    to every new SQLite connection. A pragma can be disabled by setting its
+    value to None.
+
+    If read_only is set, the database (and its tables) will still be created
+    if necessary, but every connection used afterwards is read-only.
+    """
     db: Database = Database()
 
     # How to use separated databases for prod and testing:
@@ -15,6 +71,30 @@ def create_database_and_entities(**db_params):
     class FlirrorObject(db.Entity):
         key = PrimaryKey(str)
         value = Required(Json)
+        # The checksum and version are only updated if the value changed.
+        # The last_checked timestamp is updated on every write.
+        checksum = OptionalAttr(str, nullable=True)
+        version = Required(int, default=1)
+        last_checked = OptionalAttr(float)
+        # Holds the binary representation of the value, if it's not stored as
+        # plain JSON. In that case, the value column only contains a marker
+        # describing how the payload is encoded.
+        payload = OptionalAttr(bytes)
+
+    connection_profile: Dict[str, Any] = {
+        "pragmas": get_sqlite_pragmas(pragmas),
+        "query_only": False,
+    }
+
+    # Pony uses a separate connection per thread, so we have to configure each
+    # new connection.
+    @db.on_connect(provider="sqlite")
+    def configure_connection(db, connection):
+        configure_sqlite_connection(
+            connection,
+            connection_profile["pragmas"],
+            query_only=connection_profile["query_only"],
+        )
 
     LOGGER.debug(
         "Creating new database connection with the following parameters: %s", db_params
@@ -22,33 +102,264 @@ def create_database_and_entities(**db_params):
     # Connect to the database and create it if it doesn't exist
     db.bind(**db_params)
 
+    migrate_flirror_objects(db)
+
     # Create the tables if they don't exist
     db.generate_mapping(create_tables=True)
 
+    if read_only:
+        LOGGER.debug("Reconnecting to the database in read-only mode")
+        # Creating the tables requires a writable connection. Thus, we have to
+        # drop this connection, so all following ones will be read-only.
+        connection_profile["query_only"] = True
+        db.disconnect()
+
     return db
 
 
+def get_sqlite_pragmas(pragmas: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Merge the given pragmas with the default ones and validate them."""
+    merged_pragmas = {**DEFAULT_SQLITE_PRAGMAS, **(pragmas or {})}
+    for name in merged_pragmas:
+        # The pragmas are formatted directly into the SQL statement as SQLite
+        # doesn't support parameters for them.
+        if not name.isidentifier():
+            raise FlirrorConfigError(f"Invalid SQLite pragma '{name}'")
+    return {name: value for name, value in merged_pragmas.items() if value is not None}
+
+
+def configure_sqlite_connection(
+    connection, pragmas: Dict[str, Any], query_only: bool = False
+) -> None:
+    """Apply the given pragmas to a (DB-API) SQLite connection."""
+    cursor = connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    if query_only:
+        cursor.execute("PRAGMA query_only = ON")
+    cursor.close()
+
+
+@db_session
+def migrate_flirror_objects(db: Database) -> None:
+    """Add missing columns to an existing FlirrorObject table."""
+    columns = {row[1] for row in db.execute('PRAGMA table_info("FlirrorObject")')}
+    for statement in get_flirror_object_migrations(columns):
+        db.execute(statement)
+
+
+def get_flirror_object_migrations(columns: Set[str]) -> List[str]:
+    """
+    Get the statements to add missing columns to an existing FlirrorObject
+    table with the given columns.
+    """
+    # If the table doesn't exist yet, it will be created with all columns.
+    if not columns:
+        return []
+
+    statements = []
+    for column, definition in FLIRROR_OBJECT_MIGRATIONS.items():
+        if column not in columns:
+            LOGGER.info("Adding column '%s' to table 'FlirrorObject'", column)
+            statements.append(
+                f'ALTER TABLE "FlirrorObject" ADD COLUMN "{column}" {definition}'
+            )
+    return statements
+
+
+def calculate_checksum(value: Dict) -> str:
+    """
+    Calculate a checksum for the content of the given value.
+
+    Volatile top-level fields like the "_timestamp" are not taken into account.
+    Thus, two crawls returning the same data result in the same checksum.
+    """
+    content = {k: v for k, v in value.items() if not k.startswith(VOLATILE_KEY_PREFIX)}
+    serialized = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(serialized.encode("utf-8"), digest_size=16).hexdigest()
+
+
 @db_session
-def store_object_by_key(db: Database, key: str, value: Dict) -> None:
+def store_object_by_key(
+    db: Database, key: str, value: Dict, serializer: Optional[Serializer] = None
+) -> bool:
+    """
+    Store the value for the given key in the database.
+
+    The serializer defines how the value is stored. By default, it's stored as
+    plain JSON.
+
+    If the content of the value didn't change since the last write, only the
+    last_checked timestamp of the existing entry is updated.
+
+    Returns True if the value was written, False otherwise.
+    """
     # TODO Store timezone aware dates in the database. Most probably, we must
     # provide a custom JSON serializer to pony orm (how can we do that?) to
     # store datetime objects rather than plain timestamps in the database.
+    if serializer is None:
+        serializer = Serializer()
+
+    checksum = calculate_checksum(value)
+    stored_value, payload = serializer.serialize(value)
+    # Prefer the crawl timestamp provided by the value itself
+    now = value.get("_timestamp", time.time())
     try:
         LOGGER.debug("Updating object with key '%s' in database", key)
         # The most common case is to update an existing entry.
-        db.FlirrorObject[key].value = value
+        obj = db.FlirrorObject[key]
+        obj.last_checked = now
+        # Also rewrite unchanged values if they are stored in a different
+        # format. This way, existing entries are migrated to the configured
+        # serialization.
+        if obj.checksum == checksum and _has_same_format(obj, stored_value, payload):
+            LOGGER.debug("Object with key '%s' did not change, skip update", key)
+            return False
+        obj.value = stored_value
+        obj.payload = payload
+        obj.checksum = checksum
+        obj.version += 1
     except ObjectNotFound:
         LOGGER.debug("Object with key '%s' not found, creating a new one", key)
         # If no entry could be found (e.g. calling a crawler for the first time,
         # requesting an initial access token), we have to create one
-        db.FlirrorObject(key=key, value=value)
+        db.FlirrorObject(
+            key=key,
+            value=stored_value,
+            payload=payload,
+            checksum=checksum,
+            last_checked=now,
+        )
+    return True
 
 
 @db_session
 def get_object_by_key(db: Database, key: str) -> Optional[Dict]:
     try:
         LOGGER.debug("Getting object with key '%s' from database", key)
-        return db.FlirrorObject[key].value
+        return _get_value(db.FlirrorObject[key])
     except ObjectNotFound:
         LOGGER.error("Could not get object with key '%s'", key)
         return None
+
+
+@db_session
+def delete_object_by_key(db: Database, key: str) -> None:
+    LOGGER.debug("Deleting object with key '%s' from database", key)
+    obj = db.FlirrorObject.get(key=key)
+    if obj is not None:
+        obj.delete()
+
+
+@db_session
+def get_object_versions(db: Database, keys: Iterable[str]) -> Dict[str, int]:
+    """
+    Get the versions for multiple keys in a single database query.
+
+    The version is increased whenever the content of an object changes. As
+    only the versions are retrieved, this is much cheaper than retrieving and
+    comparing the objects themselves.
+    """
+    keys = list(keys)
+    if not keys:
+        return {}
+
+    versions = select((o.key, o.version) for o in db.FlirrorObject if o.key in keys)
+    return dict(versions)
+
+
+@db_session
+def get_object_last_checked(db: Database, keys: Iterable[str]) -> Dict[str, float]:
+    """
+    Get the last_checked timestamps for multiple keys in a single query.
+
+    Objects without a last_checked timestamp are not part of the result.
+    """
+    keys = list(keys)
+    if not keys:
+        return {}
+
+    timestamps = select(
+        (o.key, o.last_checked)
+        for o in db.FlirrorObject
+        if o.key in keys and o.last_checked is not None
+    )
+    return dict(timestamps)
+
+
+@db_session
+def get_objects_by_keys(db: Database, keys: Iterable[str]) -> Dict[str, Dict]:
+    """
+    Get the objects for multiple keys in a single database query.
+
+    Returns a dictionary mapping each key to its value. Keys that could not be
+    found in the database are not part of the result.
+    """
+    keys = list(keys)
+    if not keys:
+        return {}
+
+    LOGGER.debug("Getting objects with keys '%s' from database", "', '".join(keys))
+    objects = select(o for o in db.FlirrorObject if o.key in keys)
+    return {o.key: _get_value(o) for o in objects}
+
+
+@db_session
+def iter_objects_by_prefix(db: Database, prefix: str) -> Iterator[Tuple[str, Dict]]:
+    """
+    Iterate over all objects whose key starts with the given prefix.
+
+    All matching objects are retrieved with a single database query, e.g.
+    iter_objects_by_prefix(db, "module.") yields the data of every module.
+    """
+    LOGGER.debug("Getting objects with key prefix '%s' from database", prefix)
+    objects = select(o for o in db.FlirrorObject if o.key.startswith(prefix))
+    # Fetch everything at once, so the query is not evaluated lazily outside
+    # of the db_session.
+    for obj in objects.order_by(lambda o: o.key)[:]:
+        yield obj.key, _get_value(obj)
+
+
+@db_session
+def get_data_version(db: Database) -> int:
+    """
+    Get SQLite's data_version for the current connection.
+
+    The value changes whenever any other connection (e.g. from the crawler
+    process) commits a change to the database. The values are only comparable
+    for the same connection.
+    """
+    # NOTE (felix): Use the table-valued pragma function rather than a plain
+    # 'PRAGMA data_version' so pony doesn't start a write transaction for it.
+    return db.select("data_version FROM pragma_data_version")[0]
+
+
+def _has_same_format(obj, stored_value: Dict, payload: Optional[bytes]) -> bool:
+    if payload is None:
+        return obj.payload is None
+    # For encoded values, the stored value is the marker describing the format
+    return obj.payload is not None and obj.value == stored_value
+
+
+def _get_value(obj) -> Dict:
+    value = deserialize(obj.value, obj.payload)
+    return refresh_timestamp(value, obj.last_checked)
+
+
+def refresh_timestamp(value: Dict, last_checked: Optional[float]) -> Dict:
+    """
+    Update the "_timestamp" of a value that was not written during the last
+    check(s).
+
+    If the content didn't change during the last write(s), the "_timestamp"
+    of the stored value is outdated. As this timestamp is used to show when
+    the data was crawled, we replace it with the timestamp of the last
+    (skipped) write.
+    """
+    if (
+        "_timestamp" in value
+        and last_checked is not None
+        and last_checked > value["_timestamp"]
+    ):
+        value = {**value, "_timestamp": last_checked}
+    return value
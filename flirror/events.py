@@ -0,0 +1,243 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import (
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from flirror.storage import StorageBackend
+
+LOGGER = logging.getLogger(__name__)
+
+# Seconds between two checks of the event log
+DEFAULT_POLL_INTERVAL = 0.5
+# Once the event log exceeds this size (in bytes), a new one is started
+DEFAULT_MAX_SIZE = 1024 * 1024
+
+
+class ChangeEvent(NamedTuple):
+    """Notifies that the value for key changed to the given version."""
+
+    key: str
+    version: int
+    timestamp: float
+
+
+class EventLog:
+    """
+    An append-only file of change events.
+
+    The crawler appends one JSON line per event, while any number of readers
+    (e.g. each gunicorn worker) can follow the file independently. Once the
+    file grows too large, it's moved to "<path>.1" and a new one is started.
+    Readers detect this by the changed inode, read the remaining events from
+    the old log and continue at the start of the new one.
+    """
+
+    def __init__(self, path: str, max_size: int = DEFAULT_MAX_SIZE) -> None:
+        self.path = path
+        self.max_size = max_size
+
+    def publish(self, key: str, version: int) -> ChangeEvent:
+        event = ChangeEvent(key, version, time.time())
+        line = json.dumps(event._asdict(), separators=(",", ":")) + "\n"
+
+        try:
+            if os.stat(self.path).st_size > self.max_size:
+                self._rotate()
+        except FileNotFoundError:
+            pass
+
+        LOGGER.debug("Publishing change event for key '%s' (%d)", key, version)
+        # A single write of a line opened in append mode won't be interleaved
+        # with other writes.
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+        return event
+
+    def _rotate(self) -> None:
+        LOGGER.debug("Starting a new event log in '%s'", self.path)
+        os.replace(self.path, f"{self.path}.1")
+
+
+class EventListener:
+    """
+    Follow an event log and pass new events to all subscribers.
+
+    The log is checked with a cheap stat() call in a background thread, which
+    is started with the first subscription. Only events published after the
+    listener was created are passed on.
+    """
+
+    def __init__(self, path: str, interval: float = DEFAULT_POLL_INTERVAL) -> None:
+        self.path = path
+        self.interval = interval
+        self._subscribers: List[Callable[[ChangeEvent], None]] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        # The inode of the current log and the position up to which it was
+        # read. Start at the end of an existing log.
+        self._inode: Optional[int] = None
+        self._position = 0
+        try:
+            stat = os.stat(path)
+            self._inode, self._position = stat.st_ino, stat.st_size
+        except FileNotFoundError:
+            pass
+
+    def subscribe(self, callback: Callable[[ChangeEvent], None]) -> Callable[[], None]:
+        """
+        Call the callback for each new event.
+
+        Returns a function to remove the subscription again.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+            if self._thread is None:
+                self._start()
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the background thread (and wait up to timeout secs for it)."""
+        self._stopped.set()
+        thread = self._thread
+        if timeout is not None and thread is not None:
+            thread.join(timeout)
+
+    def restart(self) -> None:
+        """
+        Start the background thread again after it was stopped.
+
+        Threads don't survive a fork, so a forked process (e.g. a gunicorn
+        worker of a preloaded app) has to call this to receive any events.
+        """
+        # The locks might have been held by another thread while forking
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        if self._subscribers:
+            self._start()
+
+    def _start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="flirror-event-listener", daemon=True
+        )
+        self._thread.start()
+
+    def read_events(self) -> List[ChangeEvent]:
+        """Read all events that were published since the last call."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+
+        events = []
+        if stat.st_ino != self._inode:
+            # The log was rotated. Read the remaining events from the old one
+            # (if we followed it) and continue with the new one from the start.
+            rotated_path = f"{self.path}.1"
+            try:
+                if os.stat(rotated_path).st_ino == self._inode:
+                    events.extend(self._read(rotated_path))
+            except FileNotFoundError:
+                pass
+            self._inode, self._position = stat.st_ino, 0
+        elif stat.st_size <= self._position:
+            return []
+
+        events.extend(self._read(self.path))
+        return events
+
+    def _read(self, path: str) -> List[ChangeEvent]:
+        with open(path, "rb") as f:
+            f.seek(self._position)
+            data = f.read()
+
+        # Only consume complete lines, the last one might still be written
+        end = data.rfind(b"\n") + 1
+        self._position += end
+
+        events = []
+        for line in data[:end].splitlines():
+            try:
+                events.append(ChangeEvent(**json.loads(line)))
+            except (ValueError, TypeError):
+                LOGGER.warning("Skipping invalid change event '%s'", line)
+        return events
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            events = self.read_events()
+            if not events:
+                continue
+            with self._lock:
+                subscribers = list(self._subscribers)
+            for event in events:
+                for callback in subscribers:
+                    try:
+                        callback(event)
+                    except Exception:
+                        LOGGER.exception("Failed to handle change event %s", event)
+
+
+class NotifyingBackend(StorageBackend):
+    """
+    Publish a change event whenever a value in the underlying storage changed.
+
+    Unchanged values (apart from volatile fields like the "_timestamp") don't
+    result in an event.
+    """
+
+    def __init__(self, storage: StorageBackend, event_log: EventLog) -> None:
+        self.storage = storage
+        self.event_log = event_log
+
+    def get(self, key: str) -> Optional[Dict]:
+        return self.storage.get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        return self.storage.get_many(keys)
+
+    def put(self, key: str, value: Dict) -> bool:
+        written = self.storage.put(key, value)
+        if written:
+            version = self.storage.get_versions([key]).get(key, 1)
+            self.event_log.publish(key, version)
+        return written
+
+    def delete(self, key: str) -> None:
+        self.storage.delete(key)
+        # A deleted value is announced with version 0
+        self.event_log.publish(key, 0)
+
+    def scan(self, prefix: str) -> Iterator[Tuple[str, Dict]]:
+        return self.storage.scan(prefix)
+
+    def get_versions(self, keys: Iterable[str]) -> Dict[str, int]:
+        return self.storage.get_versions(keys)
+
+    def get_last_checked(self, keys: Iterable[str]) -> Dict[str, float]:
+        return self.storage.get_last_checked(keys)
+
+    def data_version(self) -> Hashable:
+        return self.storage.data_version()
+
+    def close(self) -> None:
+        self.storage.close()
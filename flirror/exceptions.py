@@ -26,3 +26,9 @@ class FlirrorConfigError(Exception):
     """Exception if any config related value could not be evaluated."""
 
     pass
+
+
+class AssetError(Exception):
+    """Exception if an asset could not be vendored or built."""
+
+    pass
@@ -1,6 +1,6 @@
-from typing import Callable
+from typing import Any, Callable, Optional
 
-from flask import render_template
+from flask import current_app, json, render_template, request, Response
 
 
 def make_error_handler(template: str = "error.html") -> Callable:
@@ -11,3 +11,25 @@ def make_error_handler(template: str = "error.html") -> Callable:
         )
 
     return _handler
+
+
+def not_modified(etag: str) -> Optional[Response]:
+    """
+    Return an empty 304 response if the client already has the given version.
+
+    Otherwise, None is returned and the caller has to build the full response
+    (tagged with the same etag).
+    """
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def compact_jsonify(obj: Any) -> Response:
+    """Like jsonify(), but without any whitespace (even in debug mode)."""
+    return current_app.response_class(
+        json.dumps(obj, separators=(",", ":")) + "\n",
+        mimetype=current_app.config["JSONIFY_MIMETYPE"],
+    )
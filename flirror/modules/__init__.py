@@ -1,14 +1,64 @@
+import importlib
 import logging
-from typing import Any, Callable
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
 
 from flask import Blueprint
 
+from flirror.exceptions import FlirrorConfigError
+
 LOGGER = logging.getLogger(__name__)
 
 
 class FlirrorModule(Blueprint):
     _crawler = None
 
+    def __init__(
+        self,
+        name: str,
+        *args: Any,
+        template_name: Optional[str] = None,
+        required_assets: Optional[Callable[[Dict[str, Any]], Iterable[str]]] = None,
+        data_fields: Optional[Iterable[str]] = None,
+        config_fields: Iterable[str] = (),
+        renderer: Optional[str] = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(name, *args, **kwargs)
+        # Only modules declaring the template of their tile are loaded in
+        # batches via the /tiles endpoint, which renders it with the generic
+        # context. All others are still loaded via their own view (see view()).
+        self.batched = template_name is not None
+        # The template used to render the module's tile
+        if template_name is None:
+            template_name = f"{name}/index.html"
+        self.template_name = template_name
+        # Returns the optional vendor bundles (e.g. "charts.js") the module's
+        # tile needs for a given module config.
+        self.required_assets = required_assets
+        # The fields of the module's data the tile needs. Only these are sent
+        # to clients rendering the tile on their own (output=data).
+        self.data_fields = tuple(data_fields) if data_fields is not None else None
+        # The fields of the module's config the client-side renderer needs.
+        # The config is not sent completely, as it might contain credentials.
+        self.config_fields = tuple(config_fields)
+        # The script (in the module's static folder) which registers the
+        # module's client-side renderer in flirrorRenderers.
+        self.renderer = renderer
+
+    def get_client_data(
+        self, data: Optional[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """Limit the module's data to the fields the tile needs."""
+        if data is None or self.data_fields is None:
+            return data
+        # The timestamp is always necessary to show when the data was updated
+        fields = ("_timestamp",) + self.data_fields
+        return {field: data[field] for field in fields if field in data}
+
+    def get_client_config(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Limit the module's config to the fields the renderer needs."""
+        return {field: config[field] for field in self.config_fields if field in config}
+
     def crawler(self):
         """Decorate a function to register it as a crawler for this module"""
 
@@ -38,3 +88,61 @@ class FlirrorModule(Blueprint):
             return f
 
         return decorator
+
+
+class ModuleRegistry:
+    """
+    Map module names to the import paths of their FlirrorModule instances.
+
+    The import paths are given as "package.module:attribute". A module (and
+    thus all its dependencies, like the API clients) is only imported once it
+    is loaded, e.g. because it's used in the MODULES setting.
+    """
+
+    def __init__(self, import_paths: Optional[Dict[str, str]] = None) -> None:
+        self.import_paths: Dict[str, str] = dict(import_paths or {})
+        self._loaded: Dict[str, FlirrorModule] = {}
+
+    def register(self, name: str, import_path: str) -> None:
+        self.import_paths[name] = import_path
+        self._loaded.pop(name, None)
+
+    def load(self, name: str) -> FlirrorModule:
+        """
+        Import the module with the given name.
+
+        Raises a FlirrorConfigError if the import path doesn't point to a
+        FlirrorModule instance.
+        """
+        module = self._loaded.get(name)
+        if module is not None:
+            return module
+
+        import_path = self.import_paths[name]
+        module_path, _, attribute = import_path.partition(":")
+        LOGGER.debug("Importing module '%s' from '%s'", name, import_path)
+        module = getattr(importlib.import_module(module_path), attribute, None)
+        if not isinstance(module, FlirrorModule):
+            raise FlirrorConfigError(
+                f"'{import_path}' is not a valid flirror module for '{name}'"
+            )
+        self._loaded[name] = module
+        return module
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.import_paths
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.import_paths)
+
+
+# The modules shipped with flirror
+BUILTIN_MODULES = ModuleRegistry(
+    {
+        "calendar": "flirror.modules.calendar:calendar_module",
+        "clock": "flirror.modules.clock:clock_module",
+        "newsfeed": "flirror.modules.newsfeed:newsfeed_module",
+        "stocks": "flirror.modules.stocks:stocks_module",
+        "weather": "flirror.modules.weather:weather_module",
+    }
+)
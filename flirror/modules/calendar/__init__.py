@@ -24,7 +24,12 @@ API_VERSION = "v3"
 
 SCOPES = ["https://www.googleapis.com/auth/calendar.readonly"]
 
-calendar_module = FlirrorModule("calendar", __name__, template_folder="templates")
+calendar_module = FlirrorModule(
+    "calendar",
+    __name__,
+    template_folder="templates",
+    template_name="calendar/index.html",
+)
 
 
 @calendar_module.view()
@@ -43,7 +48,7 @@ def crawl(
 
     try:
         credentials = GoogleOAuth(
-            app.extensions["database"], SCOPES, object_key
+            app.extensions["storage"], SCOPES, object_key
         ).get_credentials()
     except ConnectionError:
         raise CrawlerDataError("Unable to connect to Google API")
@@ -2,11 +2,14 @@ import logging
 
 from flask import current_app, jsonify, render_template, request, Response
 
+from flirror.helpers import not_modified
 from flirror.modules import FlirrorModule
 
 LOGGER = logging.getLogger(__name__)
 
-clock_module = FlirrorModule("clock", __name__, template_folder="templates")
+clock_module = FlirrorModule(
+    "clock", __name__, template_folder="templates", template_name="clock/index.html"
+)
 
 
 @clock_module.view()
@@ -16,24 +19,25 @@ def get() -> Response:
     module_id = request.args.get("module_id")
     if not module_id:
         return current_app.json_abort(400, "Parameter 'module_id' is missing")
-    module_configs = [
-        m for m in current_app.config.get("MODULES", {}) if m.get("id") == module_id
-    ]
-    if module_configs:
-        module_config = module_configs[0]
-    else:
+    module_config = current_app.module_configs.get(module_id)
+    if module_config is None:
         return current_app.json_abort(
             400,
             f"Could not find any module config for ID '{module_id}'. "
             "Are you sure this one is specified in the config file?",
         )
 
+    # The clock doesn't have any data, so the template only changes with the
+    # module's config.
+    etag = current_app.get_module_etags({module_id: "clock/index.html"}, {})[module_id]
+    response = not_modified(etag)
+    if response is not None:
+        return response
+
     context = {
-        "module": {
-            "module": "clock",
-            "id": module_id,
-            "config": module_config.get("config"),
-        }
+        "module": {"module": "clock", "id": module_id, "config": module_config.config}
     }
     data = {"_template": render_template("clock/index.html", **context)}
-    return jsonify(data)
+    response = jsonify(data)
+    response.set_etag(etag)
+    return response
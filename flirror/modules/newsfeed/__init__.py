@@ -13,7 +13,16 @@ LOGGER = logging.getLogger(__name__)
 
 DEFAULT_MAX_ITEMS = 5
 
-newsfeed_module = FlirrorModule("newsfeed", __name__, template_folder="templates")
+newsfeed_module = FlirrorModule(
+    "newsfeed",
+    __name__,
+    template_folder="templates",
+    template_name="newsfeed/index.html",
+    static_folder="static",
+    data_fields=["news"],
+    config_fields=["name"],
+    renderer="renderer.js",
+)
 
 
 @newsfeed_module.view()
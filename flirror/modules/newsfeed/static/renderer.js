@@ -0,0 +1,26 @@
+// Renders the newsfeed tile from the module's data (output=data) with the
+// same markup as newsfeed/index.html.
+flirrorRenderers.newsfeed = function (element, data, module) {
+    if (!data || !data.news || data.news.length === 0) {
+        flirrorRenderUtils.missingData(element);
+        return;
+    }
+    var entry = data.news[0];
+
+    var body = $('<div class="card-body">');
+    body.append($('<div class="text-right">').append(
+        $("<small>")
+            .append($('<i class="fas fa-sync-alt">').attr("id", module.id + "-spinner"))
+            .append(document.createTextNode(" " + flirrorRenderUtils.prettydate(data._timestamp)))
+    ));
+    body.append($('<div class="text-center">')
+        .append($('<h4 class="medium-emphasis">').text(
+            module.config.name + ", " + flirrorRenderUtils.prettydate(entry.published)
+        ))
+        .append($("<h3>").text(entry.title))
+    );
+    if (module.display.summary) {
+        body.append($('<div class="text-justify">').append($("<p>").text(entry.summary)));
+    }
+    element.empty().append(body);
+};
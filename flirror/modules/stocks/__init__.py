@@ -11,7 +11,21 @@ from flirror.modules import FlirrorModule
 
 LOGGER = logging.getLogger(__name__)
 
-stocks_module = FlirrorModule("stocks", __name__, template_folder="templates")
+
+def required_assets(config: Dict[str, Any]) -> List[str]:
+    # Only the series are drawn as charts
+    if config.get("mode", "table") == "series":
+        return ["charts.js"]
+    return []
+
+
+stocks_module = FlirrorModule(
+    "stocks",
+    __name__,
+    template_folder="templates",
+    template_name="stocks/index.html",
+    required_assets=required_assets,
+)
 
 
 @stocks_module.view()
@@ -39,7 +39,12 @@ DEFAULT_TEMP_UNIT = "celsius"
 DEFAULT_LANGUAGE = "en"
 
 # TODO (felix): Define some default values in FlirrorModule?
-weather_module = FlirrorModule("weather", __name__, template_folder="templates")
+weather_module = FlirrorModule(
+    "weather",
+    __name__,
+    template_folder="templates",
+    template_name="weather/index.html",
+)
 
 
 # A template filter to find the correct weather icon by name
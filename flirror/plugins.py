@@ -0,0 +1,168 @@
+"""
+Find the installed flirror plugins without importing them.
+
+Plugins advertise their modules via entry points in the "flirror.modules"
+group, e.g. in their pyproject.toml:
+
+    [tool.poetry.plugins."flirror.modules"]
+    awesome = "flirror_awesome:awesome_module"
+
+Reading the entry points still requires to go through the metadata of all
+installed distributions. Thus, the result is cached in a file and only
+discovered again once the installed distributions changed.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pkgutil
+import sys
+import tempfile
+from typing import Dict, List, NamedTuple, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "flirror.modules"
+# The naming schema of plugins which don't provide any entry points
+PLUGIN_PREFIX = "flirror_"
+# The suffixes of the directories containing the metadata of a distribution
+METADATA_SUFFIXES = (".dist-info", ".egg-info")
+# Bump this whenever the format of the cache file changes
+PLUGIN_CACHE_VERSION = 1
+
+
+class PluginIndex(NamedTuple):
+    # Module names mapped to their import paths ("package.module:attribute")
+    entry_points: Dict[str, str]
+    # The names of all installed "flirror_*" packages
+    packages: List[str]
+
+
+def default_plugin_cache_file() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "flirror", "plugins.json")
+
+
+def has_distribution_metadata(path: str) -> bool:
+    try:
+        with os.scandir(path) as entries:
+            return any(entry.name.endswith(METADATA_SUFFIXES) for entry in entries)
+    except OSError:
+        return False
+
+
+def installation_fingerprint() -> str:
+    """
+    Identify the currently installed distributions.
+
+    Installing, upgrading or removing a distribution changes the modification
+    time of the sys.path directory it's installed to. Thus, checking those is
+    sufficient and much faster than reading the metadata of all distributions.
+
+    Only directories containing distribution metadata (*.dist-info or
+    *.egg-info) are taken into account. Other directories like the current
+    working directory (where e.g. the database or log files are written) would
+    invalidate the cache on every change.
+    """
+    sha = hashlib.sha1(sys.version.encode("utf-8"))
+    cwd = os.getcwd()
+    for path in sys.path:
+        if not path or os.path.abspath(path) == cwd:
+            continue
+        if not has_distribution_metadata(path):
+            # Still notice the first distribution installed to this directory
+            sha.update(f"{path}:-\n".encode("utf-8"))
+            continue
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+        sha.update(f"{path}:{mtime}\n".encode("utf-8"))
+    return sha.hexdigest()
+
+
+def find_entry_points() -> Dict[str, str]:
+    if sys.version_info >= (3, 8):
+        from importlib.metadata import entry_points
+    else:
+        # The backport of importlib.metadata for older Python versions
+        from importlib_metadata import entry_points
+
+    if sys.version_info >= (3, 10):
+        group = entry_points(group=ENTRY_POINT_GROUP)
+    else:
+        group = entry_points().get(ENTRY_POINT_GROUP, [])
+    return {ep.name: ep.value for ep in group}
+
+
+def find_plugin_packages() -> List[str]:
+    return sorted(
+        name
+        for finder, name, ispkg in pkgutil.iter_modules()
+        if name.startswith(PLUGIN_PREFIX)
+    )
+
+
+def load_plugin_cache(cache_file: str, fingerprint: str) -> Optional[PluginIndex]:
+    try:
+        with open(cache_file) as f:
+            cache = json.load(f)
+        if (
+            cache["version"] != PLUGIN_CACHE_VERSION
+            or cache["fingerprint"] != fingerprint
+        ):
+            return None
+        return PluginIndex(dict(cache["entry_points"]), list(cache["packages"]))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_plugin_cache(cache_file: str, fingerprint: str, index: PluginIndex) -> None:
+    cache = {
+        "version": PLUGIN_CACHE_VERSION,
+        "fingerprint": fingerprint,
+        "entry_points": index.entry_points,
+        "packages": index.packages,
+    }
+    directory = os.path.dirname(cache_file) or os.curdir
+    try:
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temporary file first, so concurrently starting processes
+        # never read a half-written cache.
+        fd, tmp_file = tempfile.mkstemp(dir=directory, prefix=".plugins-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(cache, f)
+            os.replace(tmp_file, cache_file)
+        except BaseException:
+            os.unlink(tmp_file)
+            raise
+    except OSError:
+        LOGGER.debug("Could not write the plugin cache '%s'", cache_file, exc_info=True)
+
+
+def discover_plugin_index(cache_file: Optional[str] = None) -> PluginIndex:
+    """
+    Find the installed plugins (without importing them).
+
+    If a cache file is given, the result is stored there and reused as long
+    as the installed distributions don't change.
+    """
+    fingerprint = installation_fingerprint()
+    if cache_file:
+        index = load_plugin_cache(cache_file, fingerprint)
+        if index is not None:
+            LOGGER.debug("Using the cached plugins from '%s'", cache_file)
+            return index
+
+    index = PluginIndex(find_entry_points(), find_plugin_packages())
+    LOGGER.debug(
+        "Found the following flirror plugins: '%s'",
+        "', '".join(list(index.entry_points) + index.packages),
+    )
+    if cache_file:
+        save_plugin_cache(cache_file, fingerprint, index)
+    return index
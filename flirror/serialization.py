@@ -0,0 +1,169 @@
+import json
+import logging
+import zlib
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from flirror.exceptions import FlirrorConfigError
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CODEC = "json"
+# Values smaller than this (in bytes) are not worth to be compressed
+DEFAULT_COMPRESSION_THRESHOLD = 1024
+
+# Keys of the marker that is stored in place of an encoded value. They allow
+# to decode a value without knowing the configuration it was encoded with.
+CODEC_MARKER = "_codec"
+COMPRESSION_MARKER = "_compression"
+
+
+def _json_encode(value: Dict) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def _json_decode(data: bytes) -> Dict:
+    return json.loads(data)
+
+
+def _msgpack_encode(value: Dict) -> bytes:
+    import msgpack
+
+    return msgpack.packb(value, use_bin_type=True)
+
+
+def _msgpack_decode(data: bytes) -> Dict:
+    import msgpack
+
+    return msgpack.unpackb(data, raw=False)
+
+
+def _cbor_encode(value: Dict) -> bytes:
+    import cbor2
+
+    return cbor2.dumps(value)
+
+
+def _cbor_decode(data: bytes) -> Dict:
+    import cbor2
+
+    return cbor2.loads(data)
+
+
+def _zstd_compress(data: bytes) -> bytes:
+    import zstandard
+
+    return zstandard.ZstdCompressor().compress(data)
+
+
+def _zstd_decompress(data: bytes) -> bytes:
+    import zstandard
+
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+# Each codec is defined by its encode/decode functions and the python package
+# that is necessary to use it (None for the standard library).
+CODECS: Dict[str, Tuple[Callable, Callable, Optional[str]]] = {
+    "json": (_json_encode, _json_decode, None),
+    "msgpack": (_msgpack_encode, _msgpack_decode, "msgpack"),
+    "cbor": (_cbor_encode, _cbor_decode, "cbor2"),
+}
+
+COMPRESSIONS: Dict[str, Tuple[Callable, Callable, Optional[str]]] = {
+    "zlib": (zlib.compress, zlib.decompress, None),
+    "zstd": (_zstd_compress, _zstd_decompress, "zstandard"),
+}
+
+
+class Serializer:
+    """
+    Serialize values to a compact binary representation.
+
+    The serializer encodes a value with the given codec and compresses it if
+    the encoded value exceeds the compression_threshold. The default
+    configuration (JSON without compression) doesn't encode the values at all,
+    as they can be stored directly in the database's JSON column.
+    """
+
+    def __init__(
+        self,
+        codec: str = DEFAULT_CODEC,
+        compression: Optional[str] = None,
+        compression_threshold: int = DEFAULT_COMPRESSION_THRESHOLD,
+    ) -> None:
+        _check_available(codec, CODECS, "codec")
+        if compression is not None:
+            _check_available(compression, COMPRESSIONS, "compression")
+
+        self.codec = codec
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+
+    @property
+    def is_plain(self) -> bool:
+        """Whether the values are stored as plain JSON."""
+        return self.codec == "json" and self.compression is None
+
+    def serialize(self, value: Dict) -> Tuple[Dict, Optional[bytes]]:
+        """
+        Serialize a value for the database.
+
+        Returns a tuple of the value for the JSON column and the encoded
+        payload. If the value is stored as plain JSON, the payload is None.
+        Otherwise, the JSON column only holds a marker describing how the
+        payload was encoded.
+        """
+        if self.is_plain:
+            return value, None
+
+        encode, _, _ = CODECS[self.codec]
+        payload = encode(value)
+        marker: Dict[str, Any] = {CODEC_MARKER: self.codec}
+
+        if self.compression is not None and len(payload) > self.compression_threshold:
+            compress, _, _ = COMPRESSIONS[self.compression]
+            payload = compress(payload)
+            marker[COMPRESSION_MARKER] = self.compression
+        elif self.codec == "json":
+            # Small JSON values are not worth an extra payload
+            return value, None
+
+        return marker, payload
+
+
+def deserialize(marker: Dict, payload: Optional[bytes]) -> Dict:
+    """
+    Deserialize a value from the database.
+
+    This is the counterpart to Serializer.serialize() and uses the marker to
+    look up the codec and compression the payload was encoded with. Values
+    without payload (e.g. rows written by older flirror versions) are returned
+    as they are.
+    """
+    if payload is None:
+        return marker
+
+    compression = marker.get(COMPRESSION_MARKER)
+    if compression is not None:
+        _, decompress, _ = COMPRESSIONS[compression]
+        payload = decompress(payload)
+
+    _, decode, _ = CODECS[marker[CODEC_MARKER]]
+    return decode(payload)
+
+
+def _check_available(name: str, registry: Dict, kind: str) -> None:
+    if name not in registry:
+        raise FlirrorConfigError(
+            f"Unknown {kind} '{name}'. Must be one of '{', '.join(registry)}'"
+        )
+
+    _, _, package = registry[name]
+    if package is None:
+        return
+    try:
+        __import__(package)
+    except ImportError:
+        raise FlirrorConfigError(
+            f"The {kind} '{name}' requires the '{package}' package to be installed"
+        )
@@ -0,0 +1,155 @@
+"""
+gunicorn configuration for serving flirror-web in preload mode.
+
+The app (with all modules and their dependencies) is created only once in
+gunicorn's master process. Afterwards, all objects are moved to the garbage
+collector's permanent generation, so the forked workers share their memory
+pages (copy-on-write) instead of each building their own copy of the app.
+
+Use it via "flirror-web --preload" or "gunicorn -c python:flirror.server".
+
+As gunicorn only accepts a single config file, a custom one can be given via
+the FLIRROR_GUNICORN_CONFIG environment variable (flirror-web does this for
+the --config option and the default gunicorn.conf.py). Its settings are
+merged into this config and its server hooks are called after the ones below.
+"""
+
+import functools
+import gc
+import importlib
+import os
+import resource
+from typing import Any, Callable, Dict, Mapping, MutableMapping
+
+# Build the app only once in the master process
+preload_app = True
+
+# The environment variable pointing to the user's gunicorn config (either a
+# file or "python:<module>")
+USER_CONFIG_ENV = "FLIRROR_GUNICORN_CONFIG"
+
+# Fields from /proc/<pid>/smaps_rollup, mapped to our names
+SMAPS_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared",
+    "Shared_Dirty": "shared",
+}
+
+
+def memory_usage(pid: int = 0) -> Dict[str, int]:
+    """
+    Get the memory usage (in bytes) of a process.
+
+    The resident set size ("rss") counts shared pages for every process. The
+    proportional set size ("pss") distributes them among the processes
+    sharing them and the amount of shared memory is reported as "shared".
+    Both are only available on Linux. Without a pid, the usage of the current
+    process is returned.
+    """
+    pid = pid or os.getpid()
+    usage: Dict[str, int] = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                field, _, value = line.partition(":")
+                if field in SMAPS_FIELDS:
+                    name = SMAPS_FIELDS[field]
+                    # The values are reported in kB
+                    usage[name] = usage.get(name, 0) + int(value.split()[0]) * 1024
+    except (OSError, ValueError):
+        pass
+
+    if "rss" not in usage and pid == os.getpid():
+        # Fall back to the peak RSS (in kB on Linux, in bytes on macOS)
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        usage["rss"] = maxrss if os.uname().sysname == "Darwin" else maxrss * 1024
+    return usage
+
+
+def format_memory_usage(usage: Dict[str, int]) -> str:
+    return ", ".join(
+        f"{name.upper()} {value / 1024 / 1024:.1f} MB" for name, value in usage.items()
+    )
+
+
+def when_ready(server) -> None:
+    server.log.info(
+        "Preloaded app in master process %d (%s)",
+        os.getpid(),
+        format_memory_usage(memory_usage()),
+    )
+    server.app.wsgi().before_fork()
+    # Get rid of the garbage from creating the app, so it's not frozen
+    gc.collect()
+
+
+def pre_fork(server, worker) -> None:
+    # The garbage collector doesn't touch the objects in the permanent
+    # generation anymore. Otherwise, each collection in a worker would write
+    # to (and thus copy) the pages of all objects inherited from the master.
+    gc.freeze()
+
+
+def post_fork(server, worker) -> None:
+    worker.app.wsgi().after_fork()
+
+
+def post_worker_init(worker) -> None:
+    worker.log.info(
+        "Worker %d booted (%s)", worker.pid, format_memory_usage(memory_usage())
+    )
+
+
+def worker_exit(server, worker) -> None:
+    server.log.info(
+        "Worker %d exiting (%s)", worker.pid, format_memory_usage(memory_usage())
+    )
+
+
+def load_config(location: str) -> Dict[str, Any]:
+    """Load a gunicorn config file or "python:<module>" the way gunicorn does."""
+    if location.startswith("python:"):
+        return dict(vars(importlib.import_module(location.split(":", 1)[1])))
+
+    namespace: Dict[str, Any] = {"__file__": location, "__name__": "__config__"}
+    with open(location, "rb") as f:
+        exec(compile(f.read(), location, "exec"), namespace)
+    return namespace
+
+
+def chain_hooks(*hooks: Callable) -> Callable:
+    # gunicorn checks the number of arguments of each hook
+    @functools.wraps(hooks[0])
+    def hook(*args: Any) -> None:
+        for func in hooks:
+            func(*args)
+
+    return hook
+
+
+def merge_config(
+    namespace: MutableMapping[str, Any], user_config: Mapping[str, Any]
+) -> None:
+    """
+    Merge the settings of the user's config into the given namespace.
+
+    Server hooks defined in both are chained, so the user's hook is called
+    after ours. All other settings are taken from the user's config, except
+    for preload_app, which is the whole point of this config.
+    """
+    from gunicorn.config import KNOWN_SETTINGS
+
+    settings = {setting.name for setting in KNOWN_SETTINGS}
+    for name, value in user_config.items():
+        if name not in settings:
+            continue
+        if callable(namespace.get(name)) and callable(value):
+            namespace[name] = chain_hooks(namespace[name], value)
+        else:
+            namespace[name] = value
+    namespace["preload_app"] = True
+
+
+if os.environ.get(USER_CONFIG_ENV):
+    merge_config(globals(), load_config(os.environ[USER_CONFIG_ENV]))
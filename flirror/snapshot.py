@@ -0,0 +1,294 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+from flirror.storage import StorageBackend
+
+LOGGER = logging.getLogger(__name__)
+
+# Only the module data is published in the snapshot
+DEFAULT_SNAPSHOT_PREFIX = "module."
+
+# magic, sequence, number of index entries
+HEADER = struct.Struct("<4sQI")
+MAGIC = b"FLS1"
+# length of the key, offset and length of the value, version
+INDEX_ENTRY = struct.Struct("<HQIQ")
+
+# An index entry consists of the offset and length of the value and its version
+IndexEntry = Tuple[int, int, int]
+
+
+def write_snapshot(
+    path: str, objects: Iterable[Tuple[str, Dict, int]], sequence: int
+) -> None:
+    """
+    Write the given objects (key, value, version) to a snapshot file.
+
+    The file starts with a header, followed by the index of all objects and
+    their JSON encoded values. It's written to a temporary file first which
+    then atomically replaces the existing snapshot. Thus, readers never see a
+    partially written snapshot.
+    """
+    keys: List[bytes] = []
+    values: List[bytes] = []
+    versions: List[int] = []
+    for key, value, version in objects:
+        keys.append(key.encode("utf-8"))
+        values.append(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+        versions.append(version)
+
+    index_size = sum(INDEX_ENTRY.size + len(encoded_key) for encoded_key in keys)
+    offset = HEADER.size + index_size
+
+    index = bytearray()
+    for encoded_key, encoded_value, version in zip(keys, values, versions):
+        index += INDEX_ENTRY.pack(len(encoded_key), offset, len(encoded_value), version)
+        index += encoded_key
+        offset += len(encoded_value)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, sequence, len(keys)))
+            f.write(index)
+            for encoded_value in values:
+                f.write(encoded_value)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class Snapshot:
+    """
+    Read the objects from a snapshot file via mmap.
+
+    All processes mapping the same file share its pages, so the data is only
+    held once in memory, no matter how many web workers are running. The file
+    is mapped again whenever a new snapshot was published.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        # The file's identity, the mapping, the sequence and the index. It's
+        # replaced as a whole, so each reader works on a consistent state.
+        self._state: Optional[
+            Tuple[Tuple[int, int], mmap.mmap, int, Dict[str, IndexEntry]]
+        ] = None
+        self._lock = threading.Lock()
+
+    @property
+    def sequence(self) -> Optional[int]:
+        """The sequence of the current snapshot or None if there is none."""
+        state = self._load()
+        return state[2] if state is not None else None
+
+    @property
+    def version(self) -> Optional[Tuple[int, Tuple[int, int]]]:
+        """
+        Identify the current snapshot or None if there is none.
+
+        In addition to the sequence, this also contains the identity of the
+        file, as the sequence starts again if the snapshot file is removed.
+        """
+        state = self._load()
+        return (state[2], state[0]) if state is not None else None
+
+    def get(self, key: str) -> Optional[Dict]:
+        state = self._load()
+        if state is None:
+            return None
+        _, mm, _, index = state
+        entry = index.get(key)
+        if entry is None:
+            return None
+        return self._decode(mm, entry)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        state = self._load()
+        if state is None:
+            return {}
+        _, mm, _, index = state
+        return {key: self._decode(mm, index[key]) for key in keys if key in index}
+
+    def scan(self, prefix: str) -> Iterator[Tuple[str, Dict]]:
+        state = self._load()
+        if state is None:
+            return
+        _, mm, _, index = state
+        for key in sorted(index):
+            if key.startswith(prefix):
+                yield key, self._decode(mm, index[key])
+
+    def get_versions(self, keys: Iterable[str]) -> Dict[str, int]:
+        state = self._load()
+        if state is None:
+            return {}
+        index = state[3]
+        return {key: index[key][2] for key in keys if key in index}
+
+    def _load(
+        self,
+    ) -> Optional[Tuple[Tuple[int, int], mmap.mmap, int, Dict[str, IndexEntry]]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._state = None
+            return None
+
+        # A new snapshot always replaces the file, so checking the inode is
+        # sufficient to detect changes.
+        identity = (stat.st_ino, stat.st_mtime_ns)
+        state = self._state
+        if state is not None and state[0] == identity:
+            return state
+
+        with self._lock:
+            LOGGER.debug("Mapping snapshot file '%s'", self.path)
+            with open(self.path, "rb") as f:
+                # NOTE (felix): The mapping stays valid after closing the file.
+                # Old mappings are released once no reader uses them anymore.
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, sequence, count = HEADER.unpack_from(mm)
+            if magic != MAGIC:
+                LOGGER.error("Invalid snapshot file '%s'", self.path)
+                self._state = None
+                return None
+
+            index = {}
+            position = HEADER.size
+            for _ in range(count):
+                key_length, offset, length, version = INDEX_ENTRY.unpack_from(
+                    mm, position
+                )
+                start = position + INDEX_ENTRY.size
+                position = start + key_length
+                key = mm[start:position].decode("utf-8")
+                index[key] = (offset, length, version)
+
+            self._state = (identity, mm, sequence, index)
+            return self._state
+
+    @staticmethod
+    def _decode(mm: mmap.mmap, entry: IndexEntry) -> Dict:
+        offset, length, _ = entry
+        end = offset + length
+        return json.loads(mm[offset:end])
+
+
+class SnapshotBackend(StorageBackend):
+    """
+    Serve the module data from a snapshot file in front of another backend.
+
+    The crawler (publish=True) writes to the underlying storage and publishes
+    a new snapshot of all keys with the given prefix after each change. The
+    web workers read these keys from the snapshot, so they don't have to
+    query and decode them from the storage on their own. Other keys and all
+    keys (as long as no snapshot was published yet) are read from the
+    underlying storage.
+    """
+
+    def __init__(
+        self,
+        storage: StorageBackend,
+        path: str,
+        publish: bool = False,
+        prefix: str = DEFAULT_SNAPSHOT_PREFIX,
+    ) -> None:
+        self.storage = storage
+        self.snapshot = Snapshot(path)
+        self.publish = publish
+        self.prefix = prefix
+        self._lock = threading.Lock()
+
+        if publish:
+            # Make sure the snapshot reflects the current state of the storage
+            self.publish_snapshot()
+
+    def get(self, key: str) -> Optional[Dict]:
+        if key.startswith(self.prefix) and self.snapshot.sequence is not None:
+            return self.snapshot.get(key)
+        return self.storage.get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        keys = list(keys)
+        if self.snapshot.sequence is None:
+            return self.storage.get_many(keys)
+
+        objects = self.snapshot.get_many(k for k in keys if k.startswith(self.prefix))
+        other_keys = [k for k in keys if not k.startswith(self.prefix)]
+        if other_keys:
+            objects.update(self.storage.get_many(other_keys))
+        return objects
+
+    def put(self, key: str, value: Dict) -> bool:
+        written = self.storage.put(key, value)
+        # Unchanged values only update their last check in the storage, which
+        # is read from there (see get_last_checked()). Publishing a new
+        # snapshot would invalidate the caches of all readers.
+        if written and self.publish and key.startswith(self.prefix):
+            self.publish_snapshot()
+        return written
+
+    def delete(self, key: str) -> None:
+        self.storage.delete(key)
+        if self.publish and key.startswith(self.prefix):
+            self.publish_snapshot()
+
+    def scan(self, prefix: str) -> Iterator[Tuple[str, Dict]]:
+        if prefix.startswith(self.prefix) and self.snapshot.sequence is not None:
+            return self.snapshot.scan(prefix)
+        return self.storage.scan(prefix)
+
+    def get_versions(self, keys: Iterable[str]) -> Dict[str, int]:
+        keys = list(keys)
+        if self.snapshot.sequence is None:
+            return self.storage.get_versions(keys)
+
+        versions = self.snapshot.get_versions(
+            k for k in keys if k.startswith(self.prefix)
+        )
+        other_keys = [k for k in keys if not k.startswith(self.prefix)]
+        if other_keys:
+            versions.update(self.storage.get_versions(other_keys))
+        return versions
+
+    def get_last_checked(self, keys: Iterable[str]) -> Dict[str, float]:
+        # The snapshot isn't republished for unchanged values, so their
+        # "_timestamp" in the snapshot might be outdated.
+        return self.storage.get_last_checked(keys)
+
+    def data_version(self) -> Hashable:
+        # Checking the snapshot only requires a stat() call
+        version = self.snapshot.version
+        if version is not None:
+            return version
+        return self.storage.data_version()
+
+    def close(self) -> None:
+        self.storage.close()
+
+    def publish_snapshot(self) -> None:
+        """Publish the current state of the storage as a new snapshot."""
+        with self._lock:
+            objects = dict(self.storage.scan(self.prefix))
+            versions = self.storage.get_versions(objects)
+            sequence = (self.snapshot.sequence or 0) + 1
+            LOGGER.debug(
+                "Publishing snapshot %d with %d objects to '%s'",
+                sequence,
+                len(objects),
+                self.snapshot.path,
+            )
+            write_snapshot(
+                self.snapshot.path,
+                ((key, value, versions.get(key, 1)) for key, value in objects.items()),
+                sequence,
+            )
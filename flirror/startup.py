@@ -0,0 +1,133 @@
+import logging
+import os
+import subprocess
+import sys
+import time
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from flask import Flask
+from jinja2 import FileSystemBytecodeCache, TemplateSyntaxError
+
+LOGGER = logging.getLogger(__name__)
+
+# Prefix the cache files, so they don't clash with other jinja2 applications
+# using the same cache directory.
+BYTECODE_CACHE_PATTERN = "__flirror_jinja2_%s.cache"
+TEMPLATE_EXTENSIONS = ("html",)
+
+
+class ImportTime(NamedTuple):
+    name: str
+    # The time spent in the module itself and including its imports (in µs)
+    self_time: int
+    cumulative_time: int
+
+
+class StartupTimer:
+    """
+    Measure how long the single phases of the app's startup take.
+
+    Each call to lap() ends the current phase, which started with the
+    previous lap (or when the timer was created).
+    """
+
+    def __init__(self) -> None:
+        self.started = self._last = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+
+    def lap(self, name: str) -> None:
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    @property
+    def total(self) -> float:
+        return self._last - self.started
+
+    def report(self) -> str:
+        total = self.total or 1e-9
+        lines = [f"Startup of process {os.getpid()} took {self.total * 1000:.1f} ms"]
+        for name, duration in self.phases:
+            lines.append(
+                f"  {name:<20} {duration * 1000:8.1f} ms {duration / total:6.1%}"
+            )
+        return "\n".join(lines)
+
+
+def configure_bytecode_cache(app: Flask, directory: Optional[str] = None) -> None:
+    """
+    Store the compiled templates on disk.
+
+    All workers (and restarted ones) load the compiled templates from there,
+    rather than compiling them on their own. The cache entries are validated
+    against the templates' sources, so changed templates are compiled again.
+    Without a directory, jinja2's default (a temporary directory per user) is
+    used.
+    """
+    if directory is not None:
+        os.makedirs(directory, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(
+        directory, pattern=BYTECODE_CACHE_PATTERN
+    )
+
+
+def precompile_templates(app: Flask) -> List[str]:
+    """
+    Load the templates of the app and all registered modules.
+
+    Thus, they are compiled (or loaded from the bytecode cache) on startup,
+    rather than on the first request that renders them. Returns the names of
+    all loaded templates.
+    """
+    loaded = []
+    for name in app.jinja_env.list_templates(extensions=TEMPLATE_EXTENSIONS):
+        try:
+            app.jinja_env.get_template(name)
+        except TemplateSyntaxError:
+            # Fail on the first request rendering the template, as usual
+            LOGGER.exception("Could not compile template '%s'", name)
+            continue
+        loaded.append(name)
+    return loaded
+
+
+def measure_import_time(
+    module_name: str, preload: Iterable[str] = ()
+) -> List[ImportTime]:
+    """
+    Import a module in a new python process and measure each single import.
+
+    The modules to preload are imported beforehand, so the ones they import
+    don't count for the module. Returns the time of every import done for the
+    module (in the order they finished, the module itself is the last one).
+    Raises an ImportError if the module can't be imported.
+    """
+    preload = list(preload)
+    code = "".join(f"import {name}\n" for name in preload + [module_name])
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        raise ImportError(lines[-1] if lines else f"Could not import {module_name}")
+
+    # Each line looks like "import time: <self> | <cumulative> | <name>"
+    imports: List[ImportTime] = []
+    for line in result.stderr.splitlines():
+        prefix, _, timing = line.partition(":")
+        if prefix != "import time":
+            continue
+        self_time, cumulative_time, name = timing.split("|")
+        if not self_time.strip().isdigit():
+            # The header line
+            continue
+        name = name.strip()
+        if name in preload:
+            # Only the imports afterwards belong to the module
+            imports.clear()
+            continue
+        imports.append(ImportTime(name, int(self_time), int(cumulative_time)))
+    return imports
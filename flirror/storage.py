@@ -0,0 +1,726 @@
+import abc
+import contextlib
+import copy
+import json
+import logging
+import mmap
+import os
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+from typing import (
+    Any,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+)
+from urllib.parse import quote, unquote
+
+from pony.orm import Database
+
+from flirror.database import (
+    calculate_checksum,
+    configure_sqlite_connection,
+    create_database_and_entities,
+    delete_object_by_key,
+    get_data_version,
+    get_flirror_object_migrations,
+    get_object_by_key,
+    get_object_last_checked,
+    get_object_versions,
+    get_objects_by_keys,
+    get_sqlite_pragmas,
+    iter_objects_by_prefix,
+    refresh_timestamp,
+    store_object_by_key,
+)
+from flirror.exceptions import FlirrorConfigError
+from flirror.serialization import (
+    DEFAULT_CODEC,
+    DEFAULT_COMPRESSION_THRESHOLD,
+    deserialize,
+    Serializer,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_STORAGE_BACKEND = "sqlite"
+# Pony resolves relative database files against the directory of the module
+# binding the database (flirror.database). All other backends do the same, so
+# they use the same file for the same DATABASE_FILE setting.
+DATABASE_BASE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+class StorageBackend(abc.ABC):
+    """
+    The interface to store and retrieve flirror's data.
+
+    Flirror only stores simple key value pairs, whereby each value is a JSON
+    serializable dictionary. Every backend must ensure that unchanged values
+    (apart from volatile fields like the "_timestamp") don't increase the
+    version of the stored value.
+    """
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[Dict]:
+        """Get the value for the given key or None if it doesn't exist."""
+
+    @abc.abstractmethod
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        """
+        Get the values for multiple keys at once.
+
+        Keys that don't exist are not part of the result.
+        """
+
+    @abc.abstractmethod
+    def put(self, key: str, value: Dict) -> bool:
+        """
+        Store the value for the given key.
+
+        Returns True if the value was written, False if it didn't change.
+        """
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> None:
+        """Delete the value for the given key (if it exists)."""
+
+    @abc.abstractmethod
+    def scan(self, prefix: str) -> Iterator[Tuple[str, Dict]]:
+        """Iterate over all key value pairs whose key starts with prefix."""
+
+    @abc.abstractmethod
+    def get_versions(self, keys: Iterable[str]) -> Dict[str, int]:
+        """Get the versions for multiple keys at once."""
+
+    def get_last_checked(self, keys: Iterable[str]) -> Dict[str, float]:
+        """
+        Get the time each of the given keys was written or checked last.
+
+        Unchanged values only update this timestamp (and thus their
+        "_timestamp"), but not their version. Keys without a timestamp are
+        not part of the result.
+        """
+        return {
+            key: value["_timestamp"]
+            for key, value in self.get_many(keys).items()
+            if "_timestamp" in value
+        }
+
+    @abc.abstractmethod
+    def data_version(self) -> Hashable:
+        """
+        Get a value that changes whenever any data in the storage changed.
+
+        This also includes changes from other processes. The values are only
+        comparable within the same thread.
+        """
+
+    def close(self) -> None:
+        """Release all resources held by the backend."""
+
+
+class SQLiteBackend(StorageBackend):
+    """Store the data in a SQLite database using pony."""
+
+    def __init__(self, db: Database, serializer: Optional[Serializer] = None) -> None:
+        self.db = db
+        self.serializer = serializer
+
+    def get(self, key: str) -> Optional[Dict]:
+        return get_object_by_key(self.db, key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        return get_objects_by_keys(self.db, keys)
+
+    def put(self, key: str, value: Dict) -> bool:
+        return store_object_by_key(self.db, key, value, serializer=self.serializer)
+
+    def delete(self, key: str) -> None:
+        delete_object_by_key(self.db, key)
+
+    def scan(self, prefix: str) -> Iterator[Tuple[str, Dict]]:
+        return iter_objects_by_prefix(self.db, prefix)
+
+    def get_versions(self, keys: Iterable[str]) -> Dict[str, int]:
+        return get_object_versions(self.db, keys)
+
+    def get_last_checked(self, keys: Iterable[str]) -> Dict[str, float]:
+        return get_object_last_checked(self.db, keys)
+
+    def data_version(self) -> Hashable:
+        return get_data_version(self.db)
+
+    def close(self) -> None:
+        self.db.disconnect()
+
+
+class SQLiteKVBackend(StorageBackend):
+    """
+    Store the data in a SQLite database using the sqlite3 module directly.
+
+    Flirror only stores simple key value pairs, so we don't need an ORM on the
+    hot path. This backend skips pony's session handling, identity map and
+    change tracking and runs a fixed set of statements instead. As those are
+    always the same SQL strings, sqlite3 prepares them only once per
+    connection and takes them from its statement cache afterwards.
+
+    The database schema (and the JSON format of the stored values) is the same
+    as for the SQLiteBackend. Thus, both backends can be used on the same
+    database file, e.g. pony for the crawler and this one for flirror-web.
+    """
+
+    CREATE_TABLE = """
+        CREATE TABLE IF NOT EXISTS "FlirrorObject" (
+          "key" TEXT NOT NULL PRIMARY KEY,
+          "value" JSON NOT NULL,
+          "checksum" TEXT,
+          "version" INTEGER NOT NULL,
+          "last_checked" REAL,
+          "payload" BLOB
+        )
+    """
+    SELECT_ONE = (
+        'SELECT "value", "payload", "last_checked" FROM "FlirrorObject" '
+        'WHERE "key" = ?'
+    )
+    SELECT_MANY = (
+        'SELECT "key", "value", "payload", "last_checked" FROM "FlirrorObject" '
+        'WHERE "key" IN ({})'
+    )
+    SELECT_PREFIX = (
+        'SELECT "key", "value", "payload", "last_checked" FROM "FlirrorObject" '
+        'WHERE substr("key", 1, ?) = ? ORDER BY "key"'
+    )
+    SELECT_VERSIONS = 'SELECT "key", "version" FROM "FlirrorObject" WHERE "key" IN ({})'
+    SELECT_LAST_CHECKED = (
+        'SELECT "key", "last_checked" FROM "FlirrorObject" '
+        'WHERE "key" IN ({}) AND "last_checked" IS NOT NULL'
+    )
+    # Only touch the last_checked timestamp if the content (and the format it
+    # is stored in) didn't change.
+    TOUCH_PLAIN = (
+        'UPDATE "FlirrorObject" SET "last_checked" = ? '
+        'WHERE "key" = ? AND "checksum" = ? AND "payload" IS NULL'
+    )
+    TOUCH_ENCODED = (
+        'UPDATE "FlirrorObject" SET "last_checked" = ? '
+        'WHERE "key" = ? AND "checksum" = ? AND "payload" IS NOT NULL '
+        'AND "value" = ?'
+    )
+    UPSERT = """
+        INSERT INTO "FlirrorObject"
+          ("key", "value", "checksum", "version", "last_checked", "payload")
+        VALUES (?, ?, ?, 1, ?, ?)
+        ON CONFLICT ("key") DO UPDATE SET
+          "value" = excluded."value",
+          "checksum" = excluded."checksum",
+          "version" = "version" + 1,
+          "last_checked" = excluded."last_checked",
+          "payload" = excluded."payload"
+    """
+    DELETE = 'DELETE FROM "FlirrorObject" WHERE "key" = ?'
+
+    # The same JSON format pony uses for the value column
+    JSON_KWARGS: Dict[str, Any] = {
+        "separators": (",", ":"),
+        "sort_keys": True,
+        "ensure_ascii": False,
+    }
+
+    def __init__(
+        self,
+        filename: str,
+        serializer: Optional[Serializer] = None,
+        pragmas: Optional[Dict[str, Any]] = None,
+        read_only: bool = False,
+    ) -> None:
+        # Upserts are only supported since SQLite 3.24
+        if sqlite3.sqlite_version_info < (3, 24, 0):
+            raise FlirrorConfigError(
+                "The 'sqlite-kv' storage backend requires SQLite 3.24 or newer, "
+                f"but found {sqlite3.sqlite_version}"
+            )
+
+        self.filename = filename
+        self.serializer = serializer or Serializer()
+        self.pragmas = get_sqlite_pragmas(pragmas)
+        self.read_only = False
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        # SQLite's data_version doesn't change for commits from the same
+        # connection. Thus, we additionally count our own writes.
+        self._writes = 0
+
+        # Create the table (or add missing columns) with a writable connection
+        # before switching to read-only mode.
+        connection = self._connection
+        columns = {
+            row[1] for row in connection.execute('PRAGMA table_info("FlirrorObject")')
+        }
+        with self._transaction() as connection:
+            connection.execute(self.CREATE_TABLE)
+            for statement in get_flirror_object_migrations(columns):
+                connection.execute(statement)
+
+        if read_only:
+            LOGGER.debug("Reconnecting to the database in read-only mode")
+            self.close()
+            self.read_only = True
+
+    def get(self, key: str) -> Optional[Dict]:
+        LOGGER.debug("Getting object with key '%s' from database", key)
+        row = self._connection.execute(self.SELECT_ONE, (key,)).fetchone()
+        if row is None:
+            LOGGER.error("Could not get object with key '%s'", key)
+            return None
+        return self._decode(*row)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        keys = list(keys)
+        if not keys:
+            return {}
+
+        rows = self._connection.execute(
+            self.SELECT_MANY.format(", ".join("?" * len(keys))), keys
+        )
+        return {key: self._decode(*row) for key, *row in rows}
+
+    def put(self, key: str, value: Dict) -> bool:
+        checksum = calculate_checksum(value)
+        stored_value, payload = self.serializer.serialize(value)
+        encoded_value = json.dumps(stored_value, **self.JSON_KWARGS)
+        now = value.get("_timestamp", time.time())
+
+        with self._transaction() as connection:
+            if payload is None:
+                cursor = connection.execute(self.TOUCH_PLAIN, (now, key, checksum))
+            else:
+                cursor = connection.execute(
+                    self.TOUCH_ENCODED, (now, key, checksum, encoded_value)
+                )
+            if cursor.rowcount:
+                LOGGER.debug("Object with key '%s' did not change, skip update", key)
+                return False
+
+            LOGGER.debug("Writing object with key '%s' to database", key)
+            connection.execute(
+                self.UPSERT, (key, encoded_value, checksum, now, payload)
+            )
+        return True
+
+    def delete(self, key: str) -> None:
+        LOGGER.debug("Deleting object with key '%s' from database", key)
+        with self._transaction() as connection:
+            connection.execute(self.DELETE, (key,))
+
+    def scan(self, prefix: str) -> Iterator[Tuple[str, Dict]]:
+        LOGGER.debug("Getting objects with key prefix '%s' from database", prefix)
+        # Fetch everything at once to not keep the statement open while the
+        # caller processes the values.
+        rows = self._connection.execute(
+            self.SELECT_PREFIX, (len(prefix), prefix)
+        ).fetchall()
+        for key, *row in rows:
+            yield key, self._decode(*row)
+
+    def get_versions(self, keys: Iterable[str]) -> Dict[str, int]:
+        keys = list(keys)
+        if not keys:
+            return {}
+
+        rows = self._connection.execute(
+            self.SELECT_VERSIONS.format(", ".join("?" * len(keys))), keys
+        )
+        return dict(rows)
+
+    def get_last_checked(self, keys: Iterable[str]) -> Dict[str, float]:
+        keys = list(keys)
+        if not keys:
+            return {}
+
+        rows = self._connection.execute(
+            self.SELECT_LAST_CHECKED.format(", ".join("?" * len(keys))), keys
+        )
+        return dict(rows)
+
+    def data_version(self) -> Hashable:
+        data_version = self._connection.execute("PRAGMA data_version").fetchone()[0]
+        return data_version, self._writes
+
+    def close(self) -> None:
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads, so each
+        # thread gets its own one.
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            LOGGER.debug("Creating new database connection to '%s'", self.filename)
+            # Use autocommit mode, so reads don't open a transaction. Writes
+            # are wrapped in explicit transactions instead. We must allow to
+            # use the connection in a different thread to close it.
+            connection = sqlite3.connect(
+                self.filename, isolation_level=None, check_same_thread=False
+            )
+            configure_sqlite_connection(
+                connection, self.pragmas, query_only=self.read_only
+            )
+            with self._lock:
+                self._connections.append(connection)
+            self._local.connection = connection
+        return connection
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connection
+        # Acquire the write lock right away, so the transaction doesn't fail
+        # when upgrading from a read to a write lock.
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        self._writes += 1
+
+    @staticmethod
+    def _decode(
+        stored_value: str, payload: Optional[bytes], last_checked: Optional[float]
+    ) -> Dict:
+        value = deserialize(json.loads(stored_value), payload)
+        return refresh_timestamp(value, last_checked)
+
+
+class MemoryBackend(StorageBackend):
+    """
+    Store the data in memory.
+
+    The data is lost once the process ends and cannot be shared with other
+    processes. Thus, this backend is only useful if the crawler runs in the
+    same process as the web app (e.g. for ephemeral setups or in tests).
+    """
+
+    def __init__(self) -> None:
+        # Each entry consists of the value, its checksum, version and the
+        # last_checked timestamp.
+        self._objects: Dict[str, Tuple[Dict, str, int, Optional[float]]] = {}
+        self._data_version = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        entry = self._objects.get(key)
+        if entry is None:
+            return None
+        value, _, _, last_checked = entry
+        # Return a copy, so the caller cannot modify the stored value either
+        return refresh_timestamp(copy.deepcopy(value), last_checked)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        objects = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                objects[key] = value
+        return objects
+
+    def put(self, key: str, value: Dict) -> bool:
+        checksum = calculate_checksum(value)
+        now = value.get("_timestamp", time.time())
+        with self._lock:
+            entry = self._objects.get(key)
+            if entry is not None and entry[1] == checksum:
+                # Only updating the last check doesn't invalidate the readers'
+                # caches
+                self._objects[key] = (entry[0], checksum, entry[2], now)
+                return False
+            self._data_version += 1
+            version = entry[2] + 1 if entry is not None else 1
+            # Store a copy, so the caller cannot modify the stored value
+            self._objects[key] = (copy.deepcopy(value), checksum, version, now)
+        return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if self._objects.pop(key, None) is not None:
+                self._data_version += 1
+
+    def scan(self, prefix: str) -> Iterator[Tuple[str, Dict]]:
+        for key in sorted(self._objects):
+            if key.startswith(prefix):
+                value = self.get(key)
+                if value is not None:
+                    yield key, value
+
+    def get_versions(self, keys: Iterable[str]) -> Dict[str, int]:
+        return {key: self._objects[key][2] for key in keys if key in self._objects}
+
+    def get_last_checked(self, keys: Iterable[str]) -> Dict[str, float]:
+        timestamps = {}
+        for key in keys:
+            entry = self._objects.get(key)
+            if entry is not None and entry[3] is not None:
+                timestamps[key] = entry[3]
+        return timestamps
+
+    def data_version(self) -> Hashable:
+        return self._data_version
+
+
+class MmapBackend(StorageBackend):
+    """
+    Store each value in a separate file which is read via mmap.
+
+    Every file starts with a fixed-size header, followed by the stored value
+    (or the marker for encoded values, see Serializer) and the encoded
+    payload. Values are written to a temporary file first, which then
+    atomically replaces the existing one. Thus, readers in other processes
+    always see a complete value.
+
+    An unchanged value only updates the last_checked field in the header of
+    the existing file. This doesn't change the data_version, so the caches of
+    the readers stay valid (use get_last_checked() to get the latest check).
+
+    Every other write increments a sequence number which is stored in a
+    separate file in the same directory and used as data_version.
+    """
+
+    # magic, version, last_checked, checksum, length of the stored value
+    HEADER = struct.Struct("<4sQd16sI")
+    MAGIC = b"FLR1"
+    # Offset of the last_checked field in the header
+    LAST_CHECKED_OFFSET = 12
+    # Files starting with a dot are not considered as stored values
+    SEQUENCE_FILENAME = ".sequence"
+    SEQUENCE = struct.Struct("<Q")
+
+    def __init__(self, directory: str, serializer: Optional[Serializer] = None) -> None:
+        self.directory = directory
+        self.serializer = serializer or Serializer()
+        # Guards the comparison with the existing value and its replacement
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Dict]:
+        entry = self._read(key)
+        if entry is None:
+            return None
+        _, last_checked, _, stored_value, payload = entry
+        value = deserialize(stored_value, payload)
+        return refresh_timestamp(value, last_checked)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        objects = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                objects[key] = value
+        return objects
+
+    def put(self, key: str, value: Dict) -> bool:
+        checksum = bytes.fromhex(calculate_checksum(value))
+        stored_value, payload = self.serializer.serialize(value)
+        now = value.get("_timestamp", time.time())
+
+        with self._lock:
+            version = 1
+            entry = self._read(key, with_value=payload is not None)
+            if entry is not None:
+                old_version, _, old_checksum, old_stored_value, old_payload = entry
+                # As for the SQLite backend, values stored in a different format
+                # are written again.
+                same_format = (old_payload is None) == (payload is None) and (
+                    payload is None or old_stored_value == stored_value
+                )
+                if old_checksum == checksum and same_format:
+                    self._touch(key, now)
+                    return False
+                version = old_version + 1
+
+            LOGGER.debug("Writing object with key '%s' to '%s'", key, self.directory)
+            encoded_value = json.dumps(stored_value, separators=(",", ":")).encode(
+                "utf-8"
+            )
+            header = self.HEADER.pack(
+                self.MAGIC, version, now, checksum, len(encoded_value)
+            )
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(header)
+                    f.write(encoded_value)
+                    if payload is not None:
+                        f.write(payload)
+                os.replace(tmp_path, self._path(key))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self._increment_sequence()
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            try:
+                os.unlink(self._path(key))
+            except FileNotFoundError:
+                return
+            self._increment_sequence()
+
+    def scan(self, prefix: str) -> Iterator[Tuple[str, Dict]]:
+        for key in sorted(self._keys()):
+            if key.startswith(prefix):
+                value = self.get(key)
+                if value is not None:
+                    yield key, value
+
+    def get_versions(self, keys: Iterable[str]) -> Dict[str, int]:
+        versions = {}
+        for key in keys:
+            entry = self._read(key, with_value=False)
+            if entry is not None:
+                versions[key] = entry[0]
+        return versions
+
+    def get_last_checked(self, keys: Iterable[str]) -> Dict[str, float]:
+        timestamps = {}
+        for key in keys:
+            entry = self._read(key, with_value=False)
+            if entry is not None:
+                timestamps[key] = entry[1]
+        return timestamps
+
+    def data_version(self) -> Hashable:
+        # The directory's mtime alone is not sufficient, as its granularity
+        # might be too coarse to distinguish two writes in quick succession.
+        # It's still included to notice values that were written by a
+        # different instance (e.g. after the sequence file was removed).
+        return self._read_sequence(), os.stat(self.directory).st_mtime_ns
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, quote(key, safe=""))
+
+    def _keys(self) -> Iterator[str]:
+        for filename in os.listdir(self.directory):
+            if not filename.startswith("."):
+                yield unquote(filename)
+
+    def _read(
+        self, key: str, with_value: bool = True
+    ) -> Optional[Tuple[int, float, bytes, Any, Optional[bytes]]]:
+        try:
+            f = open(self._path(key), "rb")
+        except FileNotFoundError:
+            return None
+
+        with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, version, last_checked, checksum, length = self.HEADER.unpack_from(mm)
+            if magic != self.MAGIC:
+                LOGGER.error("Invalid file for object with key '%s'", key)
+                return None
+            if not with_value:
+                return version, last_checked, checksum, None, None
+
+            start = self.HEADER.size
+            end = start + length
+            stored_value = json.loads(mm[start:end])
+            payload = mm[end:] or None
+        return version, last_checked, checksum, stored_value, payload
+
+    def _read_sequence(self) -> int:
+        try:
+            with open(os.path.join(self.directory, self.SEQUENCE_FILENAME), "rb") as f:
+                data = f.read(self.SEQUENCE.size)
+        except FileNotFoundError:
+            return 0
+        if len(data) != self.SEQUENCE.size:
+            return 0
+        return self.SEQUENCE.unpack(data)[0]
+
+    def _increment_sequence(self) -> None:
+        # Replace the file atomically, so readers never see a partial write
+        sequence = self._read_sequence() + 1
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.SEQUENCE.pack(sequence))
+            os.replace(tmp_path, os.path.join(self.directory, self.SEQUENCE_FILENAME))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _touch(self, key: str, last_checked: float) -> None:
+        # Only update the last_checked timestamp in the header
+        with open(self._path(key), "r+b") as f:
+            f.seek(self.LAST_CHECKED_OFFSET)
+            f.write(struct.pack("<d", last_checked))
+
+
+def resolve_database_file(filename: str) -> str:
+    # Keep special names like ":memory:" as they are
+    if filename.startswith(":") or os.path.isabs(filename):
+        return filename
+    return os.path.join(DATABASE_BASE_DIRECTORY, filename)
+
+
+def create_storage(
+    config: Mapping[str, Any], read_only: bool = False
+) -> StorageBackend:
+    """Create the storage backend as specified in the given config."""
+    serializer = Serializer(
+        codec=config.get("DATABASE_CODEC", DEFAULT_CODEC),
+        compression=config.get("DATABASE_COMPRESSION"),
+        compression_threshold=config.get(
+            "DATABASE_COMPRESSION_THRESHOLD", DEFAULT_COMPRESSION_THRESHOLD
+        ),
+    )
+
+    backend = config.get("STORAGE_BACKEND", DEFAULT_STORAGE_BACKEND)
+    LOGGER.debug("Using storage backend '%s'", backend)
+    if backend == "sqlite":
+        # TODO (felix): Maybe we could drop the 'create_db' here?
+        # Usually, it should be sufficient, when the crawler creates the
+        # database. If it is not created here, we should just provide some
+        # message to start the crawler.
+        db = create_database_and_entities(
+            provider="sqlite",
+            filename=resolve_database_file(config["DATABASE_FILE"]),
+            create_db=True,
+            pragmas=config.get("DATABASE_PRAGMAS"),
+            read_only=read_only,
+        )
+        return SQLiteBackend(db, serializer)
+    if backend == "sqlite-kv":
+        return SQLiteKVBackend(
+            resolve_database_file(config["DATABASE_FILE"]),
+            serializer,
+            pragmas=config.get("DATABASE_PRAGMAS"),
+            read_only=read_only,
+        )
+    if backend == "memory":
+        return MemoryBackend()
+    if backend == "mmap":
+        directory = config.get("STORAGE_DIRECTORY")
+        if directory is None:
+            raise FlirrorConfigError(
+                "The 'mmap' storage backend requires the STORAGE_DIRECTORY setting"
+            )
+        return MmapBackend(directory, serializer)
+
+    raise FlirrorConfigError(
+        f"Unknown storage backend '{backend}'. Must be one of 'sqlite', "
+        "'sqlite-kv', 'memory' or 'mmap'"
+    )
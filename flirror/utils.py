@@ -1,19 +1,21 @@
 import importlib
 import logging
-import pkgutil
 import re
 from datetime import datetime
 from types import ModuleType
-from typing import Dict, Iterable, Tuple, Union
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
 import arrow
 
 from flirror.exceptions import FlirrorConfigError
-from flirror.modules import FlirrorModule
-
+from flirror.modules import BUILTIN_MODULES, FlirrorModule, ModuleRegistry
+from flirror.plugins import discover_plugin_index, find_plugin_packages
 
 LOGGER = logging.getLogger(__name__)
 
+# The supported units for intervals and the corresponding scheduling methods
+INTERVAL_METHODS = {"s": "seconds", "m": "minutes", "h": "hours"}
+
 
 def prettydate(date: Union[datetime, float]) -> str:
     """
@@ -70,21 +72,24 @@ def clean_string(string: str) -> str:
     return re.sub(r"(?u)[^-\w.]", "", string)
 
 
-def discover_plugins() -> Dict[str, ModuleType]:
+def discover_plugins(
+    package_names: Optional[Iterable[str]] = None,
+) -> Dict[str, ModuleType]:
     """
     Discover installed flirror plugins following the naming schema 'fliror_*'.
 
-    Find all installed packages starting with 'flirror_' using the pkgutil
-    module and returns them.
+    Import the given packages or, if not given, find all installed packages
+    starting with 'flirror_' using the pkgutil module and returns them.
+
+    Plugins providing entry points are found without importing them (see
+    flirror.plugins).
 
     For more information, see
     https://packaging.python.org/guides/creating-and-discovering-plugins/
     """
-    discovered_plugins = {
-        name: importlib.import_module(name)
-        for finder, name, ispkg in pkgutil.iter_modules()
-        if name.startswith("flirror_")
-    }
+    if package_names is None:
+        package_names = find_plugin_packages()
+    discovered_plugins = {name: importlib.import_module(name) for name in package_names}
 
     LOGGER.debug(
         "Found the following flirror plugins: '%s'",
@@ -95,7 +100,7 @@ def discover_plugins() -> Dict[str, ModuleType]:
 
 
 def discover_flirror_modules(
-    discovered_plugins: Dict[str, ModuleType]
+    discovered_plugins: Dict[str, ModuleType],
 ) -> Iterable[FlirrorModule]:
     """
     Look up FlirroModule instances from a list of discovered plugins.
@@ -156,3 +161,52 @@ def discover_flirror_modules(
         all_discovered_flirror_modules.extend(discovered_flirror_modules)
 
     return all_discovered_flirror_modules
+
+
+def find_modules(
+    names: Iterable[str], plugin_cache_file: Optional[str] = None
+) -> Dict[str, FlirrorModule]:
+    """
+    Import the flirror modules with the given names.
+
+    Other modules (and their dependencies) are not imported at all. The
+    plugins are only searched for modules which are not built in. Plugins
+    providing entry points are preferred, as only the ones for the requested
+    modules are imported. The others are only imported if a module is still
+    missing. The installed plugins are looked up in the plugin cache file,
+    which is only updated once the installed distributions changed.
+
+    Returns the found modules by their names.
+    """
+    modules: Dict[str, FlirrorModule] = {}
+    missing: List[str] = []
+    for name in dict.fromkeys(names):
+        if name in BUILTIN_MODULES:
+            modules[name] = BUILTIN_MODULES.load(name)
+        else:
+            missing.append(name)
+    if not missing:
+        return modules
+
+    index = discover_plugin_index(plugin_cache_file)
+    plugin_modules = ModuleRegistry(index.entry_points)
+    remaining = []
+    for name in missing:
+        if name not in plugin_modules:
+            remaining.append(name)
+            continue
+        try:
+            modules[name] = plugin_modules.load(name)
+        except Exception:
+            LOGGER.exception("Could not load module '%s' from its plugin", name)
+
+    if remaining and index.packages:
+        plugins = discover_plugins(index.packages)
+        for fm in discover_flirror_modules(plugins):
+            if fm.name in remaining:
+                modules[fm.name] = fm
+
+    for name in missing:
+        if name not in modules:
+            LOGGER.warning("Could not find any module named '%s'", name)
+    return modules
@@ -1,10 +1,42 @@
 import abc
-from collections import defaultdict, OrderedDict
-from typing import Any, Dict
+import hashlib
+import json
+import logging
+import queue
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterator, Optional
 
-from flask import current_app, render_template
+from flask import (
+    current_app,
+    jsonify,
+    make_response,
+    render_template,
+    request,
+    Response,
+    stream_with_context,
+    url_for,
+)
 from flask.views import MethodView
 
+from flirror.helpers import compact_jsonify, not_modified
+from flirror.modules import FlirrorModule
+
+LOGGER = logging.getLogger(__name__)
+
+# Seconds after which a stream is closed. The browser reconnects right away,
+# but this ensures that a stream doesn't block a (sync) gunicorn worker longer
+# than its timeout (30 secs by default).
+DEFAULT_STREAM_TIMEOUT = 25
+# Seconds between two checks for changed data, if no event log is available
+DEFAULT_STREAM_POLL_INTERVAL = 2
+# Seconds after which a comment is sent to keep an idle connection open
+STREAM_KEEPALIVE_INTERVAL = 15
+# Milliseconds the browser waits before reconnecting to a closed stream
+STREAM_RETRY = 1000
+# Seconds the browser may use the cached index page without revalidating it
+DEFAULT_INDEX_MAX_AGE = 3600
+
 
 class FlirrorMethodView(MethodView):
     @property
@@ -46,7 +78,46 @@ class IndexView(FlirrorMethodView):
     rule = "/"
     template_name = "index.html"
 
-    def get(self) -> str:
+    def get(self) -> Response:
+        app = current_app
+        stream = app.config.get("STREAM_UPDATES", False)
+
+        # Prerendered tiles contain the current data and thus can't be cached
+        if app.config.get("PRERENDER_TILES", False):
+            return make_response(self._render(stream, prerender=True))
+
+        # Apart from the tiles' content (which is loaded via ajax), the page
+        # only depends on the configuration. Thus, it's rendered once and
+        # served from the cache until the configuration changes.
+        index_cache = app.extensions.get("index_cache")
+        if index_cache is None:
+            return make_response(self._render(stream))
+
+        key = (
+            app.module_configs.config_hash,
+            stream,
+            app.config.get("CLIENT_RENDERING", False),
+            tuple(sorted(app.get_required_assets())),
+            request.script_root,
+        )
+        entry = index_cache.get(key)
+        if entry is None:
+            html = self._render(stream)
+            entry = (html, hashlib.sha1(html.encode("utf-8")).hexdigest())
+            index_cache.set(key, entry)
+        html, etag = entry
+
+        response = not_modified(etag)
+        if response is None:
+            response = make_response(html)
+            response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = app.config.get(
+            "INDEX_MAX_AGE", DEFAULT_INDEX_MAX_AGE
+        )
+        return response
+
+    def _render(self, stream: bool, prerender: bool = False) -> str:
         # The dictionary holding all necessary context data for the index
         # template. Here we have also place for overall meta data (like flirror
         # version or so).
@@ -55,44 +126,277 @@ class IndexView(FlirrorMethodView):
             "unpositioned_tiles": [],
         }
 
-        config_modules = current_app.config.get("MODULES", [])
+        # The modules are already grouped by position and sorted by the
+        # module config registry. Modules without position information will
+        # always be placed after the positioned modules.
+        module_configs = current_app.module_configs
+
+        # Tiles of modules without crawler never change and thus can't be
+        # updated via the stream.
+        streamed_modules = current_app.get_streamed_modules()
+
+        # Render all tiles right away (with a single bulk fetch of their
+        # data), so the page doesn't stay blank until the first ajax calls
+        # return. The browser refreshes them afterwards as usual.
+        rendered_tiles: Dict[str, Dict[str, Any]] = {}
+        if prerender:
+            rendered_tiles = current_app.get_module_templates(
+                module_id
+                for module_id, module in current_app.get_configured_modules(
+                    m.id for m in module_configs
+                ).items()
+                if module.batched
+            )
 
-        # Group modules by position and sort positions in asc order
-        pos_modules = defaultdict(list)
-        # Modules without position information will always be placed after the
-        # positioned modules.
-        unpos_modules = []
-        for module in config_modules:
-            pos = module.get("display", {}).get("position")
-            if pos is not None:
-                pos_modules[pos].append(module)
-            else:
-                unpos_modules.append(module)
-        sort_pos_modules = OrderedDict(sorted(pos_modules.items()))
+        # Modules with a client-side renderer get their tiles' data rather
+        # than the rendered templates (if enabled).
+        client_modules = {}
+        if current_app.config.get("CLIENT_RENDERING", False):
+            client_modules = {
+                module_id: module
+                for module_id, module in current_app.get_configured_modules(
+                    m.id for m in module_configs
+                ).items()
+                if module.renderer is not None
+            }
+        ctx_data["renderers"] = list(
+            dict.fromkeys(
+                url_for(f"{module.name}.static", filename=module.renderer)
+                for module in client_modules.values()
+            )
+        )
 
-        for position, module_configs in sort_pos_modules.items():
-            for module_config in module_configs:
-                ctx_data["tiles"][position].append(self._get_module_info(module_config))
+        for position, position_configs in module_configs.layout.items():
+            for module_config in position_configs:
+                ctx_data["tiles"][position].append(
+                    self._get_module_info(
+                        module_config, streamed_modules, rendered_tiles, client_modules
+                    )
+                )
 
-        for module_config in unpos_modules:
-            ctx_data["unpositioned_tiles"].append(self._get_module_info(module_config))
+        for module_config in module_configs.unpositioned:
+            ctx_data["unpositioned_tiles"].append(
+                self._get_module_info(
+                    module_config, streamed_modules, rendered_tiles, client_modules
+                )
+            )
+
+        ctx_data["stream"] = stream
 
         context = self.get_context(**ctx_data)
         return render_template(self.template_name, **context)
 
     @staticmethod
-    def _get_module_info(module_config):
-        module_id = module_config.get("id")
-        # TODO (felix): Remove this fallback in a later future version
-        module_name = module_config.get("module") or module_config.get("type")
-        # TODO Error handling for wrong/missing keys
+    def _get_module_info(
+        module_config, streamed_modules, rendered_tiles, client_modules
+    ):
+        module_id = module_config.id
 
         # NOTE (felix): The index view will only ensure that the
         # modules are positioned properly. The content of each tile
-        # will be loaded asynchronously via ajax.
+        # will be loaded asynchronously via ajax (unless it was prerendered).
+        # Tiles which failed to render are left empty and loaded via ajax.
+        tile = rendered_tiles.get(module_id, {})
+
+        renderer = None
+        view_url = None
+        module = client_modules.get(module_id)
+        if module is not None:
+            renderer = {
+                "name": module.name,
+                "id": module_id,
+                "config": module.get_client_config(module_config.config),
+                "display": module_config.display,
+            }
+        else:
+            module = current_app.modules.get(module_config.module)
+            if isinstance(module, FlirrorModule) and not module.batched:
+                # The module might use its own context or template, so its
+                # tile is loaded via the module's view rather than /tiles.
+                view_url = f"{url_for('index')}{module.name}/"
         return {
             "id": module_id,
-            "name": module_name,
-            "config": module_config.get("config"),
-            "display": module_config.get("display"),
+            "name": module_config.module,
+            "config": module_config.config,
+            "display": module_config.display,
+            "streamed": module_id in streamed_modules,
+            "template": tile.get("_template"),
+            "etag": tile.get("etag"),
+            "renderer": renderer,
+            "view_url": view_url,
+        }
+
+
+class TilesView(FlirrorMethodView):
+    """
+    Render the tiles of multiple modules with a single request.
+
+    The module IDs are provided as comma-separated list via the "ids"
+    parameter. Errors are reported for each module separately.
+    """
+
+    endpoint = "tiles"
+    rule = "/tiles"
+
+    def get(self) -> Response:
+        ids = request.args.get("ids")
+        if not ids:
+            return current_app.json_abort(400, "Parameter 'ids' is missing")
+        module_ids = list(
+            dict.fromkeys(filter(None, (m.strip() for m in ids.split(","))))
+        )
+
+        # The tiles are rendered by the client (output=data) or the server
+        client_rendered = request.args.get("output") == "data"
+
+        # Tag the whole batch, so the browser can revalidate it without
+        # rendering any of the tiles again.
+        modules = current_app.get_configured_modules(module_ids)
+        versions = current_app.get_module_versions(modules)
+        if client_rendered:
+            etags = current_app.get_module_data_etags(modules, versions)
+        else:
+            etags = current_app.get_module_etags(
+                {m_id: module.template_name for m_id, module in modules.items()},
+                versions,
+            )
+        etag = hashlib.sha1(
+            json.dumps([[m, etags.get(m)] for m in module_ids]).encode("utf-8")
+        ).hexdigest()
+        response = not_modified(etag)
+        if response is not None:
+            return response
+
+        if client_rendered:
+            # The tiles are rendered by the client, so keep the response small
+            tiles = current_app.get_modules_client_data(module_ids, versions=versions)
+            response = compact_jsonify({"tiles": tiles})
+        else:
+            tiles = current_app.get_module_templates(module_ids, versions=versions)
+            response = jsonify({"tiles": tiles})
+        # Don't tag the response if any tile failed unexpectedly, so it's
+        # rendered again on the next request.
+        if not any(tile.get("error") == 500 for tile in tiles.values()):
+            response.set_etag(etag)
+        return response
+
+
+class StreamView(FlirrorMethodView):
+    """
+    Push the tiles of modules whose data changed via Server-Sent Events.
+
+    Rather than polling each module separately, the browser opens a single
+    stream. Whenever the tile of a module changes (detected via its entity
+    tag), the freshly rendered tile is sent as "tile" event. The tags change
+    with the module's data, but also once every RENDER_CACHE_TTL seconds, so
+    relative times like "5 minutes ago" stay correct. With an event log
+    configured, changes are picked up immediately, otherwise the tags are
+    checked periodically.
+
+    Each event's ID contains the entity tags sent so far. When the browser
+    reconnects (e.g. after the stream timed out), it sends this ID back and
+    only tiles that changed in between are sent again.
+    """
+
+    endpoint = "stream"
+    rule = "/stream"
+
+    def get(self) -> Response:
+        app = current_app._get_current_object()
+        known_etags = self._parse_etags(request.headers.get("Last-Event-ID"))
+        response = Response(
+            stream_with_context(self._stream(app, known_etags)),
+            mimetype="text/event-stream",
+        )
+        response.headers["Cache-Control"] = "no-cache"
+        # Disable response buffering in proxies like nginx
+        response.headers["X-Accel-Buffering"] = "no"
+        return response
+
+    def _stream(self, app, known_etags: Dict[str, str]) -> Iterator[str]:
+        streamed_modules = app.get_streamed_modules()
+        timeout = app.config.get("STREAM_TIMEOUT", DEFAULT_STREAM_TIMEOUT)
+        poll_interval = app.config.get(
+            "STREAM_POLL_INTERVAL", DEFAULT_STREAM_POLL_INTERVAL
+        )
+
+        # Wake up as soon as the crawler announces a change
+        changes: "queue.Queue" = queue.Queue()
+        events = app.extensions.get("events")
+        unsubscribe = events.subscribe(changes.put) if events is not None else None
+
+        now = time.monotonic()
+        deadline = now + timeout
+        last_sent = now
+        try:
+            yield f"retry: {STREAM_RETRY}\n\n"
+            while True:
+                versions = app.get_module_versions(streamed_modules)
+                etags = app.get_module_etags(streamed_modules, versions)
+                for module_id, etag in etags.items():
+                    if known_etags.get(module_id) == etag:
+                        continue
+                    tile = self._render_tile(
+                        app, module_id, streamed_modules[module_id], versions[module_id]
+                    )
+                    known_etags[module_id] = etag
+                    if tile is not None:
+                        last_sent = time.monotonic()
+                        yield self._format_event(tile, known_etags)
+
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                if now - last_sent >= STREAM_KEEPALIVE_INTERVAL:
+                    last_sent = now
+                    yield ": keepalive\n\n"
+
+                wait = min(deadline - now, poll_interval)
+                if unsubscribe is not None:
+                    try:
+                        changes.get(timeout=wait)
+                    except queue.Empty:
+                        pass
+                else:
+                    time.sleep(wait)
+        finally:
+            if unsubscribe is not None:
+                unsubscribe()
+
+    @staticmethod
+    def _render_tile(
+        app, module_id: str, template_name: str, version: int
+    ) -> Optional[Dict]:
+        try:
+            template = app.get_module_template(
+                module_id, template_name, version=version
+            )
+        except Exception:
+            # Don't let a single broken module terminate the whole stream
+            LOGGER.exception("Could not render tile for module '%s'", module_id)
+            return None
+        return {"id": module_id, "_template": template}
+
+    @staticmethod
+    def _format_event(tile: Dict, etags: Dict[str, str]) -> str:
+        # NOTE (felix): Compact JSON never contains any newlines, so it can be
+        # used directly in the id and data fields.
+        event_id = json.dumps(etags, separators=(",", ":"))
+        data = json.dumps(tile, separators=(",", ":"))
+        return f"id: {event_id}\nevent: tile\ndata: {data}\n\n"
+
+    @staticmethod
+    def _parse_etags(last_event_id: Optional[str]) -> Dict[str, str]:
+        if not last_event_id:
+            return {}
+        try:
+            etags = json.loads(last_event_id)
+        except ValueError:
+            return {}
+        if not isinstance(etags, dict):
+            return {}
+        return {
+            module_id: etag
+            for module_id, etag in etags.items()
+            if isinstance(etag, str)
         }
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Compare the performance of flirror's storage backends.
+
+The benchmark stores a set of module datasets (similar in size to real crawler
+data) and measures the operations flirror-web and the crawler use the most.
+
+Usage:
+    ./helpers/benchmark-storage.py --backend sqlite --backend sqlite-kv
+"""
+
+import copy
+import itertools
+import os
+import tempfile
+import timeit
+
+import click
+
+from flirror.storage import create_storage
+
+# Roughly the size of a stocks series dataset
+VALUE = {
+    "_timestamp": 1574874186.4492302,
+    "stocks": [
+        {
+            "alias": "APPLE",
+            "data": {
+                "times": ["2019-11-21 13:15:00"] * 100,
+                "values": [
+                    {
+                        "close": "262.1350",
+                        "high": "262.4800",
+                        "low": "262.1350",
+                        "open": "262.1900",
+                        "volume": "330109",
+                    }
+                ]
+                * 100,
+            },
+        }
+    ],
+}
+
+
+def run_benchmark(backend, modules, number, tmpdir):
+    config = {
+        "STORAGE_BACKEND": backend,
+        "DATABASE_FILE": os.path.join(tmpdir, f"{backend}.sqlite"),
+        "STORAGE_DIRECTORY": os.path.join(tmpdir, backend),
+    }
+    storage = create_storage(config)
+
+    keys = [f"module.module-{i}.data" for i in range(modules)]
+    for key in keys:
+        storage.put(key, VALUE)
+
+    changed_value = copy.deepcopy(VALUE)
+    counter = itertools.count()
+
+    def put_changed():
+        changed_value["stocks"][0]["alias"] = f"APPLE {next(counter)}"
+        storage.put(keys[0], changed_value)
+
+    operations = {
+        "get": lambda: storage.get(keys[0]),
+        "get_many": lambda: storage.get_many(keys),
+        "scan": lambda: list(storage.scan("module.")),
+        "get_versions": lambda: storage.get_versions(keys),
+        "data_version": storage.data_version,
+        "put (unchanged)": lambda: storage.put(keys[0], VALUE),
+        "put (changed)": put_changed,
+    }
+
+    results = {}
+    for name, operation in operations.items():
+        # Take the best of some repetitions to reduce the noise
+        timings = timeit.repeat(operation, number=number, repeat=3)
+        results[name] = min(timings) / number
+
+    storage.close()
+    return results
+
+
+@click.command()
+@click.option(
+    "--backend",
+    "backends",
+    multiple=True,
+    default=["sqlite", "sqlite-kv"],
+    show_default=True,
+    help="The storage backend(s) to benchmark",
+)
+@click.option(
+    "--modules", default=10, show_default=True, help="Number of stored datasets"
+)
+@click.option("--number", default=200, show_default=True, help="Calls per operation")
+def benchmark(backends, modules, number):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        results = {
+            backend: run_benchmark(backend, modules, number, tmpdir)
+            for backend in backends
+        }
+
+    operations = list(next(iter(results.values())))
+    click.echo(
+        "{:<18}".format("operation") + "".join(f"{backend:>14}" for backend in backends)
+    )
+    for operation in operations:
+        timings = "".join(
+            f"{results[backend][operation] * 1e6:>11.1f} us" for backend in backends
+        )
+        click.echo(f"{operation:<18}{timings}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -8,6 +8,7 @@ from pony.orm import db_session
 
 from flirror import create_web
 from flirror.database import create_database_and_entities
+from flirror.storage import MemoryBackend
 
 FIXTURE_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "testdata")
 
@@ -40,6 +41,11 @@ def mock_empty_database(tmpdir):
     db.disconnect()
 
 
+@pytest.fixture(scope="function")
+def mock_storage():
+    return MemoryBackend()
+
+
 @db_session()
 def populate_database(db):
     # NOTE (felix): This is more or less a subset of the data contained in the
@@ -330,7 +336,11 @@ def mock_app(mock_env, tmpdir_factory):
     # this fixture be defined on a session scope.
 
     # Use the test-settings file for the mocked flask app, but patch the database path
-    config = {"DATABASE_FILE": str(tmpdir_factory.mktemp("data").join("test.db"))}
+    data_dir = tmpdir_factory.mktemp("data")
+    config = {
+        "DATABASE_FILE": str(data_dir.join("test.db")),
+        "PLUGIN_CACHE_FILE": str(data_dir.join("plugins.json")),
+    }
 
     # Overwrite the jinja options to make template rendering fail on undefined variables
     jinja_options = {"undefined": ExceptionUndefined}
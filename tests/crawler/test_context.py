@@ -0,0 +1,22 @@
+from flask import Flask
+
+from flirror.crawler.context import create_crawler_context
+from flirror.storage import MemoryBackend
+
+
+def test_crawler_context(mock_env):
+    context = create_crawler_context({"STORAGE_BACKEND": "memory"})
+
+    assert not isinstance(context, Flask)
+    assert isinstance(context.storage, MemoryBackend)
+    # Only the configured modules are loaded
+    assert set(context.modules) == {"weather", "calendar", "stocks", "newsfeed"}
+    assert context.modules["weather"]._crawler is not None
+    assert len(list(context.module_configs)) == 10
+
+    # Crawlers access the data the same way as via the Flirror app
+    assert context.get_module_data("weather-frankfurt") is None
+    context.store_module_data("weather-frankfurt", {"temp": 12})
+    assert context.get_module_data("weather-frankfurt") == {"temp": 12}
+    assert context.storage.get("module.weather-frankfurt.data") == {"temp": 12}
+    assert context.get_module_data("weather-frankfurt", "token") is None
@@ -39,6 +39,10 @@ def test_crawl_periodic(scheduler_mock, mock_env):
 
     assert result.exit_code == 0
     assert scheduler_mock.return_value.add_job.call_count == 10
+    # The jobs are scheduled with the intervals parsed from the config
+    for call in scheduler_mock.return_value.add_job.call_args_list:
+        interval, unit = call[0][2]
+        assert isinstance(interval, int)
 
     expected_log_fragments = [
         "Initializing crawler of type 'weather' with id 'weather-frankfurt'",
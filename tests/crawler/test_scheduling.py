@@ -18,6 +18,8 @@ def test_add_job():
     scheduler.add_job(dummy_crawl, "crawl_10m", "10m")
     scheduler.add_job(dummy_crawl, "crawl_1h", "1h")
     scheduler.add_job(dummy_crawl, "crawl_invalid", "mmm")
+    # The interval from a module's config is already parsed
+    scheduler.add_job(dummy_crawl, "crawl_2h", (2, "h"))
 
     jobs = scheduler.jobs
     assert jobs[0].interval == 30
@@ -40,6 +42,10 @@ def test_add_job():
     assert jobs[3].job_func.func == dummy_crawl
     assert jobs[3].tags == {"crawl_1h"}
 
+    assert jobs[4].interval == 2
+    assert jobs[4].unit == "hours"
+    assert jobs[4].tags == {"crawl_2h"}
+
 
 def _failjob():
     raise Exception("I will always fail")
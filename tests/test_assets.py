@@ -0,0 +1,203 @@
+import base64
+import gzip
+import hashlib
+import os
+import sys
+import types
+
+import pytest
+from flask import Flask, jsonify, url_for
+
+from flirror.assets import (
+    build_assets,
+    compress_static,
+    file_hash,
+    load_assets_manifest,
+    StaticFiles,
+    vendor_assets,
+    VendorLibrary,
+)
+from flirror.compression import ResponseCompressor
+from flirror.exceptions import AssetError
+
+
+def make_static_folder(tmpdir):
+    static_folder = tmpdir.mkdir("static")
+    static_folder.mkdir("css").join("style.css").write("body { color: red; }\n" * 100)
+    static_folder.join("image.png").write_binary(os.urandom(100))
+    return str(static_folder)
+
+
+def test_compress_static(tmpdir):
+    static_folder = make_static_folder(tmpdir)
+    written = compress_static(static_folder)
+
+    path = os.path.join(static_folder, "css", "style.css")
+    assert f"{path}.gz" in written
+    with open(path, "rb") as f, gzip.open(f"{path}.gz") as compressed:
+        assert compressed.read() == f.read()
+    # Binary files are not compressed
+    assert not os.path.exists(os.path.join(static_folder, "image.png.gz"))
+
+
+def test_brotli_quality(monkeypatch, tmpdir):
+    qualities = []
+
+    def compress(data, quality=11):
+        qualities.append(quality)
+        return b"br"
+
+    monkeypatch.setitem(sys.modules, "brotli", types.SimpleNamespace(compress=compress))
+
+    # The static files are compressed once with the best quality
+    compress_static(make_static_folder(tmpdir))
+    assert qualities == [11]
+
+    # The responses are compressed on the fly with a faster quality
+    app = Flask(__name__)
+    app.add_url_rule("/", "index", lambda: jsonify({"a": "b" * 1000}))
+    ResponseCompressor(encodings=["br"]).init_app(app)
+    res = app.test_client().get("/", headers={"Accept-Encoding": "br"})
+    assert res.headers["Content-Encoding"] == "br"
+    assert qualities == [11, 4]
+
+
+def test_static_files(tmpdir):
+    static_folder = make_static_folder(tmpdir)
+    compress_static(static_folder)
+    app = Flask(__name__, static_folder=static_folder)
+    static_files = StaticFiles(static_folder)
+    app.url_defaults(static_files.inject_hash)
+    app.view_functions["static"] = static_files.send
+
+    content_hash = file_hash(os.path.join(static_folder, "css", "style.css"))
+    with app.test_request_context():
+        url = url_for("static", filename="css/style.css")
+    assert url == f"/static/css/style.css?v={content_hash}"
+
+    client = app.test_client()
+    res = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert res.status_code == 200
+    assert res.headers["Content-Encoding"] == "gzip"
+    assert res.headers["Content-Type"].startswith("text/css")
+    assert res.cache_control.immutable
+    assert res.cache_control.max_age == 365 * 24 * 60 * 60
+    res.close()
+
+    # Without the current hash, the file is not cached forever
+    res = client.get("/static/css/style.css?v=outdated")
+    assert "Content-Encoding" not in res.headers
+    assert not res.cache_control.immutable
+    res.close()
+
+
+def test_static_files_outdated_copy(tmpdir):
+    static_folder = make_static_folder(tmpdir)
+    compress_static(static_folder)
+    path = os.path.join(static_folder, "css", "style.css")
+    # Modify the file after it was compressed
+    stat = os.stat(f"{path}.gz")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+
+    app = Flask(__name__, static_folder=static_folder)
+    app.view_functions["static"] = StaticFiles(static_folder).send
+    res = app.test_client().get(
+        "/static/css/style.css", headers={"Accept-Encoding": "gzip"}
+    )
+    assert "Content-Encoding" not in res.headers
+    res.close()
+
+
+def test_build_assets(monkeypatch, tmpdir):
+    static_folder = make_static_folder(tmpdir)
+    css = {"content": "body{color:red}"}
+    monkeypatch.setattr("flirror.assets.compile_scss", lambda path: css["content"])
+    assert load_assets_manifest(static_folder) == {}
+
+    manifest = build_assets(static_folder)
+    assert load_assets_manifest(static_folder) == manifest
+    filename = manifest["all.css"]
+    assert filename.startswith("dist/all.") and filename.endswith(".css")
+    with open(os.path.join(static_folder, filename)) as f:
+        assert f.read() == "body{color:red}"
+
+    # A changed stylesheet gets a new filename and the old one is removed
+    css["content"] = "body{color:blue}"
+    compress_static(static_folder)
+    new_manifest = build_assets(static_folder)
+    assert new_manifest["all.css"] != filename
+    assert sorted(os.listdir(os.path.join(static_folder, "dist"))) == [
+        os.path.basename(new_manifest["all.css"]),
+        "manifest.json",
+    ]
+
+
+def make_vendor_libraries(monkeypatch, files):
+    def integrity(data):
+        return "sha256-" + base64.b64encode(hashlib.sha256(data).digest()).decode()
+
+    libraries = [
+        VendorLibrary(
+            "lib.css", "https://cdn.test/lib/css/lib.css", None, "vendor.css"
+        ),
+        VendorLibrary(
+            "lib.js",
+            "https://cdn.test/lib/lib.js",
+            integrity(files["https://cdn.test/lib/lib.js"]),
+            "vendor.js",
+        ),
+        VendorLibrary("chart.js", "https://cdn.test/chart.js", None, "charts.js"),
+    ]
+    monkeypatch.setattr("flirror.assets.VENDOR_LIBRARIES", libraries)
+    return libraries
+
+
+def test_vendor_assets(monkeypatch, tmpdir):
+    static_folder = make_static_folder(tmpdir)
+    files = {
+        "https://cdn.test/lib/css/lib.css": (
+            b"/* comment */\n"
+            b"@font-face { src: url(../fonts/icons.eot?#iefix) }\n"
+            b"  .logo { background: url('data:image/png;base64,AAAA') }\n"
+        ),
+        "https://cdn.test/lib/fonts/icons.eot": b"font",
+        "https://cdn.test/lib/lib.js": b"var lib = 1",
+        "https://cdn.test/chart.js": b"var chart = 1",
+    }
+    make_vendor_libraries(monkeypatch, files)
+    monkeypatch.setattr("flirror.assets.compile_scss", lambda path: "body{}")
+
+    written = vendor_assets(static_folder, fetch=files.__getitem__)
+    assert len(written) == 4
+
+    manifest = build_assets(static_folder)
+    assert set(manifest) == {"all.css", "vendor.css", "vendor.js", "charts.js"}
+    with open(os.path.join(static_folder, manifest["vendor.css"])) as f:
+        css = f.read()
+    # The referenced files are downloaded and the stylesheet is minified
+    assert "comment" not in css
+    assert "url('data:image/png;base64,AAAA')" in css
+    font_url = css.split('url("')[1].split('"')[0]
+    assert font_url.startswith("../vendor/files/") and font_url.endswith("#iefix")
+    font_path = os.path.join(static_folder, "dist", font_url.split("#")[0])
+    with open(font_path, "rb") as f:
+        assert f.read() == b"font"
+    with open(os.path.join(static_folder, manifest["vendor.js"])) as f:
+        assert f.read() == "var lib = 1"
+
+
+def test_vendor_assets_integrity(monkeypatch, tmpdir):
+    static_folder = make_static_folder(tmpdir)
+    files = {
+        "https://cdn.test/lib/css/lib.css": b"body{}",
+        "https://cdn.test/lib/lib.js": b"var lib = 1",
+        "https://cdn.test/chart.js": b"var chart = 1",
+    }
+    make_vendor_libraries(monkeypatch, files)
+    files["https://cdn.test/lib/lib.js"] = b"var lib = 2"
+
+    with pytest.raises(AssetError):
+        vendor_assets(static_folder, fetch=files.__getitem__)
+    # Bundles whose libraries were not vendored are skipped
+    monkeypatch.setattr("flirror.assets.compile_scss", lambda path: "body{}")
+    assert set(build_assets(static_folder)) == {"all.css", "vendor.css"}
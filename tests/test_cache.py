@@ -0,0 +1,147 @@
+import sqlite3
+import threading
+
+from flirror.cache import LRUCache, RenderCache, StorageCache
+from flirror.database import store_object_by_key
+from flirror.storage import MemoryBackend, SQLiteBackend
+
+
+def test_lru_cache_eviction():
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    # Access "a", so "b" becomes the least recently used entry
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert len(cache) == 2
+
+
+def test_lru_cache_stats():
+    cache = LRUCache(max_size=10)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("a")
+    cache.get("unknown")
+
+    assert cache.stats == {"hits": 2, "misses": 1, "size": 1, "max_size": 10}
+
+
+def test_render_cache_expiry(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr("flirror.cache.time.monotonic", lambda: now)
+    cache = RenderCache(max_size=10, ttl=60)
+    cache.set_template("a", "<div>a</div>")
+    assert cache.get_template("a") == "<div>a</div>"
+
+    now += 60
+    assert cache.get_template("a") is None
+    assert "a" not in cache
+    assert cache.stats == {
+        "hits": 1,
+        "misses": 1,
+        "size": 0,
+        "max_size": 10,
+        "expired": 1,
+    }
+
+
+def test_storage_cache_read_through(mock_empty_database):
+    store_object_by_key(mock_empty_database, "module.a.data", {"a": 1})
+    cache = StorageCache(SQLiteBackend(mock_empty_database))
+
+    assert cache.get_object("module.a.data") == {"a": 1}
+    assert cache.get_object("module.a.data") == {"a": 1}
+    assert cache.get_object("module.unknown.data") is None
+    assert cache.get_object("module.unknown.data") is None
+    assert cache.hits == 2
+    assert cache.misses == 2
+
+
+def test_storage_cache_invalidation(mock_empty_database, tmpdir):
+    store_object_by_key(mock_empty_database, "module.a.data", {"a": 1})
+    cache = StorageCache(SQLiteBackend(mock_empty_database))
+    assert cache.get_object("module.a.data") == {"a": 1}
+
+    # Simulate a write from another process (e.g. the crawler) using a separate
+    # database connection.
+    connection = sqlite3.connect(str(tmpdir.join("test_database.sqlite")))
+    with connection:
+        connection.execute(
+            "UPDATE FlirrorObject SET value = ? WHERE key = ?",
+            ('{"a": 2}', "module.a.data"),
+        )
+    connection.close()
+
+    assert cache.get_object("module.a.data") == {"a": 2}
+
+
+def test_storage_cache_get_objects(mock_empty_database):
+    store_object_by_key(mock_empty_database, "module.a.data", {"a": 1})
+    store_object_by_key(mock_empty_database, "module.b.data", {"b": 2})
+    cache = StorageCache(SQLiteBackend(mock_empty_database))
+
+    assert cache.get_object("module.a.data") == {"a": 1}
+    objects = cache.get_objects(["module.a.data", "module.b.data", "module.c.data"])
+    assert objects == {"module.a.data": {"a": 1}, "module.b.data": {"b": 2}}
+    # Only "module.a.data" was served from the cache
+    assert cache.hits == 1
+
+
+def test_storage_cache_memory_backend():
+    storage = MemoryBackend()
+    storage.put("module.a.data", {"a": 1})
+    cache = StorageCache(storage)
+    assert cache.get_object("module.a.data") == {"a": 1}
+
+    storage.put("module.a.data", {"a": 2})
+    assert cache.get_object("module.a.data") == {"a": 2}
+    assert cache.hits == 0
+
+
+def test_storage_cache_new_thread():
+    storage = MemoryBackend()
+    storage.put("module.a.data", {"a": 1})
+    cache = StorageCache(storage)
+    assert cache.get_object("module.a.data") == {"a": 1}
+
+    # A new thread doesn't trust the entries read before it checked the
+    # storage for the first time, but doesn't invalidate them for others.
+    thread = threading.Thread(target=cache.get_object, args=("module.a.data",))
+    thread.start()
+    thread.join()
+    assert cache.misses == 2
+
+    assert cache.get_object("module.a.data") == {"a": 1}
+    assert cache.hits == 1
+
+
+def test_storage_cache_outdated_entry():
+    storage = MemoryBackend()
+    storage.put("module.a.data", {"a": 1})
+    cache = StorageCache(storage)
+
+    # A slow reader got the old value before the storage was changed
+    valid_since, tick = cache.validate()
+    value = storage.get("module.a.data")
+    storage.put("module.a.data", {"a": 2})
+    cache.delete("module.a.data")
+    cache._set_entry("module.a.data", value, tick)
+
+    # The outdated value is never served after the change was detected
+    assert cache.get_object("module.a.data") == {"a": 2}
+    # And not replaced by the slow reader either
+    cache._set_entry("module.a.data", value, tick)
+    assert cache.get_object("module.a.data") == {"a": 2}
+    assert cache.hits == 1
+
+
+def test_store_module_data_invalidates_cache(mock_app):
+    app = mock_app.application
+    assert app.get_module_data("news-tagesschau")["news"]
+
+    app.store_module_data("news-tagesschau", {"_timestamp": 0, "news": []})
+    assert app.get_module_data("news-tagesschau") == {"_timestamp": 0, "news": []}
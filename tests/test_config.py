@@ -0,0 +1,83 @@
+import pytest
+
+from flirror.config import ModuleConfig, ModuleConfigRegistry
+from flirror.exceptions import FlirrorConfigError
+
+
+def test_module_config():
+    module_config = ModuleConfig.from_dict(
+        {"id": "weather", "type": "weather", "crawler": {"interval": "30s"}}
+    )
+    assert module_config.id == "weather"
+    assert module_config.module == "weather"
+    assert module_config.config == {}
+    assert module_config.display == {}
+    assert module_config.position is None
+    assert module_config.interval == (30, "s")
+
+    with pytest.raises(AttributeError):
+        module_config.id = "other"
+
+
+def test_module_config_hash():
+    module_config = ModuleConfig.from_dict({"id": "weather", "module": "weather"})
+    assert (
+        module_config.config_hash
+        == ModuleConfig.from_dict({"module": "weather", "id": "weather"}).config_hash
+    )
+    assert (
+        module_config.config_hash
+        != ModuleConfig.from_dict(
+            {"id": "weather", "module": "weather", "config": {"city": "Berlin"}}
+        ).config_hash
+    )
+
+
+@pytest.mark.parametrize(
+    "module_config, error",
+    [
+        ({"module": "weather"}, "is missing an 'id'"),
+        ({"id": "weather"}, "is missing a 'module'"),
+        (
+            {"id": "weather", "module": "weather", "crawler": {"interval": "5d"}},
+            "Invalid crawler interval '5d'",
+        ),
+        (
+            {"id": "weather", "module": "weather", "crawler": {"interval": "m5"}},
+            "Could not parse interval string 'm5'",
+        ),
+    ],
+)
+def test_module_config_invalid(module_config, error):
+    with pytest.raises(FlirrorConfigError) as excinfo:
+        ModuleConfig.from_dict(module_config)
+    assert error in str(excinfo.value)
+
+
+def test_module_config_registry():
+    registry = ModuleConfigRegistry.from_config(
+        [
+            {"id": "news", "module": "newsfeed", "display": {"position": 2}},
+            {"id": "clock", "module": "clock"},
+            {"id": "weather", "module": "weather", "display": {"position": 1}},
+            {"id": "stocks", "module": "stocks", "display": {"position": 2}},
+        ]
+    )
+    assert len(registry) == 4
+    assert registry["weather"].module == "weather"
+    assert registry.get("unknown") is None
+    assert [m.id for m in registry] == ["news", "clock", "weather", "stocks"]
+    assert {
+        position: [m.id for m in modules]
+        for position, modules in registry.layout.items()
+    } == {1: ["weather"], 2: ["news", "stocks"]}
+    assert list(registry.layout) == [1, 2]
+    assert [m.id for m in registry.unpositioned] == ["clock"]
+
+
+def test_module_config_registry_duplicate_id():
+    with pytest.raises(FlirrorConfigError) as excinfo:
+        ModuleConfigRegistry.from_config(
+            [{"id": "news", "module": "newsfeed"}, {"id": "news", "module": "clock"}]
+        )
+    assert "Module ID 'news' is configured more than once" in str(excinfo.value)
@@ -0,0 +1,187 @@
+import os
+import sqlite3
+
+import pytest
+from pony.orm import db_session
+
+from flirror.database import (
+    create_database_and_entities,
+    get_object_by_key,
+    get_object_versions,
+    get_objects_by_keys,
+    iter_objects_by_prefix,
+    store_object_by_key,
+)
+from flirror.exceptions import FlirrorConfigError
+
+
+def test_store_and_get_object(mock_empty_database):
+    store_object_by_key(mock_empty_database, "some.key", {"foo": "bar"})
+    assert get_object_by_key(mock_empty_database, "some.key") == {"foo": "bar"}
+
+    # Storing an object with the same key again must update the existing entry
+    store_object_by_key(mock_empty_database, "some.key", {"foo": "baz"})
+    assert get_object_by_key(mock_empty_database, "some.key") == {"foo": "baz"}
+
+
+def test_get_object_unknown_key(mock_empty_database):
+    assert get_object_by_key(mock_empty_database, "unknown.key") is None
+
+
+def test_get_objects_by_keys(mock_empty_database):
+    store_object_by_key(mock_empty_database, "module.a.data", {"a": 1})
+    store_object_by_key(mock_empty_database, "module.b.data", {"b": 2})
+    store_object_by_key(mock_empty_database, "module.c.data", {"c": 3})
+
+    objects = get_objects_by_keys(
+        mock_empty_database, ["module.a.data", "module.c.data", "module.unknown.data"]
+    )
+    # Unknown keys are not part of the result
+    assert objects == {"module.a.data": {"a": 1}, "module.c.data": {"c": 3}}
+
+
+def test_get_objects_by_keys_empty(mock_empty_database):
+    assert get_objects_by_keys(mock_empty_database, []) == {}
+
+
+def test_iter_objects_by_prefix(mock_empty_database):
+    store_object_by_key(mock_empty_database, "module.b.data", {"b": 2})
+    store_object_by_key(mock_empty_database, "module.a.data", {"a": 1})
+    store_object_by_key(mock_empty_database, "google_oauth_token", {"token": "abc"})
+
+    objects = list(iter_objects_by_prefix(mock_empty_database, "module."))
+    assert objects == [("module.a.data", {"a": 1}), ("module.b.data", {"b": 2})]
+
+
+def test_get_modules_data(mock_app):
+    app = mock_app.application
+    modules_data = app.get_modules_data(["news-tagesschau", "unknown-module"])
+
+    assert set(modules_data.keys()) == {"news-tagesschau", "unknown-module"}
+    assert modules_data["news-tagesschau"] == app.get_module_data("news-tagesschau")
+    assert modules_data["unknown-module"] is None
+
+
+def test_get_modules_data_all_modules(mock_app):
+    app = mock_app.application
+    modules_data = app.get_modules_data()
+
+    assert set(modules_data.keys()) == {
+        "weather-frankfurt",
+        "weather-hamburg",
+        "calendar-my",
+        "news-tagesschau",
+        "stocks-series",
+        "stocks-table",
+    }
+
+
+def test_get_modules_data_for_rendering(mock_app):
+    app = mock_app.application
+    data = {"_timestamp": 1000.0, "news": [{"title": "Hello"}]}
+    app.store_module_data("news-bbc", data)
+    assert app.get_module_data("news-bbc") == data
+
+    # The crawler found the same content again, so only the last check changed
+    assert not app.storage.put("module.news-bbc.data", {**data, "_timestamp": 5000.0})
+    assert app.get_modules_data_for_rendering(["news-bbc", "unknown-module"]) == {
+        "news-bbc": {**data, "_timestamp": 5000.0},
+        "unknown-module": None,
+    }
+
+
+def test_connection_pragmas(tmpdir):
+    db = create_database_and_entities(
+        provider="sqlite",
+        filename=os.path.join(tmpdir, "test_database.sqlite"),
+        create_db=True,
+        pragmas={"synchronous": "full", "cache_size": None},
+    )
+    with db_session:
+        assert db.select("journal_mode FROM pragma_journal_mode") == ["wal"]
+        # FULL is represented by 2
+        assert db.select("synchronous FROM pragma_synchronous") == [2]
+        # The cache_size pragma was disabled and thus uses SQLite's default
+        assert db.select("cache_size FROM pragma_cache_size") == [-2000]
+    db.disconnect()
+
+
+def test_invalid_connection_pragma(tmpdir):
+    with pytest.raises(FlirrorConfigError):
+        create_database_and_entities(
+            provider="sqlite",
+            filename=os.path.join(tmpdir, "test_database.sqlite"),
+            create_db=True,
+            pragmas={"journal_mode = off; --": "wal"},
+        )
+
+
+def test_read_only_database(tmpdir):
+    database_file = os.path.join(tmpdir, "test_database.sqlite")
+    db = create_database_and_entities(
+        provider="sqlite", filename=database_file, create_db=True
+    )
+    store_object_by_key(db, "some.key", {"foo": "bar"})
+    db.disconnect()
+
+    # The read-only connection must still be able to read existing data, but
+    # fail on any write.
+    read_only_db = create_database_and_entities(
+        provider="sqlite", filename=database_file, read_only=True
+    )
+    assert get_object_by_key(read_only_db, "some.key") == {"foo": "bar"}
+    with pytest.raises(Exception, match="readonly"):
+        store_object_by_key(read_only_db, "some.key", {"foo": "baz"})
+    read_only_db.disconnect()
+
+
+def test_store_unchanged_object(mock_empty_database):
+    assert store_object_by_key(
+        mock_empty_database, "some.key", {"_timestamp": 1.0, "foo": "bar"}
+    )
+    assert get_object_versions(mock_empty_database, ["some.key"]) == {"some.key": 1}
+
+    # Only the volatile "_timestamp" changed, so the value is not written again
+    assert not store_object_by_key(
+        mock_empty_database, "some.key", {"_timestamp": 2.0, "foo": "bar"}
+    )
+    assert get_object_versions(mock_empty_database, ["some.key"]) == {"some.key": 1}
+    # But the "_timestamp" still reflects the last crawl
+    assert get_object_by_key(mock_empty_database, "some.key") == {
+        "_timestamp": 2.0,
+        "foo": "bar",
+    }
+
+    assert store_object_by_key(
+        mock_empty_database, "some.key", {"_timestamp": 3.0, "foo": "baz"}
+    )
+    assert get_object_versions(mock_empty_database, ["some.key"]) == {"some.key": 2}
+    assert get_object_by_key(mock_empty_database, "some.key") == {
+        "_timestamp": 3.0,
+        "foo": "baz",
+    }
+
+
+def test_migrate_existing_database(tmpdir):
+    database_file = os.path.join(tmpdir, "test_database.sqlite")
+    # Create a database using the initial schema of the FlirrorObject table
+    connection = sqlite3.connect(database_file)
+    with connection:
+        connection.execute(
+            'CREATE TABLE "FlirrorObject" ('
+            '"key" TEXT NOT NULL PRIMARY KEY, "value" JSON NOT NULL)'
+        )
+        connection.execute(
+            'INSERT INTO "FlirrorObject" VALUES (?, ?)', ("some.key", '{"foo": "bar"}')
+        )
+    connection.close()
+
+    db = create_database_and_entities(provider="sqlite", filename=database_file)
+    assert get_object_by_key(db, "some.key") == {"foo": "bar"}
+    assert get_object_versions(db, ["some.key"]) == {"some.key": 1}
+
+    # Existing objects don't provide a checksum yet, so the first write always
+    # updates them.
+    assert store_object_by_key(db, "some.key", {"foo": "bar"})
+    assert get_object_versions(db, ["some.key"]) == {"some.key": 2}
+    db.disconnect()
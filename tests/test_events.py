@@ -0,0 +1,89 @@
+import queue
+
+from flirror.events import ChangeEvent, EventListener, EventLog, NotifyingBackend
+from flirror.storage import MemoryBackend
+
+
+def test_event_log(tmpdir):
+    path = str(tmpdir.join("events.log"))
+    event_log = EventLog(path)
+    event_log.publish("module.a.data", 1)
+
+    # Only events published after the listener was created are read
+    listener = EventListener(path)
+    assert listener.read_events() == []
+
+    event = event_log.publish("module.b.data", 2)
+    assert listener.read_events() == [event]
+    assert listener.read_events() == []
+
+
+def test_event_log_rotation(tmpdir):
+    path = str(tmpdir.join("events.log"))
+    event_log = EventLog(path, max_size=100)
+    event_log.publish("module.a.data", 1)
+    listener = EventListener(path)
+
+    # The log is rotated in between, but the listener still reads the
+    # remaining events from the old one.
+    events = [event_log.publish(f"module.{i}.data", i) for i in range(3)]
+    assert listener.read_events() == events
+    assert listener.read_events() == []
+
+    events = [event_log.publish(f"module.{i}.data", i) for i in range(2)]
+    assert listener.read_events() == events
+
+
+def test_event_log_partial_line(tmpdir):
+    path = str(tmpdir.join("events.log"))
+    listener = EventListener(path)
+    with open(path, "a") as f:
+        f.write('{"key":"module.a.data","version":1,"timestamp":1.0}\n{"key":')
+    assert listener.read_events() == [ChangeEvent("module.a.data", 1, 1.0)]
+
+    with open(path, "a") as f:
+        f.write('"module.b.data","version":2,"timestamp":2.0}\n')
+    assert listener.read_events() == [ChangeEvent("module.b.data", 2, 2.0)]
+
+
+def test_event_listener_subscribe(tmpdir):
+    path = str(tmpdir.join("events.log"))
+    listener = EventListener(path, interval=0.01)
+    received = queue.Queue()
+    unsubscribe = listener.subscribe(received.put)
+
+    event = EventLog(path).publish("module.a.data", 1)
+    assert received.get(timeout=5) == event
+
+    unsubscribe()
+    listener.stop()
+
+
+def test_notifying_backend(tmpdir):
+    path = str(tmpdir.join("events.log"))
+    listener = EventListener(path)
+    storage = NotifyingBackend(MemoryBackend(), EventLog(path))
+
+    storage.put("module.a.data", {"_timestamp": 1, "a": 1})
+    # Unchanged values don't result in an event
+    storage.put("module.a.data", {"_timestamp": 2, "a": 1})
+    storage.put("module.a.data", {"_timestamp": 3, "a": 2})
+    storage.delete("module.a.data")
+
+    events = [(event.key, event.version) for event in listener.read_events()]
+    assert events == [("module.a.data", 1), ("module.a.data", 2), ("module.a.data", 0)]
+
+
+def test_event_listener_restart(tmpdir):
+    path = str(tmpdir.join("events.log"))
+    listener = EventListener(path, interval=0.01)
+    received = queue.Queue()
+    listener.subscribe(received.put)
+    listener.stop(timeout=5)
+    assert not listener._thread.is_alive()
+
+    # E.g. in a forked worker
+    listener.restart()
+    event = EventLog(path).publish("module.a.data", 1)
+    assert received.get(timeout=5) == event
+    listener.stop()
@@ -9,6 +9,7 @@ from freezegun import freeze_time
 from flirror.crawler.google_auth import GoogleOAuth
 from flirror.database import get_object_by_key, store_object_by_key
 from flirror.exceptions import GoogleOAuthError
+from flirror.storage import SQLiteBackend
 
 
 def test_get_credentials(mock_google_env):
@@ -261,3 +262,47 @@ def test_get_oauth_flow_invalid():
         "Could not load Google OAuth flow from 'invalid_client_secret_file'. "
         "Are you sure this file exists?"
     ) == str(excinfo.value)
+
+
+def test_deprecated_database_argument(mock_empty_database):
+    with pytest.deprecated_call():
+        goauth = GoogleOAuth(database=mock_empty_database)
+    assert isinstance(goauth.storage, SQLiteBackend)
+
+    goauth.storage.put("google_oauth_token", {"access_token": "token"})
+    assert goauth.storage.get("google_oauth_token") == {"access_token": "token"}
+
+
+def test_authenticate_valid_token_storage(mock_google_env, mock_storage):
+    goauth = GoogleOAuth(storage=mock_storage)
+    valid_token_data = {
+        "access_token": "valid_access_token",
+        "expires_in": time.time() + 3600,
+        "refresh_token": "refresh_token",
+    }
+
+    # Store valid token in the storage, so it will be found in the authentication
+    # process
+    mock_storage.put("google_oauth_token", valid_token_data)
+
+    token = goauth.authenticate()
+    assert token == "valid_access_token"
+
+
+@freeze_time("2019-08-21 00:00:00")
+def test_refresh_access_token_storage(mock_google_env, mock_storage):
+    goauth = GoogleOAuth(storage=mock_storage)
+    with requests_mock.mock() as m:
+        m.post(
+            goauth.GOOGLE_OAUTH_POLL_URL,
+            json={"access_token": "some_access_token", "expires_in": 3600},
+        )
+
+        access_token = goauth.refresh_access_token("refresh_token")
+
+    assert access_token == "some_access_token"
+    assert mock_storage.get("google_oauth_token") == {
+        "access_token": "some_access_token",
+        "expires_in": time.time() + 3600,
+        "refresh_token": "refresh_token",
+    }
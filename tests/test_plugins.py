@@ -0,0 +1,113 @@
+import json
+import os
+import sys
+import types
+
+from flirror.modules import FlirrorModule
+from flirror.plugins import (
+    discover_plugin_index,
+    find_entry_points,
+    installation_fingerprint,
+)
+
+
+def test_installation_fingerprint(monkeypatch, tmpdir):
+    site_packages = tmpdir.mkdir("site-packages")
+    site_packages.mkdir("flirror_awesome-1.0.dist-info")
+    monkeypatch.setattr(sys, "path", [str(site_packages), str(tmpdir.join("missing"))])
+    fingerprint = installation_fingerprint()
+    assert installation_fingerprint() == fingerprint
+
+    # Installing a distribution changes the directory's modification time
+    stat = os.stat(str(site_packages))
+    os.utime(str(site_packages), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert installation_fingerprint() != fingerprint
+
+
+def test_installation_fingerprint_ignores_other_directories(monkeypatch, tmpdir):
+    workdir = tmpdir.mkdir("workdir")
+    scripts = tmpdir.mkdir("scripts")
+    monkeypatch.chdir(str(workdir))
+    monkeypatch.setattr(sys, "path", ["", str(workdir), str(scripts)])
+    fingerprint = installation_fingerprint()
+
+    # Files written to the working directory (or any other directory without
+    # distribution metadata) don't invalidate the plugin cache.
+    workdir.join("flirror.sqlite-wal").write("")
+    scripts.join("crawler.log").write("")
+    assert installation_fingerprint() == fingerprint
+
+    # Unless a distribution is installed there
+    scripts.mkdir("flirror_awesome-1.0.dist-info")
+    assert installation_fingerprint() != fingerprint
+
+
+def test_find_entry_points_backport(monkeypatch):
+    # Python < 3.8 uses the importlib_metadata backport, which returns the
+    # entry points grouped in a dictionary.
+    entry_point = types.SimpleNamespace(
+        name="awesome", value="flirror_awesome:awesome_module"
+    )
+    backport = types.ModuleType("importlib_metadata")
+    backport.entry_points = lambda: {"flirror.modules": [entry_point]}
+    monkeypatch.setitem(sys.modules, "importlib_metadata", backport)
+    monkeypatch.setattr(sys, "version_info", (3, 7, 9))
+
+    assert find_entry_points() == {"awesome": "flirror_awesome:awesome_module"}
+
+
+def test_discover_plugin_index_cache(monkeypatch, tmpdir):
+    calls = []
+
+    def find_entry_points():
+        calls.append("entry_points")
+        return {"awesome": "flirror_awesome:awesome_module"}
+
+    monkeypatch.setattr("flirror.plugins.find_entry_points", find_entry_points)
+    monkeypatch.setattr("flirror.plugins.find_plugin_packages", lambda: ["flirror_x"])
+    monkeypatch.setattr("flirror.plugins.installation_fingerprint", lambda: "abc")
+    cache_file = str(tmpdir.join("cache", "plugins.json"))
+
+    index = discover_plugin_index(cache_file)
+    assert index.entry_points == {"awesome": "flirror_awesome:awesome_module"}
+    assert index.packages == ["flirror_x"]
+    with open(cache_file) as f:
+        assert json.load(f)["fingerprint"] == "abc"
+
+    # The cached result is used as long as the fingerprint doesn't change
+    assert discover_plugin_index(cache_file) == index
+    assert calls == ["entry_points"]
+
+    monkeypatch.setattr("flirror.plugins.installation_fingerprint", lambda: "def")
+    assert discover_plugin_index(cache_file) == index
+    assert calls == ["entry_points", "entry_points"]
+
+    # A broken cache file is discovered again
+    with open(cache_file, "w") as f:
+        f.write("{")
+    assert discover_plugin_index(cache_file) == index
+    assert len(calls) == 3
+
+
+def test_load_plugin_modules(mock_app, monkeypatch):
+    app = mock_app.application
+    plugin = types.ModuleType("flirror_awesome")
+    plugin.awesome_module = FlirrorModule("awesome", "flirror_awesome")
+    monkeypatch.setitem(sys.modules, "flirror_awesome", plugin)
+    monkeypatch.setattr(
+        "flirror.plugins.find_entry_points",
+        lambda: {
+            "awesome": "flirror_awesome:awesome_module",
+            "unused": "flirror_unused:unused_module",
+        },
+    )
+    # Make sure the entry points are not taken from the cache
+    monkeypatch.setattr("flirror.plugins.installation_fingerprint", lambda: "test")
+
+    app.config["MODULES"].append({"id": "awesome", "type": "awesome", "config": {}})
+    app.configure_modules()
+
+    # Only the plugin providing a configured module is imported
+    assert app.modules["awesome"] is plugin.awesome_module
+    assert "unused" not in app.modules
+    assert "flirror_unused" not in sys.modules
@@ -0,0 +1,69 @@
+import pytest
+
+from flirror.database import get_object_by_key, store_object_by_key
+from flirror.exceptions import FlirrorConfigError
+from flirror.serialization import deserialize, Serializer
+
+VALUE = {
+    "_timestamp": 1574874141.210646,
+    "stocks": [{"symbol": "GOOGL", "data": {"values": [{"close": "1311.0400"}] * 100}}],
+}
+
+
+def test_plain_serializer():
+    stored_value, payload = Serializer().serialize(VALUE)
+    assert stored_value == VALUE
+    assert payload is None
+    assert deserialize(stored_value, payload) == VALUE
+
+
+def test_json_serializer_compression():
+    serializer = Serializer(compression="zlib", compression_threshold=100)
+    stored_value, payload = serializer.serialize(VALUE)
+    assert stored_value == {"_codec": "json", "_compression": "zlib"}
+    assert deserialize(stored_value, payload) == VALUE
+
+    # Small values are stored as plain JSON
+    stored_value, payload = serializer.serialize({"foo": "bar"})
+    assert stored_value == {"foo": "bar"}
+    assert payload is None
+
+
+def test_msgpack_serializer():
+    pytest.importorskip("msgpack")
+    serializer = Serializer(codec="msgpack", compression="zlib")
+    stored_value, payload = serializer.serialize(VALUE)
+    assert stored_value == {"_codec": "msgpack", "_compression": "zlib"}
+    assert deserialize(stored_value, payload) == VALUE
+
+    # Small values are encoded, but not compressed
+    stored_value, payload = serializer.serialize({"foo": "bar"})
+    assert stored_value == {"_codec": "msgpack"}
+    assert deserialize(stored_value, payload) == {"foo": "bar"}
+
+
+def test_serializer_unknown_codec():
+    with pytest.raises(FlirrorConfigError) as excinfo:
+        Serializer(codec="pickle")
+    assert "Unknown codec 'pickle'" in str(excinfo.value)
+
+
+def test_store_compressed_object(mock_empty_database):
+    serializer = Serializer(compression="zlib", compression_threshold=100)
+    store_object_by_key(mock_empty_database, "some.key", VALUE, serializer=serializer)
+    assert get_object_by_key(mock_empty_database, "some.key") == VALUE
+
+
+def test_migrate_plain_object(mock_empty_database):
+    store_object_by_key(mock_empty_database, "some.key", VALUE)
+
+    # The value didn't change, but as it's stored in a different format, it
+    # must be written again.
+    serializer = Serializer(compression="zlib", compression_threshold=100)
+    assert store_object_by_key(
+        mock_empty_database, "some.key", VALUE, serializer=serializer
+    )
+    assert not store_object_by_key(
+        mock_empty_database, "some.key", VALUE, serializer=serializer
+    )
+    assert get_object_by_key(mock_empty_database, "some.key") == VALUE
@@ -0,0 +1,96 @@
+import gc
+import os
+from unittest import mock
+
+from click.testing import CliRunner
+
+from flirror import pop_gunicorn_config, run_web, server
+
+
+def test_memory_usage():
+    usage = server.memory_usage()
+    assert usage["rss"] > 0
+    assert server.format_memory_usage({"rss": 3 * 1024 * 1024}) == "RSS 3.0 MB"
+
+
+def test_fork_hooks(mock_app):
+    app = mock_app.application
+    app.before_fork()
+    try:
+        server.pre_fork(None, None)
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+
+    # The forked worker reconnects to the database on its own
+    pid = os.fork()
+    if pid == 0:
+        try:
+            app.after_fork()
+            res = mock_app.get("/tiles?ids=news-tagesschau")
+            os._exit(0 if res.status_code == 200 else 1)
+        finally:
+            os._exit(1)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+
+
+def test_merge_config(tmpdir):
+    config_file = tmpdir.join("gunicorn.conf.py")
+    config_file.write(
+        "calls = []\n"
+        "workers = 3\n"
+        "preload_app = False\n"
+        "def post_fork(server, worker):\n"
+        "    calls.append('user')\n"
+    )
+    user_config = server.load_config(str(config_file))
+    calls = user_config["calls"]
+    namespace = {"preload_app": True, "post_fork": lambda s, w: calls.append("ours")}
+
+    server.merge_config(namespace, user_config)
+    assert namespace["workers"] == 3
+    assert namespace["preload_app"] is True
+    # Unknown settings (like helper variables) are not merged
+    assert "calls" not in namespace
+    # Both hooks are called
+    namespace["post_fork"](None, None)
+    assert calls == ["ours", "user"]
+
+
+@mock.patch("flirror.subprocess.call")
+def test_run_web_preload_user_config(call_mock, monkeypatch, tmpdir):
+    monkeypatch.chdir(str(tmpdir))
+    runner = CliRunner()
+    result = runner.invoke(run_web, ["--preload", "-c", "custom.py", "--workers", "4"])
+    assert result.exit_code == 0
+
+    # The user's config is loaded by flirror.server instead of replacing it
+    (cmd,), kwargs = call_mock.call_args
+    assert cmd == [
+        "gunicorn",
+        "flirror:create_web()",
+        "--config",
+        "python:flirror.server",
+        "--workers",
+        "4",
+    ]
+    assert kwargs["env"][server.USER_CONFIG_ENV] == str(tmpdir.join("custom.py"))
+
+    # The same applies to gunicorn's default config file
+    tmpdir.join("gunicorn.conf.py").write("")
+    result = runner.invoke(run_web, ["--preload"])
+    assert result.exit_code == 0
+    (cmd,), kwargs = call_mock.call_args
+    assert cmd[-2:] == ["--config", "python:flirror.server"]
+    assert kwargs["env"][server.USER_CONFIG_ENV] == str(tmpdir.join("gunicorn.conf.py"))
+
+
+def test_pop_gunicorn_config():
+    assert pop_gunicorn_config(["-w", "4"]) == (None, ["-w", "4"])
+    assert pop_gunicorn_config(["--config", "a.py", "-w", "4"]) == ("a.py", ["-w", "4"])
+    assert pop_gunicorn_config(["--config=python:cfg"]) == ("python:cfg", [])
+    assert pop_gunicorn_config(["-ca.py", "-b", "0.0.0.0"]) == (
+        "a.py",
+        ["-b", "0.0.0.0"],
+    )
@@ -0,0 +1,84 @@
+from flirror.snapshot import Snapshot, SnapshotBackend, write_snapshot
+from flirror.storage import MemoryBackend, SQLiteBackend
+
+
+def test_write_and_read_snapshot(tmpdir):
+    path = str(tmpdir.join("flirror.snapshot"))
+    snapshot = Snapshot(path)
+    assert snapshot.sequence is None
+    assert snapshot.get("module.a.data") is None
+
+    write_snapshot(
+        path,
+        [("module.a.data", {"a": "ä"}, 3), ("module.b.data", {"b": [1, 2]}, 1)],
+        sequence=1,
+    )
+    assert snapshot.sequence == 1
+    assert snapshot.get("module.a.data") == {"a": "ä"}
+    assert snapshot.get("module.unknown.data") is None
+    assert snapshot.get_many(["module.b.data", "module.unknown.data"]) == {
+        "module.b.data": {"b": [1, 2]}
+    }
+    assert list(snapshot.scan("module.b")) == [("module.b.data", {"b": [1, 2]})]
+    assert snapshot.get_versions(["module.a.data"]) == {"module.a.data": 3}
+
+    # A new snapshot is picked up automatically
+    write_snapshot(path, [("module.a.data", {"a": 1}, 4)], sequence=2)
+    assert snapshot.sequence == 2
+    assert snapshot.get("module.a.data") == {"a": 1}
+    assert snapshot.get("module.b.data") is None
+
+
+def test_snapshot_backend(tmpdir):
+    path = str(tmpdir.join("flirror.snapshot"))
+    storage = MemoryBackend()
+    storage.put("module.a.data", {"a": 1})
+    storage.put("google_oauth_token", {"access_token": "token"})
+
+    # The reader falls back to the storage as long as there is no snapshot
+    reader = SnapshotBackend(storage, path)
+    assert reader.get("module.a.data") == {"a": 1}
+
+    crawler = SnapshotBackend(storage, path, publish=True)
+    assert crawler.snapshot.sequence == 1
+    data_version = reader.data_version()
+
+    crawler.put("module.b.data", {"b": 2})
+    assert crawler.snapshot.sequence == 2
+    assert reader.data_version() != data_version
+
+    # Change the storage behind the snapshot's back to ensure the reader only
+    # uses the snapshot for module data.
+    storage.put("module.a.data", {"a": 42})
+    assert reader.get("module.a.data") == {"a": 1}
+    assert reader.get_many(["module.a.data", "module.b.data"]) == {
+        "module.a.data": {"a": 1},
+        "module.b.data": {"b": 2},
+    }
+    assert list(reader.scan("module.")) == [
+        ("module.a.data", {"a": 1}),
+        ("module.b.data", {"b": 2}),
+    ]
+    assert reader.get("google_oauth_token") == {"access_token": "token"}
+    assert "google_oauth_token" not in crawler.snapshot.get_versions(
+        ["google_oauth_token"]
+    )
+
+    crawler.delete("module.b.data")
+    assert reader.get("module.b.data") is None
+
+
+def test_snapshot_backend_versions(mock_empty_database, tmpdir):
+    path = str(tmpdir.join("flirror.snapshot"))
+    crawler = SnapshotBackend(SQLiteBackend(mock_empty_database), path, publish=True)
+    crawler.put("module.a.data", {"_timestamp": 1, "a": 1})
+    crawler.put("module.a.data", {"_timestamp": 2, "a": 2})
+    # Unchanged values don't publish a new snapshot, but only update their
+    # last check in the storage.
+    crawler.put("module.a.data", {"_timestamp": 3, "a": 2})
+
+    reader = SnapshotBackend(SQLiteBackend(mock_empty_database), path)
+    assert reader.snapshot.sequence == 3
+    assert reader.get("module.a.data") == {"_timestamp": 2, "a": 2}
+    assert reader.get_versions(["module.a.data"]) == {"module.a.data": 2}
+    assert reader.get_last_checked(["module.a.data"]) == {"module.a.data": 3}
@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from flirror.startup import (
+    configure_bytecode_cache,
+    measure_import_time,
+    precompile_templates,
+    StartupTimer,
+)
+
+
+def test_startup_timer():
+    timer = StartupTimer()
+    timer.lap("configuration")
+    timer.lap("modules")
+    assert [name for name, _ in timer.phases] == ["configuration", "modules"]
+    assert timer.total == pytest.approx(sum(d for _, d in timer.phases))
+
+    report = timer.report().splitlines()
+    assert report[0].startswith(f"Startup of process {os.getpid()} took")
+    assert report[1].split()[0] == "configuration"
+
+
+def test_precompile_templates(mock_app, tmpdir):
+    app = mock_app.application
+    cache_dir = str(tmpdir.join("bytecode-cache"))
+    configure_bytecode_cache(app, cache_dir)
+
+    templates = precompile_templates(app)
+    # The templates of the app and all modules are compiled
+    assert "index.html" in templates
+    assert "layout.html" in templates
+    assert "newsfeed/index.html" in templates
+    assert "stocks/index.html" in templates
+    assert len(os.listdir(cache_dir)) == len(templates)
+
+    # Other workers load the compiled templates from the cache
+    app.jinja_env.cache.clear()
+    res = mock_app.get("/")
+    assert res.status_code == 200
+
+
+def test_measure_import_time():
+    imports = measure_import_time("json.tool", preload=["json"])
+    # The modules imported by the preloaded one are not included
+    assert imports[-1].name == "json.tool"
+    assert "json.decoder" not in [i.name for i in imports]
+    assert imports[-1].cumulative_time >= imports[-1].self_time
+
+    with pytest.raises(ImportError):
+        measure_import_time("flirror_does_not_exist")
@@ -0,0 +1,248 @@
+import os
+import sqlite3
+
+import pytest
+
+import flirror
+from flirror.database import get_object_by_key, store_object_by_key
+from flirror.exceptions import FlirrorConfigError
+from flirror.serialization import Serializer
+from flirror.storage import (
+    create_storage,
+    MemoryBackend,
+    MmapBackend,
+    SQLiteBackend,
+    SQLiteKVBackend,
+)
+
+flirror_dir = os.path.dirname(os.path.abspath(flirror.__file__))
+
+
+@pytest.fixture(
+    params=["memory", "mmap", "mmap-compressed", "sqlite-kv", "sqlite-kv-compressed"]
+)
+def storage(request, tmpdir):
+    if request.param == "memory":
+        return MemoryBackend()
+    serializer = None
+    if request.param.endswith("-compressed"):
+        serializer = Serializer(compression="zlib", compression_threshold=10)
+    if request.param.startswith("sqlite-kv"):
+        return SQLiteKVBackend(str(tmpdir.join("test.sqlite")), serializer)
+    return MmapBackend(str(tmpdir.join("storage")), serializer)
+
+
+def test_storage_put_and_get(storage):
+    assert storage.get("module.a.data") is None
+
+    assert storage.put("module.a.data", {"_timestamp": 1, "values": [1, 2, 3]})
+    assert storage.get("module.a.data") == {"_timestamp": 1, "values": [1, 2, 3]}
+    assert storage.get_many(["module.a.data", "module.b.data"]) == {
+        "module.a.data": {"_timestamp": 1, "values": [1, 2, 3]}
+    }
+
+
+def test_storage_skip_unchanged(storage):
+    assert storage.put("module.a.data", {"_timestamp": 1, "a": 1})
+    assert not storage.put("module.a.data", {"_timestamp": 2, "a": 1})
+    assert storage.get_versions(["module.a.data"]) == {"module.a.data": 1}
+    # The timestamp is still updated
+    assert storage.get("module.a.data") == {"_timestamp": 2, "a": 1}
+
+    assert storage.put("module.a.data", {"_timestamp": 3, "a": 2})
+    assert storage.get_versions(["module.a.data", "unknown"]) == {"module.a.data": 2}
+
+
+def test_storage_last_checked(storage):
+    assert storage.get_last_checked(["module.a.data"]) == {}
+    storage.put("module.a.data", {"_timestamp": 1, "a": 1})
+    assert storage.get_last_checked(["module.a.data"]) == {"module.a.data": 1}
+    # Unchanged values still update the last check
+    storage.put("module.a.data", {"_timestamp": 2, "a": 1})
+    assert storage.get_last_checked(["module.a.data", "unknown"]) == {
+        "module.a.data": 2
+    }
+
+
+def test_storage_scan_and_delete(storage):
+    storage.put("module.b.data", {"b": 2})
+    storage.put("module.a.data", {"a": 1})
+    storage.put("google_oauth_token", {"access_token": "token"})
+
+    assert list(storage.scan("module.")) == [
+        ("module.a.data", {"a": 1}),
+        ("module.b.data", {"b": 2}),
+    ]
+
+    storage.delete("module.a.data")
+    storage.delete("module.unknown.data")
+    assert storage.get("module.a.data") is None
+    assert list(storage.scan("module.")) == [("module.b.data", {"b": 2})]
+
+
+def test_storage_data_version(storage):
+    data_version = storage.data_version()
+    storage.put("module.a.data", {"a": 1})
+    assert storage.data_version() != data_version
+
+
+def test_mmap_storage_unchanged_data_version(tmpdir):
+    storage = MmapBackend(str(tmpdir.join("storage")))
+    storage.put("module.a.data", {"_timestamp": 1, "a": 1})
+    data_version = storage.data_version()
+
+    # Only updating the last check doesn't invalidate the readers' caches
+    assert not storage.put("module.a.data", {"_timestamp": 2, "a": 1})
+    assert storage.data_version() == data_version
+    assert storage.get_last_checked(["module.a.data"]) == {"module.a.data": 2}
+
+
+def test_mmap_storage_data_version_same_mtime(tmpdir):
+    storage = MmapBackend(str(tmpdir.join("storage")))
+    storage.put("module.a.data", {"a": 1})
+    data_version = storage.data_version()
+
+    # Simulate a file system with a coarse mtime granularity, on which two
+    # writes in quick succession leave the directory's mtime unchanged.
+    stat = os.stat(storage.directory)
+    storage.put("module.a.data", {"a": 2})
+    os.utime(storage.directory, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert storage.data_version() != data_version
+
+    data_version = storage.data_version()
+    storage.delete("module.a.data")
+    os.utime(storage.directory, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert storage.data_version() != data_version
+    assert list(storage.scan("module.")) == []
+
+
+def test_memory_storage_copies_values():
+    storage = MemoryBackend()
+    value = {"a": [1]}
+    storage.put("module.a.data", value)
+    value["a"].append(2)
+    assert storage.get("module.a.data") == {"a": [1]}
+
+    storage.get("module.a.data")["a"].append(3)
+    assert storage.get("module.a.data") == {"a": [1]}
+
+
+def test_memory_storage_unchanged_data_version():
+    storage = MemoryBackend()
+    storage.put("module.a.data", {"_timestamp": 1, "a": 1})
+    data_version = storage.data_version()
+
+    assert not storage.put("module.a.data", {"_timestamp": 2, "a": 1})
+    assert storage.data_version() == data_version
+    assert storage.get("module.a.data") == {"_timestamp": 2, "a": 1}
+
+
+def test_sqlite_storage_last_checked(mock_empty_database):
+    storage = SQLiteBackend(mock_empty_database)
+    storage.put("module.a.data", {"_timestamp": 1, "a": 1})
+    storage.put("module.a.data", {"_timestamp": 2, "a": 1})
+    assert storage.get_last_checked(["module.a.data", "unknown"]) == {
+        "module.a.data": 2
+    }
+
+
+def test_sqlite_kv_storage_compatibility(mock_empty_database, tmpdir):
+    # Values written by pony can be read by the sqlite-kv backend and vice versa
+    store_object_by_key(mock_empty_database, "module.a.data", {"a": "ä"})
+    storage = SQLiteKVBackend(str(tmpdir.join("test_database.sqlite")))
+    assert storage.get("module.a.data") == {"a": "ä"}
+    assert not storage.put("module.a.data", {"a": "ä"})
+
+    assert storage.put("module.a.data", {"a": "ö"})
+    assert storage.put("module.b.data", {"b": 1})
+    assert get_object_by_key(mock_empty_database, "module.a.data") == {"a": "ö"}
+    assert get_object_by_key(mock_empty_database, "module.b.data") == {"b": 1}
+    assert storage.get_versions(["module.a.data", "module.b.data"]) == {
+        "module.a.data": 2,
+        "module.b.data": 1,
+    }
+
+    # An unchanged value written by pony doesn't increase the version either
+    assert not store_object_by_key(mock_empty_database, "module.a.data", {"a": "ö"})
+    storage.close()
+
+
+def test_sqlite_kv_storage_legacy_schema(tmpdir):
+    database_file = str(tmpdir.join("legacy.sqlite"))
+    connection = sqlite3.connect(database_file)
+    with connection:
+        connection.execute(
+            'CREATE TABLE "FlirrorObject" '
+            '("key" TEXT NOT NULL PRIMARY KEY, "value" JSON NOT NULL)'
+        )
+        connection.execute(
+            'INSERT INTO "FlirrorObject" VALUES (?, ?)', ("module.a.data", '{"a":1}')
+        )
+    connection.close()
+
+    storage = SQLiteKVBackend(database_file)
+    assert storage.get("module.a.data") == {"a": 1}
+    assert storage.put("module.a.data", {"a": 1})
+    assert storage.get_versions(["module.a.data"]) == {"module.a.data": 2}
+    storage.close()
+
+
+def test_sqlite_kv_storage_read_only(tmpdir):
+    database_file = str(tmpdir.join("test.sqlite"))
+    SQLiteKVBackend(database_file).put("module.a.data", {"a": 1})
+
+    storage = SQLiteKVBackend(database_file, read_only=True)
+    assert storage.get("module.a.data") == {"a": 1}
+    with pytest.raises(sqlite3.OperationalError):
+        storage.put("module.a.data", {"a": 2})
+    storage.close()
+
+
+def test_create_storage(tmpdir):
+    storage = create_storage({"DATABASE_FILE": str(tmpdir.join("test.sqlite"))})
+    assert isinstance(storage, SQLiteBackend)
+    storage.close()
+
+    storage = create_storage(
+        {"STORAGE_BACKEND": "sqlite-kv", "DATABASE_FILE": str(tmpdir.join("kv.db"))}
+    )
+    assert isinstance(storage, SQLiteKVBackend)
+    storage.close()
+
+    storage = create_storage({"STORAGE_BACKEND": "memory"})
+    assert isinstance(storage, MemoryBackend)
+
+    storage = create_storage(
+        {"STORAGE_BACKEND": "mmap", "STORAGE_DIRECTORY": str(tmpdir.join("data"))}
+    )
+    assert isinstance(storage, MmapBackend)
+
+
+def test_create_storage_relative_database_file(monkeypatch, tmpdir):
+    # Both SQLite backends resolve a relative path the same way (independent
+    # of the working directory), so they share the same database.
+    database_file = os.path.relpath(str(tmpdir.join("shared.sqlite")), flirror_dir)
+    monkeypatch.chdir(str(tmpdir.mkdir("workdir")))
+
+    kv_storage = create_storage(
+        {"STORAGE_BACKEND": "sqlite-kv", "DATABASE_FILE": database_file}
+    )
+    pony_storage = create_storage(
+        {"STORAGE_BACKEND": "sqlite", "DATABASE_FILE": database_file}
+    )
+    kv_storage.put("module.a.data", {"a": 1})
+    assert pony_storage.get("module.a.data") == {"a": 1}
+    pony_storage.put("module.b.data", {"b": 2})
+    assert kv_storage.get("module.b.data") == {"b": 2}
+    kv_storage.close()
+    pony_storage.close()
+
+
+def test_create_storage_invalid():
+    with pytest.raises(FlirrorConfigError) as excinfo:
+        create_storage({"STORAGE_BACKEND": "mmap"})
+    assert "requires the STORAGE_DIRECTORY setting" in str(excinfo.value)
+
+    with pytest.raises(FlirrorConfigError) as excinfo:
+        create_storage({"STORAGE_BACKEND": "redis"})
+    assert "Unknown storage backend 'redis'" in str(excinfo.value)
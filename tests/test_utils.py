@@ -4,7 +4,7 @@ import pytest
 from freezegun import freeze_time
 
 from flirror.exceptions import FlirrorConfigError
-from flirror.modules import FlirrorModule
+from flirror.modules import FlirrorModule, ModuleRegistry
 from flirror.utils import discover_flirror_modules, parse_interval_string, prettydate
 
 
@@ -96,3 +96,30 @@ def test_discover_flirror_modules_wrong_values():
     # FLIRROR_MODULES contains some invalid module (not instance of
     # FlirrorModule). Thus, only module_2 is discovered in the end.
     assert flirror_modules == [module_2]
+
+
+def test_module_registry():
+    registry = ModuleRegistry(
+        {
+            "clock": "flirror.modules.clock:clock_module",
+            "invalid": "flirror.modules.clock:LOGGER",
+        }
+    )
+    assert "clock" in registry
+    assert list(registry) == ["clock", "invalid"]
+    module = registry.load("clock")
+    assert isinstance(module, FlirrorModule)
+    assert registry.load("clock") is module
+    with pytest.raises(FlirrorConfigError):
+        registry.load("invalid")
+
+
+def test_load_configured_modules(mock_app):
+    # Only the configured modules are registered
+    app = mock_app.application
+    assert "weather" in app.modules
+    assert "clock" not in app.modules
+
+    app.config["MODULES"].append({"id": "clock", "type": "clock", "config": {}})
+    app.configure_modules()
+    assert "clock" in app.modules
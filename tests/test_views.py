@@ -1,6 +1,13 @@
+import gzip
+import json
+
 import pytest
+from flask import jsonify
+from freezegun import freeze_time
 from jinja2.exceptions import UndefinedError
 
+from flirror.modules import FlirrorModule
+
 
 def test_template_invalid(mock_app):
     # Validates that the other template tests would fail if the data in the database is
@@ -58,6 +65,44 @@ def test_stocks_api_template_table(mock_app):
     assert set(res.json.keys()) == {"_template"}
 
 
+def test_api_conditional_request(mock_app):
+    res = mock_app.get("/weather/?module_id=weather-frankfurt")
+    assert res.status_code == 200
+    etag = res.headers["ETag"]
+
+    res = mock_app.get(
+        "/weather/?module_id=weather-frankfurt", headers={"If-None-Match": etag}
+    )
+    assert res.status_code == 304
+    assert res.headers["ETag"] == etag
+    assert res.data == b""
+
+    # Changed data results in a new etag
+    app = mock_app.application
+    with app.app_context():
+        data = app.get_module_data("weather-frankfurt")
+        app.store_module_data("weather-frankfurt", {**data, "city": "Offenbach"})
+    res = mock_app.get(
+        "/weather/?module_id=weather-frankfurt", headers={"If-None-Match": etag}
+    )
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+
+
+def test_clock_conditional_request(mock_app):
+    mock_app.application.config["MODULES"].append(
+        {"id": "clock", "type": "clock", "config": {}}
+    )
+    mock_app.application.configure_modules()
+    res = mock_app.get("/clock/?module_id=clock")
+    assert res.status_code == 200
+
+    res = mock_app.get(
+        "/clock/?module_id=clock", headers={"If-None-Match": res.headers["ETag"]}
+    )
+    assert res.status_code == 304
+
+
 def test_invalid_api(mock_app):
     res = mock_app.get("/api/invalid")
     assert res.status_code == 404
@@ -72,3 +117,343 @@ def test_api_invalid_module_id(mock_app):
         "msg": "Could not find any module config for ID 'invalid-module'. "
         "Are you sure this one is specified in the config file?",
     }
+
+
+def parse_stream_events(data):
+    events = []
+    for block in data.decode("utf-8").split("\n\n"):
+        fields = dict(
+            line.split(": ", 1) for line in block.splitlines() if ": " in line
+        )
+        if fields.get("event") == "tile":
+            events.append((json.loads(fields["id"]), json.loads(fields["data"])))
+    return events
+
+
+def test_stream(mock_app):
+    mock_app.application.config["STREAM_TIMEOUT"] = 0
+
+    res = mock_app.get("/stream")
+    assert res.status_code == 200
+    assert res.mimetype == "text/event-stream"
+
+    events = parse_stream_events(res.data)
+    tiles = {tile["id"]: tile for _, tile in events}
+    # The clock module doesn't have a crawler and thus is not streamed
+    assert "clock" not in tiles
+    assert {"weather-frankfurt", "calendar-my", "news-tagesschau"} <= set(tiles)
+    assert set(tiles["news-tagesschau"]) == {"id", "_template"}
+
+    # The last event ID contains the entity tags of all sent tiles
+    app = mock_app.application
+    streamed_modules = app.get_streamed_modules()
+    etags = app.get_module_etags(
+        streamed_modules, app.get_module_versions(streamed_modules)
+    )
+    last_event_id, _ = events[-1]
+    assert last_event_id["news-tagesschau"] == etags["news-tagesschau"]
+    assert last_event_id["news-nytimes"] == etags["news-nytimes"]
+
+
+def test_stream_resume(mock_app):
+    app = mock_app.application
+    app.config["STREAM_TIMEOUT"] = 0
+    streamed_modules = app.get_streamed_modules()
+    versions = app.get_module_versions(streamed_modules)
+    etags = app.get_module_etags(streamed_modules, versions)
+
+    # Only tiles that changed since the last event are sent again
+    data = app.get_module_data("news-tagesschau")
+    app.store_module_data("news-tagesschau", {**data, "news": data["news"][:1]})
+    res = mock_app.get("/stream", headers={"Last-Event-ID": json.dumps(etags)})
+    events = parse_stream_events(res.data)
+    assert [tile["id"] for _, tile in events] == ["news-tagesschau"]
+    assert events[0][0]["news-tagesschau"] != etags["news-tagesschau"]
+    assert events[0][0]["news-nytimes"] == etags["news-nytimes"]
+
+
+def test_stream_resend_expired_tiles(mock_app):
+    app = mock_app.application
+    app.config["STREAM_TIMEOUT"] = 0
+    app.config["RENDER_CACHE_TTL"] = 60
+    # NOTE: The streams must be consumed while the time is frozen, as their
+    # deadline is based on the frozen time.
+    with freeze_time("2020-01-01 12:00:00"):
+        res = mock_app.get("/stream")
+        events = parse_stream_events(res.data)
+        sent_tiles = {tile["id"] for _, tile in events}
+        headers = {"Last-Event-ID": json.dumps(events[-1][0])}
+
+        # Nothing changed in the meantime
+        res = mock_app.get("/stream", headers=headers)
+        assert parse_stream_events(res.data) == []
+
+    # The relative times in all tiles are outdated once the period rolls over
+    with freeze_time("2020-01-01 12:01:00"):
+        res = mock_app.get("/stream", headers=headers)
+        tiles = [tile["id"] for _, tile in parse_stream_events(res.data)]
+    assert set(tiles) == sent_tiles
+
+
+def test_index_cache(mock_app):
+    res = mock_app.get("/")
+    assert res.status_code == 200
+    assert res.headers["Cache-Control"] == "public, max-age=3600"
+    etag = res.headers["ETag"]
+
+    res = mock_app.get("/", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.data == b""
+
+    # A changed configuration results in a new page
+    app = mock_app.application
+    app.config["MODULES"] = app.config["MODULES"][:1]
+    app.configure_modules()
+    res = mock_app.get("/", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+    assert b'flirrorTiles.register("news-tagesschau"' not in res.data
+
+
+def test_index_stream(mock_app):
+    res = mock_app.get("/")
+    assert res.status_code == 200
+    assert b"flirrorStream.start(" not in res.data
+
+    mock_app.application.config["STREAM_UPDATES"] = True
+    res = mock_app.get("/")
+    assert b'flirrorStream.start("/stream")' in res.data
+    assert b'flirrorTiles.register("news-tagesschau", 30000, true, null)' in res.data
+
+
+def test_index_prerender(mock_app):
+    res = mock_app.get("/")
+    assert b"Could not find any data for module" not in res.data
+
+    mock_app.application.config["PRERENDER_TILES"] = True
+    res = mock_app.get("/")
+    assert res.status_code == 200
+    tiles = mock_app.get("/tiles?ids=news-tagesschau,news-nytimes").json["tiles"]
+    # The tiles are rendered inline and registered with their etag, so they
+    # aren't loaded again right away.
+    assert tiles["news-tagesschau"]["_template"].encode("utf-8") in res.data
+    assert b"Could not find any data for module" in res.data
+    etag = tiles["news-tagesschau"]["etag"]
+    assert (
+        f'flirrorTiles.register("news-tagesschau", 30000, true, "{etag}")'.encode(
+            "utf-8"
+        )
+        in res.data
+    )
+
+
+def test_tiles(mock_app):
+    # The clock module doesn't have a crawler and thus doesn't need any data
+    mock_app.application.config["MODULES"].append(
+        {"id": "clock", "type": "clock", "config": {}}
+    )
+    mock_app.application.configure_modules()
+    res = mock_app.get(
+        "/tiles?ids=weather-frankfurt,clock,news-tagesschau,news-nytimes,invalid"
+    )
+    assert res.status_code == 200
+    tiles = res.json["tiles"]
+    assert set(tiles) == {
+        "weather-frankfurt",
+        "clock",
+        "news-tagesschau",
+        "news-nytimes",
+        "invalid",
+    }
+    assert set(tiles["weather-frankfurt"]) == {"_template", "etag"}
+    assert set(tiles["news-tagesschau"]) == {"_template", "etag"}
+    assert "Error" not in tiles["clock"]["_template"]
+    # Modules without data are rendered with an error message
+    assert "Could not find any data for module" in tiles["news-nytimes"]["_template"]
+    assert tiles["invalid"] == {
+        "error": 400,
+        "msg": "Could not find any module config for ID 'invalid'. "
+        "Are you sure this one is specified in the config file?",
+    }
+
+
+def test_tiles_render_cache(mock_app):
+    app = mock_app.application
+    render_cache = app.extensions["render_cache"]
+
+    first = mock_app.get("/tiles?ids=weather-frankfurt").json["tiles"]
+    second = mock_app.get("/tiles?ids=weather-frankfurt").json["tiles"]
+    assert first == second
+    assert render_cache.stats["hits"] == 1
+
+    # Changed data results in a new version and thus renders the tile again
+    with app.app_context():
+        data = app.get_module_data("weather-frankfurt")
+        app.store_module_data("weather-frankfurt", {**data, "city": "Offenbach"})
+    tiles = mock_app.get("/tiles?ids=weather-frankfurt").json["tiles"]
+    assert "Offenbach" in tiles["weather-frankfurt"]["_template"]
+
+
+def test_tiles_conditional_request(mock_app):
+    res = mock_app.get("/tiles?ids=weather-frankfurt,news-tagesschau")
+    assert res.status_code == 200
+    etag = res.headers["ETag"]
+
+    res = mock_app.get(
+        "/tiles?ids=weather-frankfurt,news-tagesschau", headers={"If-None-Match": etag},
+    )
+    assert res.status_code == 304
+    assert res.data == b""
+
+    # A different batch of tiles has a different etag
+    res = mock_app.get("/tiles?ids=weather-frankfurt", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+
+
+def test_tiles_compression(mock_app):
+    res = mock_app.get(
+        "/tiles?ids=weather-frankfurt", headers={"Accept-Encoding": "gzip"}
+    )
+    assert res.status_code == 200
+    assert res.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in res.headers["Vary"]
+    # The etag is still valid, but only weakly
+    assert res.headers["ETag"].startswith('W/"')
+    tiles = json.loads(gzip.decompress(res.data))["tiles"]
+    assert set(tiles["weather-frankfurt"]) == {"_template", "etag"}
+
+    res = mock_app.get(
+        "/tiles?ids=weather-frankfurt",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": res.headers["ETag"]},
+    )
+    assert res.status_code == 304
+
+    # Small responses are not compressed
+    res = mock_app.get("/tiles?ids=invalid", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in res.headers
+
+
+def test_tiles_missing_ids(mock_app):
+    res = mock_app.get("/tiles")
+    assert res.status_code == 400
+    assert res.json == {"error": 400, "msg": "Parameter 'ids' is missing"}
+
+
+def test_index_module_view(mock_app):
+    app = mock_app.application
+    # A module which doesn't declare the template of its tile, but uses its
+    # own view (e.g. with a custom context)
+    custom_module = FlirrorModule("custom", __name__)
+    custom_module.register_crawler(lambda module_id, app: None)
+
+    @custom_module.view()
+    def get():
+        return jsonify({"_template": "<div>custom</div>"})
+
+    app.register_module(custom_module)
+    app.config["MODULES"].append({"id": "custom-1", "module": "custom", "config": {}})
+    app.configure_modules()
+    app.config["STREAM_UPDATES"] = True
+    app.config["PRERENDER_TILES"] = True
+
+    # The tile is neither prerendered nor streamed, but loaded via its view
+    res = mock_app.get("/")
+    assert (
+        b'flirrorTiles.register("custom-1", 30000, false, null, null, "/custom/");'
+        in res.data
+    )
+    assert "custom-1" not in app.get_streamed_modules()
+    res = mock_app.get("/custom/?module_id=custom-1")
+    assert res.json == {"_template": "<div>custom</div>"}
+
+
+def test_index_required_assets(mock_app):
+    # By default, all libraries are included (from the CDNs, as they are not
+    # vendored in the tests).
+    res = mock_app.get("/")
+    assert b"jquery-3.4.1.min.js" in res.data
+    assert b"Chart.min.js" in res.data
+
+    app = mock_app.application
+    app.config["ASSETS_ONLY_REQUIRED"] = True
+    res = mock_app.get("/")
+    assert b"jquery-3.4.1.min.js" in res.data
+    assert b"Chart.min.js" in res.data
+
+    # Only the stocks series require Chart.js
+    app.config["MODULES"] = [
+        module for module in app.config["MODULES"] if module["id"] != "stocks-series"
+    ]
+    app.configure_modules()
+    res = mock_app.get("/")
+    assert b"jquery-3.4.1.min.js" in res.data
+    assert b"Chart.min.js" not in res.data
+
+
+def test_api_data_output(mock_app):
+    res = mock_app.get("/newsfeed/?module_id=news-tagesschau&output=data")
+    assert res.status_code == 200
+    # The response is compact JSON limited to the fields the tile needs
+    assert res.data.startswith(b'{"data":{"_timestamp":')
+    assert set(res.json) == {"data", "version", "etag"}
+    assert set(res.json["data"]) == {"_timestamp", "news"}
+    assert res.json["version"] == 1
+    etag = res.headers["ETag"]
+    assert res.json["etag"] == res.get_etag()[0]
+
+    res = mock_app.get(
+        "/newsfeed/?module_id=news-tagesschau&output=data",
+        headers={"If-None-Match": etag},
+    )
+    assert res.status_code == 304
+
+    res = mock_app.get("/newsfeed/?module_id=invalid-module&output=data")
+    assert res.status_code == 400
+
+
+def test_tiles_data_output(mock_app):
+    res = mock_app.get("/tiles?ids=news-tagesschau,news-bbc,invalid-module&output=data")
+    assert res.status_code == 200
+    tiles = res.json["tiles"]
+    assert set(tiles["news-tagesschau"]["data"]) == {"_timestamp", "news"}
+    assert tiles["news-bbc"]["data"] is None
+    assert tiles["news-bbc"]["version"] == 0
+    assert tiles["invalid-module"]["error"] == 400
+
+    res = mock_app.get(
+        "/tiles?ids=news-tagesschau,news-bbc,invalid-module&output=data",
+        headers={"If-None-Match": res.headers["ETag"]},
+    )
+    assert res.status_code == 304
+
+
+def test_tiles_data_output_refreshed_timestamp(mock_app):
+    app = mock_app.application
+    data = {"_timestamp": 1000.0, "news": [{"title": "Hello"}]}
+    app.store_module_data("news-bbc", data)
+    res = mock_app.get("/tiles?ids=news-bbc&output=data")
+    assert res.json["tiles"]["news-bbc"]["data"]["_timestamp"] == 1000.0
+    etag = res.headers["ETag"]
+
+    # The crawler found the same content again, so only the last check changed
+    assert not app.storage.put("module.news-bbc.data", {**data, "_timestamp": 5000.0})
+    res = mock_app.get(
+        "/tiles?ids=news-bbc&output=data", headers={"If-None-Match": etag}
+    )
+    assert res.status_code == 200
+    assert res.json["tiles"]["news-bbc"]["version"] == 1
+    assert res.json["tiles"]["news-bbc"]["data"]["_timestamp"] == 5000.0
+
+
+def test_index_client_rendering(mock_app):
+    mock_app.application.config["CLIENT_RENDERING"] = True
+    res = mock_app.get("/")
+    assert res.status_code == 200
+    assert b'<script src="/newsfeed/static/renderer.js' in res.data
+    # Only the config fields the renderer needs are exposed
+    assert (
+        b'flirrorTiles.register("news-tagesschau", 30000, true, null, '
+        b'{"config": {"name": "Tagesschau"}, "display": {"position": 5, '
+        b'"summary": true}, "id": "news-tagesschau", "name": "newsfeed"});'
+    ) in res.data
+    assert b'flirrorTiles.register("weather-frankfurt", 10000, true, null);' in res.data